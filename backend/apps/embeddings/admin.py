@@ -2,7 +2,7 @@
 Admin configuration for Embedding models.
 """
 from django.contrib import admin
-from .models import EmbeddingModelConfig
+from .models import EmbeddingModelConfig, EmbeddingCacheEntry
 
 
 @admin.register(EmbeddingModelConfig)
@@ -45,3 +45,18 @@ class EmbeddingModelConfigAdmin(admin.ModelAdmin):
             # Remove default from other configs
             EmbeddingModelConfig.objects.filter(is_default=True).update(is_default=False)
         super().save_model(request, obj, form, change)
+
+
+@admin.register(EmbeddingCacheEntry)
+class EmbeddingCacheEntryAdmin(admin.ModelAdmin):
+    """Admin interface for EmbeddingCacheEntry model."""
+
+    list_display = ['cache_key', 'model_name', 'model_version', 'dimension', 'created_at']
+    list_filter = ['model_name']
+    search_fields = ['cache_key', 'model_name']
+    exclude = ['vector']
+    readonly_fields = ['cache_key', 'model_name', 'model_version', 'dimension', 'created_at']
+
+    def has_add_permission(self, request):
+        """Cache entries are written by the embedding service only."""
+        return False
@@ -0,0 +1,277 @@
+"""
+Token-aware batching and chunking for embedding requests.
+
+Texts are packed into batches up to a provider's token and item budget.
+Texts longer than the per-text limit are split into chunks whose
+embeddings are pooled back into one vector per text.
+"""
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# CJK ideographs, kana, hangul and full-width punctuation: ~1 token per character
+_CJK_RE = re.compile(
+    '[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff'
+    '\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]'
+)
+_WORD_RE = re.compile(r'[A-Za-z]+|\d+|[^\sA-Za-z\d]')
+# Sentence boundaries used to split long texts, keeping the delimiter
+_SENTENCE_RE = re.compile(r'[^。！？；!?;\n]*[。！？；!?;\n]+|[^。！？；!?;\n]+')
+
+# Tokens added by the tokenizer around every input ([CLS]/[SEP] etc.)
+SPECIAL_TOKENS = 2
+
+# Share of the provider token limits left unused, since estimate_tokens()
+# may undercount (e.g. rare words split into many subword tokens)
+DEFAULT_TOKEN_SAFETY_MARGIN = 0.1
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text without a tokenizer.
+
+    CJK characters count as one token each; Latin words as one token per
+    four letters, numbers as one per three digits, other symbols as one.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated number of tokens, including special tokens
+    """
+    if not text:
+        return SPECIAL_TOKENS
+
+    tokens = len(_CJK_RE.findall(text))
+    for word in _WORD_RE.findall(_CJK_RE.sub(' ', text)):
+        if word.isalpha():
+            tokens += math.ceil(len(word) / 4)
+        elif word.isdigit():
+            tokens += math.ceil(len(word) / 3)
+        else:
+            tokens += 1
+    return tokens + SPECIAL_TOKENS
+
+
+class BatchPlanner:
+    """
+    Plans chunks and batches for a list of texts.
+    """
+
+    def __init__(
+        self,
+        max_tokens_per_text: int = 512,
+        max_tokens_per_batch: int = 8192,
+        max_batch_size: int = 32,
+        token_safety_margin: float = DEFAULT_TOKEN_SAFETY_MARGIN
+    ):
+        """
+        Initialize the planner.
+
+        Args:
+            max_tokens_per_text: Provider limit for a single input
+            max_tokens_per_batch: Provider limit for one request
+            max_batch_size: Maximum inputs per request
+            token_safety_margin: Share of both token limits left unused
+                (0.1: plan against 90% of them)
+        """
+        budget = 1.0 - min(max(float(token_safety_margin), 0.0), 0.9)
+        self.max_tokens_per_text = max(SPECIAL_TOKENS + 1, int(int(max_tokens_per_text) * budget))
+        self.max_tokens_per_batch = max(self.max_tokens_per_text, int(int(max_tokens_per_batch) * budget))
+        self.max_batch_size = max(1, int(max_batch_size))
+
+    @classmethod
+    def from_params(cls, model_params: Optional[Dict[str, Any]], max_batch_size: Optional[int] = None) -> 'BatchPlanner':
+        """
+        Create a planner from EmbeddingModelConfig.model_params.
+
+        Recognized keys: max_tokens_per_text, max_tokens_per_batch,
+        max_batch_size, token_safety_margin.
+
+        Args:
+            model_params: Model parameters
+            max_batch_size: Optional caller cap on inputs per request
+
+        Returns:
+            BatchPlanner instance
+        """
+        params = model_params or {}
+        batch_size = params.get('max_batch_size', 32)
+        if max_batch_size:
+            batch_size = min(batch_size, max_batch_size)
+        return cls(
+            max_tokens_per_text=params.get('max_tokens_per_text', 512),
+            max_tokens_per_batch=params.get('max_tokens_per_batch', 8192),
+            max_batch_size=batch_size,
+            token_safety_margin=params.get('token_safety_margin', DEFAULT_TOKEN_SAFETY_MARGIN),
+        )
+
+    def split_text(self, text: str) -> List[str]:
+        """
+        Split a text into chunks that each fit the per-text token limit.
+
+        Splits at sentence boundaries where possible and hard-splits
+        sentences that are too long on their own.
+
+        Args:
+            text: Text to split
+
+        Returns:
+            List of chunks (the text itself if it fits)
+        """
+        if estimate_tokens(text) <= self.max_tokens_per_text:
+            return [text]
+
+        pieces = []
+        for sentence in _SENTENCE_RE.findall(text):
+            while estimate_tokens(sentence) > self.max_tokens_per_text:
+                # Halve the cut until the head fits; at least one character
+                cut = len(sentence)
+                while cut > 1 and estimate_tokens(sentence[:cut]) > self.max_tokens_per_text:
+                    cut = cut // 2
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:]
+            if sentence:
+                pieces.append(sentence)
+
+        # Merge consecutive pieces back up to the limit
+        chunks = []
+        current = ''
+        for piece in pieces:
+            candidate = current + piece
+            if current and estimate_tokens(candidate) > self.max_tokens_per_text:
+                chunks.append(current)
+                current = piece
+            else:
+                current = candidate
+        if current:
+            chunks.append(current)
+
+        return [chunk for chunk in chunks if chunk.strip()] or [text[:self.max_tokens_per_text]]
+
+    @staticmethod
+    def resplit(text: str) -> List[str]:
+        """
+        Split a text the provider rejected as too long despite its estimate.
+
+        Args:
+            text: Text to split
+
+        Returns:
+            Chunks of about half its estimated tokens each, or [] if the
+            text is too short to split further
+        """
+        tokens = estimate_tokens(text)
+        if tokens <= 2 * (SPECIAL_TOKENS + 1):
+            return []
+        planner = BatchPlanner(max_tokens_per_text=tokens // 2, token_safety_margin=0.0)
+        chunks = planner.split_text(text)
+        return chunks if len(chunks) > 1 else []
+
+    def plan(self, texts: List[str]) -> Tuple[List[str], List[int], List[int], List[List[int]]]:
+        """
+        Chunk texts and pack the chunks into batches.
+
+        Args:
+            texts: Texts to encode
+
+        Returns:
+            Tuple of (chunks, owner text index per chunk, estimated tokens
+            per chunk, batches as lists of chunk indexes)
+        """
+        chunks = []
+        owners = []
+        tokens = []
+        for index, text in enumerate(texts):
+            for chunk in self.split_text(text):
+                chunks.append(chunk)
+                owners.append(index)
+                tokens.append(min(estimate_tokens(chunk), self.max_tokens_per_text))
+
+        batches = []
+        current = []
+        current_tokens = 0
+        for index, chunk_tokens in enumerate(tokens):
+            if current and (
+                len(current) >= self.max_batch_size
+                or current_tokens + chunk_tokens > self.max_tokens_per_batch
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(index)
+            current_tokens += chunk_tokens
+        if current:
+            batches.append(current)
+
+        return chunks, owners, tokens, batches
+
+    @staticmethod
+    def pool(
+        text_count: int,
+        owners: List[int],
+        tokens: List[int],
+        chunk_embeddings: List[List[float]]
+    ) -> List[List[float]]:
+        """
+        Pool chunk embeddings back into one vector per text.
+
+        Texts with a single chunk keep that embedding unchanged. Multi-chunk
+        texts get the token-weighted mean of their normalized chunk
+        embeddings, re-normalized. Failed (empty) chunks are ignored.
+
+        Args:
+            text_count: Number of original texts
+            owners: Owner text index per chunk
+            tokens: Estimated tokens per chunk (pooling weights)
+            chunk_embeddings: Embedding per chunk, [] if it failed
+
+        Returns:
+            One embedding per text, [] if all of its chunks failed
+        """
+        chunk_counts = Counter(owners)
+        grouped: Dict[int, List[int]] = {}
+        for chunk_index, owner in enumerate(owners):
+            if len(chunk_embeddings[chunk_index]) > 0:
+                grouped.setdefault(owner, []).append(chunk_index)
+
+        results = []
+        for owner in range(text_count):
+            chunk_indexes = grouped.get(owner, [])
+            if not chunk_indexes:
+                results.append([])
+            elif len(chunk_indexes) == 1 and chunk_counts[owner] == 1:
+                results.append(chunk_embeddings[chunk_indexes[0]])
+            else:
+                vectors = np.asarray([chunk_embeddings[i] for i in chunk_indexes], dtype=np.float32)
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                weights = np.asarray([tokens[i] for i in chunk_indexes], dtype=np.float32)
+                pooled = (vectors / norms * weights[:, None]).sum(axis=0)
+                norm = np.linalg.norm(pooled)
+                results.append((pooled / norm if norm else pooled).tolist())
+
+        return results
+
+    @classmethod
+    def pool_chunks(cls, chunks: List[str], chunk_embeddings: List[List[float]]) -> List[float]:
+        """
+        Pool the embeddings of the chunks of one text (see pool()).
+
+        Args:
+            chunks: Chunks of the text
+            chunk_embeddings: Embedding per chunk, [] if it failed
+
+        Returns:
+            The text embedding, [] if all of its chunks failed
+        """
+        return cls.pool(
+            1,
+            [0] * len(chunks),
+            [estimate_tokens(chunk) for chunk in chunks],
+            chunk_embeddings
+        )[0]
@@ -0,0 +1,209 @@
+"""
+Content-addressed embedding cache.
+
+Vectors are keyed by a hash of model name, model version and normalized
+text. A per-process LRU sits in front of the persistent EmbeddingCacheEntry
+table, so repeated clauses never reach the provider twice.
+"""
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .models import EmbeddingCacheEntry
+
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class EmbeddingCache:
+    """
+    Two-level (memory LRU + database) cache of embedding vectors.
+    """
+
+    def __init__(self, max_memory_items: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_memory_items: LRU capacity (default: EMBEDDING_CACHE_MEMORY_ITEMS setting)
+        """
+        if max_memory_items is None:
+            max_memory_items = getattr(settings, 'EMBEDDING_CACHE_MEMORY_ITEMS', 10000)
+        self.max_memory_items = max_memory_items
+        self._memory: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'misses': 0,
+            'writes': 0,
+        }
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        Normalize text so trivially different copies share a cache entry.
+
+        Applies NFKC (full-width to half-width), trims and collapses whitespace.
+        """
+        text = unicodedata.normalize('NFKC', text or '')
+        return _WHITESPACE_RE.sub(' ', text).strip()
+
+    @classmethod
+    def make_key(cls, model_name: str, model_version: str, text: str) -> str:
+        """
+        Build the cache key for a text.
+
+        Args:
+            model_name: Embedding model configuration name
+            model_version: Provider model identifier
+            text: Raw text
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        payload = '\x1f'.join([model_name or '', model_version or '', cls.normalize_text(text)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def to_bytes(vector) -> bytes:
+        """Encode a vector as little-endian float32 bytes."""
+        return np.asarray(vector, dtype='<f4').tobytes()
+
+    @staticmethod
+    def from_bytes(data) -> np.ndarray:
+        """Decode little-endian float32 bytes into a vector."""
+        return np.frombuffer(bytes(data), dtype='<f4')
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the LRU, evicting the oldest entries. Caller holds the lock."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model_name: str, model_version: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up vectors for texts.
+
+        Args:
+            model_name: Embedding model configuration name
+            model_version: Provider model identifier
+            texts: Texts to look up
+
+        Returns:
+            One float32 vector or None per text, in input order
+        """
+        keys = [self.make_key(model_name, model_version, text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+
+        missing = [key for key in set(keys) if key not in found]
+        db_found = {}
+        if missing:
+            for i in range(0, len(missing), 500):
+                for cache_key, data in EmbeddingCacheEntry.objects.filter(
+                    cache_key__in=missing[i:i + 500]
+                ).values_list('cache_key', 'vector'):
+                    db_found[cache_key] = self.from_bytes(data)
+
+        with self._lock:
+            for key, vector in db_found.items():
+                self._remember(key, vector)
+            for key in keys:
+                if key in found:
+                    self._counters['memory_hits'] += 1
+                elif key in db_found:
+                    self._counters['db_hits'] += 1
+                else:
+                    self._counters['misses'] += 1
+
+        found.update(db_found)
+        return [found.get(key) for key in keys]
+
+    def set_many(self, model_name: str, model_version: str, texts: List[str], vectors: List):
+        """
+        Store vectors for texts. Empty vectors are skipped.
+
+        Args:
+            model_name: Embedding model configuration name
+            model_version: Provider model identifier
+            texts: Texts the vectors were computed from
+            vectors: Embedding vectors, parallel to texts
+        """
+        entries = {}
+        for text, vector in zip(texts, vectors):
+            if vector is None or len(vector) == 0:
+                continue
+            key = self.make_key(model_name, model_version, text)
+            entries[key] = np.asarray(vector, dtype=np.float32)
+
+        if not entries:
+            return
+
+        with self._lock:
+            for key, vector in entries.items():
+                self._remember(key, vector)
+            self._counters['writes'] += len(entries)
+
+        EmbeddingCacheEntry.objects.bulk_create(
+            [
+                EmbeddingCacheEntry(
+                    cache_key=key,
+                    model_name=model_name,
+                    model_version=model_version or '',
+                    dimension=len(vector),
+                    vector=self.to_bytes(vector),
+                )
+                for key, vector in entries.items()
+            ],
+            batch_size=500,
+            ignore_conflicts=True
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get hit/miss counters for this process.
+
+        Returns:
+            Dictionary with counters, hit rate and LRU size
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_items'] = len(self._memory)
+            stats['memory_capacity'] = self.max_memory_items
+
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self, persistent: bool = False):
+        """
+        Clear the in-memory LRU and reset counters.
+
+        Args:
+            persistent: Also delete all database entries
+        """
+        with self._lock:
+            self._memory.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+        if persistent:
+            EmbeddingCacheEntry.objects.all().delete()
+
+
+# Process-wide cache instance
+embedding_cache = EmbeddingCache()
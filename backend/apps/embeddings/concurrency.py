@@ -0,0 +1,268 @@
+"""
+Concurrent batch encoding for embedding providers.
+
+Batches are sent through a bounded thread pool. Per-provider limits on
+in-flight requests and requests per minute are shared by every caller in
+the process. Transient errors are retried with exponential backoff and
+jitter, and a batch that still fails is bisected so one bad text does not
+cost a request per text. A single text rejected as too long for the model
+context is re-split and its pieces pooled (see BatchPlanner.resplit).
+"""
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .batching import BatchPlanner
+
+
+# Exception class names (anywhere in the cause/context chain) worth retrying
+TRANSIENT_ERROR_NAMES = {
+    'RateLimitError',
+    'APITimeoutError',
+    'APIConnectionError',
+    'InternalServerError',
+    'TimeoutException',
+    'ConnectError',
+    'ReadTimeout',
+    'ConnectionError',
+    'TimeoutError',
+}
+
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Error messages of inputs over the model context length, as worded by
+# OpenAI-compatible APIs ("maximum context length", "less than 512 tokens", ...)
+_CONTEXT_LENGTH_RE = re.compile(
+    r'context.length|too many tokens|input.{0,40}too long|less than \d+ tokens'
+    r'|exceeds?.{0,40}tokens|maximum.{0,40}tokens',
+    re.IGNORECASE
+)
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Check whether an encoding error is worth retrying.
+
+    Providers wrap client errors in RuntimeError, so the whole
+    ``__cause__``/``__context__`` chain is inspected.
+
+    Args:
+        error: Raised exception
+
+    Returns:
+        True for rate limits, timeouts, connection and 5xx errors
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if type(error).__name__ in TRANSIENT_ERROR_NAMES:
+            return True
+        if getattr(error, 'status_code', None) in TRANSIENT_STATUS_CODES:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def is_context_length_error(error: BaseException) -> bool:
+    """
+    Check whether an encoding error rejects an input as too long.
+
+    Args:
+        error: Raised exception
+
+    Returns:
+        True if any error of the cause/context chain reports an input over
+        the model context length
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if getattr(error, 'code', None) == 'context_length_exceeded':
+            return True
+        if _CONTEXT_LENGTH_RE.search(str(error)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting requests per minute.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Allowed rate; None or 0 disables limiting
+        """
+        self.rate = (requests_per_minute or 0) / 60.0
+        self.capacity = max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConcurrentEncoder:
+    """
+    Encode many batches concurrently with one provider.
+    """
+
+    # Shared per-provider limits: provider key -> (semaphore, rate limiter)
+    _limits: Dict[str, tuple] = {}
+    _limits_lock = threading.Lock()
+
+    def __init__(
+        self,
+        provider,
+        max_in_flight: int = 4,
+        requests_per_minute: Optional[float] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0
+    ):
+        """
+        Initialize the encoder.
+
+        Args:
+            provider: Provider instance
+            max_in_flight: Maximum concurrent requests to this provider
+            requests_per_minute: Optional request rate limit for this provider
+            max_retries: Retries per request for transient errors
+            backoff_base: First retry delay in seconds (doubles per attempt)
+            backoff_max: Maximum retry delay in seconds
+        """
+        self.provider = provider
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        key = f"{provider.__class__.__name__}:{provider.model_name}"
+        with self._limits_lock:
+            if key not in self._limits:
+                self._limits[key] = (
+                    threading.BoundedSemaphore(self.max_in_flight),
+                    RateLimiter(requests_per_minute),
+                )
+            self._semaphore, self._rate_limiter = self._limits[key]
+
+    @classmethod
+    def for_provider(cls, provider) -> 'ConcurrentEncoder':
+        """
+        Create an encoder using limits from the provider's model_params.
+
+        Recognized keys: max_concurrency, requests_per_minute, max_retries,
+        backoff_base, backoff_max.
+
+        Args:
+            provider: Provider instance
+
+        Returns:
+            ConcurrentEncoder instance
+        """
+        params = provider.model_params or {}
+        return cls(
+            provider,
+            max_in_flight=params.get('max_concurrency', 4),
+            requests_per_minute=params.get('requests_per_minute'),
+            max_retries=params.get('max_retries', 3),
+            backoff_base=params.get('backoff_base', 0.5),
+            backoff_max=params.get('backoff_max', 30.0),
+        )
+
+    @classmethod
+    def reset_limits(cls):
+        """Forget shared per-provider limits (e.g. after config changes)."""
+        with cls._limits_lock:
+            cls._limits.clear()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _request(self, texts: List[str]) -> List[List[float]]:
+        """Send one request, retrying transient errors with backoff."""
+        attempt = 0
+        while True:
+            self._rate_limiter.acquire()
+            with self._semaphore:
+                try:
+                    embeddings = self.provider.encode(texts)
+                    if len(embeddings) != len(texts):
+                        raise RuntimeError(
+                            f"Provider returned {len(embeddings)} embeddings for {len(texts)} texts"
+                        )
+                    return embeddings
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_transient_error(e):
+                        raise
+            time.sleep(self._backoff_delay(attempt))
+            attempt += 1
+
+    def encode_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Encode one batch, bisecting it on failure.
+
+        A single text rejected as too long is re-split, and the embeddings
+        of its pieces are pooled into one.
+
+        Args:
+            texts: Texts to encode
+
+        Returns:
+            Embeddings in input order; [] for texts that could not be encoded
+        """
+        if not texts:
+            return []
+
+        try:
+            # Providers may return a 2-D array; rows are concatenated below
+            return list(self._request(texts))
+        except Exception as e:
+            if len(texts) == 1:
+                pieces = BatchPlanner.resplit(texts[0]) if is_context_length_error(e) else []
+                if pieces:
+                    return [BatchPlanner.pool_chunks(pieces, self.encode_batch(pieces))]
+                print(f"Error encoding text: {str(e)}")
+                # Add empty embedding to maintain order
+                return [[]]
+
+        middle = len(texts) // 2
+        return self.encode_batch(texts[:middle]) + self.encode_batch(texts[middle:])
+
+    def encode_batches(self, batches: List[List[str]]) -> List[List[List[float]]]:
+        """
+        Encode several batches concurrently.
+
+        Args:
+            batches: Batches of texts
+
+        Returns:
+            One list of embeddings per batch, in input order
+        """
+        if len(batches) <= 1 or self.max_in_flight == 1:
+            return [self.encode_batch(batch) for batch in batches]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batches))) as executor:
+            return list(executor.map(self.encode_batch, batches))
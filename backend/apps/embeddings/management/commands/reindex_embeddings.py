@@ -0,0 +1,201 @@
+"""
+Django management command to (re)generate feature embeddings.
+
+Replaces the generate/regenerate/cleanup_embeddings scripts.
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.embeddings.services import EmbeddingServiceFactory
+from apps.matching.vector_index import get_feature_index
+from apps.products.embedding_service import FeatureEmbeddingService
+from apps.products.models import Feature, FeatureEmbedding
+
+
+class Command(BaseCommand):
+    help = 'Re-embed product features in batches (incremental, full or missing-only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=['incremental', 'full', 'missing'],
+            default='incremental',
+            help='incremental: missing or changed text; full: every feature; missing: no embedding yet'
+        )
+        parser.add_argument(
+            '--config-id',
+            default=None,
+            help='Embedding model configuration ID (default configuration if omitted)'
+        )
+        parser.add_argument(
+            '--product-id',
+            action='append',
+            default=None,
+            help='Only reindex features of this product (repeatable)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of feature chunks encoded and written in parallel'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.BASE_DIR, 'logs', 'reindex_embeddings.json'),
+            help='Checkpoint file used by --resume'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Resume the interrupted run recorded in the checkpoint file'
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete embeddings of inactive features and products first'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be done'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        if options['config_id']:
+            provider = EmbeddingServiceFactory.get_provider_by_id(options['config_id'])
+        else:
+            provider = EmbeddingServiceFactory.get_default_provider()
+
+        checkpoint_path = options['checkpoint']
+        done_since = None
+        if options['resume']:
+            checkpoint = self.load_checkpoint(checkpoint_path)
+            if checkpoint['model_name'] != provider.model_name:
+                raise CommandError(
+                    f"Checkpoint was written for model {checkpoint['model_name']}, "
+                    f"not {provider.model_name}"
+                )
+            options['mode'] = checkpoint['mode']
+            options['product_id'] = checkpoint['product_ids']
+            done_since = datetime.fromisoformat(checkpoint['started_at'])
+            self.stdout.write(f"Resuming {options['mode']} run started at {checkpoint['started_at']}")
+        else:
+            checkpoint = {
+                'mode': options['mode'],
+                'model_name': provider.model_name,
+                'product_ids': options['product_id'],
+                'started_at': timezone.now().isoformat(),
+            }
+
+        self.stdout.write(f"Model: {provider.model_name} (dimension {provider.dimension})")
+        self.stdout.write(f"Mode: {options['mode']}")
+
+        if options['cleanup']:
+            self.cleanup(options['dry_run'])
+
+        features = Feature.objects.filter(
+            is_active=True,
+            product__is_active=True
+        ).select_related('product').order_by('id')
+        if options['product_id']:
+            features = features.filter(product_id__in=options['product_id'])
+
+        service = FeatureEmbeddingService(provider)
+        regenerate = options['mode'] == 'full'
+        only_changed = options['mode'] == 'incremental'
+
+        if options['dry_run']:
+            pending, skipped = service.select_pending(
+                list(features),
+                regenerate=regenerate,
+                only_changed=only_changed,
+                done_since=done_since
+            )
+            self.stdout.write(f"Would embed {len(pending)} feature(s), skip {len(skipped)}")
+            return
+
+        if not options['resume']:
+            self.save_checkpoint(checkpoint_path, checkpoint)
+
+        started = time.monotonic()
+        results = service.generate(
+            features,
+            regenerate=regenerate,
+            only_changed=only_changed,
+            done_since=done_since,
+            workers=options['workers'],
+            progress_callback=self.make_progress_reporter(started)
+        )
+
+        throughput = results['throughput']
+        self.stdout.write(self.style.SUCCESS(
+            f"Embedded {len(results['success'])}, failed {len(results['failed'])}, "
+            f"skipped {len(results['skipped'])} in {self.format_seconds(throughput['elapsed_seconds'])} "
+            f"({throughput['features_per_second']} features/s; "
+            f"encode {throughput['encode_seconds']}s, write {throughput['write_seconds']}s)"
+        ))
+
+        if results['failed']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(results['failed'])} feature(s) failed; run again with --resume to retry them"
+            ))
+        elif os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        if getattr(settings, 'MATCHING_INDEX_MMAP', False):
+            # Publish the new shared index now instead of on the first search
+            index = get_feature_index(provider.dimension, provider.model_name)
+            self.stdout.write(f"Shared feature index version: {index.version}")
+
+    def cleanup(self, dry_run: bool):
+        """Delete embeddings of inactive features and products."""
+        stale = FeatureEmbedding.objects.filter(
+            Q(feature__is_active=False) | Q(feature__product__is_active=False)
+        )
+        if dry_run:
+            self.stdout.write(f"Would delete {stale.count()} stale embedding(s)")
+            return
+
+        deleted, _ = stale.delete()
+        self.stdout.write(f"Deleted {deleted} stale embedding(s)")
+
+    def make_progress_reporter(self, started: float):
+        """Build a progress callback printing done/total, rate and ETA."""
+        def report(done: int, total: int):
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed > 0 else 0.0
+            eta = (total - done) / rate if rate > 0 else 0.0
+            self.stdout.write(
+                f"  {done}/{total} ({done * 100 // total if total else 100}%) "
+                f"{rate:.1f} features/s, ETA {self.format_seconds(eta)}"
+            )
+        return report
+
+    @staticmethod
+    def format_seconds(seconds: float) -> str:
+        """Format seconds as m:ss."""
+        seconds = int(round(seconds))
+        return f"{seconds // 60}:{seconds % 60:02d}"
+
+    @staticmethod
+    def load_checkpoint(path: str) -> dict:
+        """Read the checkpoint file."""
+        if not os.path.exists(path):
+            raise CommandError(f"No checkpoint found at {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def save_checkpoint(path: str, checkpoint: dict):
+        """Write the checkpoint file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-17 13:10
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeddings', '0002_embeddingmodelconfig_base_url_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingCacheEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('model_name', models.CharField(db_index=True, max_length=100)),
+                ('model_version', models.CharField(blank=True, max_length=100)),
+                ('dimension', models.IntegerField()),
+                ('vector', models.BinaryField()),
+            ],
+            options={
+                'verbose_name': 'Embedding Cache Entry',
+                'verbose_name_plural': 'Embedding Cache Entries',
+                'db_table': 'embedding_cache',
+            },
+        ),
+    ]
@@ -132,3 +132,21 @@ class EmbeddingModelConfig(TimeStampedModel):
             import warnings
             warnings.warn(f"Failed to encrypt API key, storing as plain text: {str(e)}")
             self.api_key_encrypted = api_key
+
+
+class EmbeddingCacheEntry(TimeStampedModel):
+    """Cached embedding vector keyed by model and normalized text hash."""
+
+    cache_key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100, db_index=True)
+    model_version = models.CharField(max_length=100, blank=True)
+    dimension = models.IntegerField()
+    vector = models.BinaryField()  # Little-endian float32
+
+    class Meta:
+        db_table = 'embedding_cache'
+        verbose_name = 'Embedding Cache Entry'
+        verbose_name_plural = 'Embedding Cache Entries'
+
+    def __str__(self):
+        return f"{self.model_name} - {self.cache_key[:12]}"
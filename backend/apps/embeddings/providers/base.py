@@ -1,6 +1,7 @@
 """
 Base class for embedding providers.
 """
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any
 
@@ -37,10 +38,33 @@ class BaseEmbeddingProvider(ABC):
             texts: List of text strings to encode
 
         Returns:
-            List of embedding vectors (each is a list of floats)
+            List of embedding vectors (each is a list of floats), or a
+            (len(texts), dimension) float32 array
         """
         pass
 
+    async def aencode(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for a list of texts without blocking the event loop.
+
+        Providers with a native async client override this; the default
+        runs encode() in a worker thread.
+
+        Args:
+            texts: List of text strings to encode
+
+        Returns:
+            Embedding vectors, as returned by encode()
+        """
+        return await asyncio.to_thread(self.encode, texts)
+
+    def warm_up(self):
+        """
+        Prepare the provider before its first request (e.g. load a local model).
+
+        Nothing to do by default.
+        """
+
     @abstractmethod
     def test_connection(self) -> bool:
         """
@@ -62,7 +86,7 @@ class BaseEmbeddingProvider(ABC):
             Embedding vector (list of floats)
         """
         result = self.encode([text])
-        return result[0] if result else []
+        return result[0] if len(result) > 0 else []
 
     def validate_embedding(self, embedding: List[float]) -> bool:
         """
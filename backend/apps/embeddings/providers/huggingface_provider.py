@@ -1,15 +1,66 @@
 """
 Sentence-Transformers embedding provider implementation.
+
+Loaded models (and multi-process pools) are shared by every provider
+instance in the process, so re-creating a provider after a configuration
+change does not reload the model.
 """
-from typing import List, Dict, Any
+import atexit
+import threading
+from typing import List, Dict, Any, Tuple
+
 import numpy as np
+from django.conf import settings
+
 from .base import BaseEmbeddingProvider
 
+# Loaded models: (model_path, device) -> SentenceTransformer
+_models: Dict[Tuple[str, str], Any] = {}
+# Multi-process pools: (model_path, workers) -> pool
+_pools: Dict[Tuple[str, int], Any] = {}
+_models_lock = threading.Lock()
+_torch_configured = False
+
+
+def _configure_torch():
+    """Apply the EMBEDDING_TORCH_THREADS settings once per process."""
+    global _torch_configured
+    if _torch_configured:
+        return
+    _torch_configured = True
+
+    import torch
+
+    threads = getattr(settings, 'EMBEDDING_TORCH_THREADS', 0)
+    if threads:
+        torch.set_num_threads(threads)
+    interop_threads = getattr(settings, 'EMBEDDING_TORCH_INTEROP_THREADS', 0)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Only allowed before any parallel work has started
+            print(f"Could not set torch interop threads: {str(e)}")
+
+
+def _stop_pools():
+    from sentence_transformers import SentenceTransformer
+
+    with _models_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        SentenceTransformer.stop_multi_process_pool(pool)
+
 
 class SentenceTransformersProvider(BaseEmbeddingProvider):
     """
     Sentence-Transformers embedding model provider.
     Supports local and HuggingFace models.
+
+    Recognized model_params keys: model_path, device, batch_size (texts
+    per forward pass, default 32) and num_workers (CPU processes for
+    large inputs, default 0: encode in this process).
     """
 
     def __init__(self, config: Dict[str, Any]):
@@ -19,49 +70,77 @@ class SentenceTransformersProvider(BaseEmbeddingProvider):
         self._model = None
         self.model_path = self.model_params.get('model_path', 'all-MiniLM-L6-v2')
         self.device = self.model_params.get('device', 'cpu')
+        self.batch_size = int(self.model_params.get('batch_size', 32))
+        self.num_workers = int(self.model_params.get('num_workers', 0))
 
     def _load_model(self):
         """
-        Lazy load the sentence-transformers model.
+        Lazy load the sentence-transformers model, shared across instances.
         """
-        if self._model is None:
-            try:
-                from sentence_transformers import SentenceTransformer
-                self._model = SentenceTransformer(self.model_path)
-                if self.device:
-                    self._model.to(self.device)
-            except ImportError:
-                raise ImportError(
-                    "sentence-transformers is not installed. "
-                    "Install it with: pip install sentence-transformers"
-                )
-
-    def encode(self, texts: List[str]) -> List[List[float]]:
+        if self._model is not None:
+            return
+
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError(
+                "sentence-transformers is not installed. "
+                "Install it with: pip install sentence-transformers"
+            )
+
+        key = (self.model_path, self.device or 'cpu')
+        with _models_lock:
+            if key not in _models:
+                _configure_torch()
+                _models[key] = SentenceTransformer(self.model_path, device=self.device or None)
+            self._model = _models[key]
+
+    def _get_pool(self):
+        """Get the CPU multi-process pool of this model, starting it on first use."""
+        key = (self.model_path, self.num_workers)
+        with _models_lock:
+            if key not in _pools:
+                if not _pools:
+                    atexit.register(_stop_pools)
+                _pools[key] = self._model.start_multi_process_pool(['cpu'] * self.num_workers)
+            return _pools[key]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings using sentence-transformers.
 
+        Inputs larger than one batch are spread over the multi-process
+        pool when num_workers is set.
+
         Args:
             texts: List of text strings to encode
 
         Returns:
-            List of embedding vectors
+            (len(texts), dimension) float32 array
         """
         try:
             self._load_model()
 
-            # Encode texts
+            pool = None
+            if self.num_workers > 1 and len(texts) > self.batch_size:
+                pool = self._get_pool()
+
             embeddings = self._model.encode(
                 texts,
+                batch_size=self.batch_size,
+                pool=pool,
                 convert_to_numpy=True,
                 show_progress_bar=False
             )
-
-            # Convert to list of lists
-            return embeddings.tolist()
+            return np.asarray(embeddings, dtype=np.float32)
 
         except Exception as e:
             raise RuntimeError(f"Sentence-Transformers encoding failed: {str(e)}")
 
+    def warm_up(self):
+        """Load the model and run one forward pass so the first request is not slow."""
+        self.encode(["warm up"])
+
     def test_connection(self) -> bool:
         """
         Test if model can be loaded and used.
@@ -86,5 +165,7 @@ class SentenceTransformersProvider(BaseEmbeddingProvider):
         info.update({
             'model_path': self.model_path,
             'device': self.device,
+            'batch_size': self.batch_size,
+            'num_workers': self.num_workers,
         })
         return info
@@ -2,9 +2,12 @@
 OpenAI-compatible API embedding provider implementation.
 Supports SiliconFlow, ZhipuAI, and other OpenAI-compatible APIs.
 """
+import asyncio
+import weakref
 from typing import List, Dict, Any
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from .base import BaseEmbeddingProvider
+from ..transport import get_async_http_client, get_http_client
 
 
 class OpenAICompatibleProvider(BaseEmbeddingProvider):
@@ -24,10 +27,19 @@ class OpenAICompatibleProvider(BaseEmbeddingProvider):
         # Get custom base URL from config
         base_url = config.get('base_url', 'https://api.openai.com/v1')
 
+        # Connections are pooled per base URL and survive provider re-creation.
+        # SDK retries are off: ConcurrentEncoder retries 429/5xx itself, within
+        # the provider's rate limit and backoff
         self.client = OpenAI(
             api_key=api_key,
-            base_url=base_url
+            base_url=base_url,
+            http_client=get_http_client(base_url, self.model_params),
+            max_retries=0
         )
+        self._api_key = api_key
+        self.base_url = base_url
+        # Async clients, one per event loop (see aencode)
+        self._async_clients = weakref.WeakKeyDictionary()
 
         # Get model from params or use default
         self.model = self.model_params.get('model', self.model_name)
@@ -56,6 +68,40 @@ class OpenAICompatibleProvider(BaseEmbeddingProvider):
         except Exception as e:
             raise RuntimeError(f"{self.config.get('provider_name', 'OpenAI-compatible')} encoding failed: {str(e)}")
 
+    def _get_async_client(self) -> AsyncOpenAI:
+        """Get the async client of the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=self._api_key,
+                base_url=self.base_url,
+                http_client=get_async_http_client(self.base_url, self.model_params),
+                max_retries=0
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def aencode(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings using OpenAI-compatible API on the event loop.
+
+        Args:
+            texts: List of text strings to encode
+
+        Returns:
+            List of embedding vectors
+        """
+        try:
+            response = await self._get_async_client().embeddings.create(
+                input=texts,
+                model=self.model
+            )
+            return [item.embedding for item in response.data]
+
+        except Exception as e:
+            raise RuntimeError(f"{self.config.get('provider_name', 'OpenAI-compatible')} encoding failed: {str(e)}")
+
     def test_connection(self) -> bool:
         """
         Test connection to OpenAI-compatible API.
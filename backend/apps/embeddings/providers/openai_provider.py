@@ -1,9 +1,14 @@
 """
 OpenAI embedding provider implementation.
 """
+import asyncio
+import weakref
 from typing import List, Dict, Any
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from .base import BaseEmbeddingProvider
+from ..transport import get_async_http_client, get_http_client
+
+OPENAI_BASE_URL = 'https://api.openai.com/v1'
 
 
 class OpenAIEmbeddingProvider(BaseEmbeddingProvider):
@@ -20,7 +25,18 @@ class OpenAIEmbeddingProvider(BaseEmbeddingProvider):
         if not api_key:
             raise ValueError("OpenAI API key is required")
 
-        self.client = OpenAI(api_key=api_key)
+        # Connections are pooled per base URL and survive provider re-creation.
+        # SDK retries are off: ConcurrentEncoder retries 429/5xx itself, within
+        # the provider's rate limit and backoff
+        self.client = OpenAI(
+            api_key=api_key,
+            http_client=get_http_client(OPENAI_BASE_URL, self.model_params),
+            max_retries=0
+        )
+        self._api_key = api_key
+        self.base_url = OPENAI_BASE_URL
+        # Async clients, one per event loop (see aencode)
+        self._async_clients = weakref.WeakKeyDictionary()
 
         # Get model from params or use default
         self.model = self.model_params.get('model', 'text-embedding-3-small')
@@ -49,6 +65,39 @@ class OpenAIEmbeddingProvider(BaseEmbeddingProvider):
         except Exception as e:
             raise RuntimeError(f"OpenAI encoding failed: {str(e)}")
 
+    def _get_async_client(self) -> AsyncOpenAI:
+        """Get the async client of the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=self._api_key,
+                http_client=get_async_http_client(OPENAI_BASE_URL, self.model_params),
+                max_retries=0
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def aencode(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings using OpenAI API on the event loop.
+
+        Args:
+            texts: List of text strings to encode
+
+        Returns:
+            List of embedding vectors
+        """
+        try:
+            response = await self._get_async_client().embeddings.create(
+                input=texts,
+                model=self.model
+            )
+            return [item.embedding for item in response.data]
+
+        except Exception as e:
+            raise RuntimeError(f"OpenAI encoding failed: {str(e)}")
+
     def test_connection(self) -> bool:
         """
         Test connection to OpenAI API.
@@ -74,6 +123,6 @@ class OpenAIEmbeddingProvider(BaseEmbeddingProvider):
         info = super().get_model_info()
         info.update({
             'api_model': self.model,
-            'api_endpoint': 'https://api.openai.com/v1',
+            'api_endpoint': OPENAI_BASE_URL,
         })
         return info
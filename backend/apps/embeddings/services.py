@@ -1,9 +1,19 @@
 """
 Embedding service factory and management.
 """
-from typing import Dict, List, Any, Optional
+import hashlib
+import time
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+from django.conf import settings
 from django.core.cache import cache
-from .models import EmbeddingModelConfig
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .batching import BatchPlanner
+from .cache import EmbeddingCache, embedding_cache
+from .concurrency import ConcurrentEncoder, is_context_length_error
+from .models import EmbeddingModelConfig, EmbeddingCacheEntry
+from .transport import transport_stats
 from .providers.openai_provider import OpenAIEmbeddingProvider
 from .providers.huggingface_provider import SentenceTransformersProvider
 from .providers.openai_compatible_provider import OpenAICompatibleProvider
@@ -25,9 +35,12 @@ class EmbeddingServiceFactory:
         'qwen': OpenAICompatibleProvider,  # Qwen (OpenAI-compatible)
     }
 
-    # Cache for provider instances
+    # Cache for provider instances, keyed by (config id, config updated_at)
     _provider_cache = {}
 
+    # Cached default configuration as (config or None, expiry on time.monotonic())
+    _default_config_cache: Optional[Tuple[Optional[EmbeddingModelConfig], float]] = None
+
     @classmethod
     def register_provider(cls, provider_type: str, provider_class):
         """
@@ -44,6 +57,10 @@ class EmbeddingServiceFactory:
         """
         Create a provider instance from configuration.
 
+        Cached instances are keyed by the configuration's id and
+        ``updated_at``, so a provider built from an older version of a
+        configuration is replaced as soon as the configuration is saved.
+
         Args:
             config: EmbeddingModelConfig instance
             use_cache: Whether to cache and reuse provider instances
@@ -55,8 +72,9 @@ class EmbeddingServiceFactory:
             ValueError: If provider type is not supported
         """
         # Check cache first
-        if use_cache and config.id in cls._provider_cache:
-            return cls._provider_cache[config.id]
+        key = (config.id, config.updated_at)
+        if use_cache and key in cls._provider_cache:
+            return cls._provider_cache[key]
 
         # Get provider class
         provider_type = config.provider
@@ -86,23 +104,42 @@ class EmbeddingServiceFactory:
         # Create provider instance
         provider = provider_class(config_dict)
 
-        # Cache instance
+        # Cache instance, dropping providers of earlier versions of the config
         if use_cache:
-            cls._provider_cache[config.id] = provider
+            for stale in [k for k in list(cls._provider_cache) if k[0] == config.id and k != key]:
+                cls._provider_cache.pop(stale, None)
+            cls._provider_cache[key] = provider
 
         return provider
 
     @classmethod
-    def get_default_provider(cls):
+    def get_default_config(cls) -> Optional[EmbeddingModelConfig]:
         """
-        Get the default embedding service provider.
+        Get the default embedding model configuration.
 
-        Returns:
-            Default provider instance
+        The lookup is cached in the process; saving or deleting a
+        configuration (or set_default) invalidates it, and it expires after
+        EMBEDDING_CONFIG_CACHE_TTL seconds to pick up changes made by other
+        processes.
 
-        Raises:
-            ValueError: If no default configuration is found
+        Returns:
+            The default active configuration, else the first active one, else None
         """
+        cached = cls._default_config_cache
+        now = time.monotonic()
+        if cached is not None and now < cached[1]:
+            return cached[0]
+
+        config = cls._load_default_config()
+        cls._default_config_cache = (
+            config,
+            now + getattr(settings, 'EMBEDDING_CONFIG_CACHE_TTL', 30)
+        )
+        return config
+
+    @staticmethod
+    def _load_default_config() -> Optional[EmbeddingModelConfig]:
+        """Query the default configuration (see get_default_config)."""
         # Try to get default config
         config = EmbeddingModelConfig.objects.filter(
             is_default=True,
@@ -115,6 +152,21 @@ class EmbeddingServiceFactory:
                 is_active=True
             ).first()
 
+        return config
+
+    @classmethod
+    def get_default_provider(cls):
+        """
+        Get the default embedding service provider.
+
+        Returns:
+            Default provider instance
+
+        Raises:
+            ValueError: If no default configuration is found
+        """
+        config = cls.get_default_config()
+
         if not config:
             raise ValueError(
                 "No active embedding model configuration found. "
@@ -123,6 +175,24 @@ class EmbeddingServiceFactory:
 
         return cls.create_provider(config)
 
+    @classmethod
+    def warm_up(cls) -> bool:
+        """
+        Create the default provider and let it prepare, e.g. load a local model.
+
+        Returns:
+            True if the provider is ready, False if warm-up failed
+        """
+        try:
+            provider = cls.get_default_provider()
+            started = time.perf_counter()
+            provider.warm_up()
+            print(f"Embedding provider {provider.model_name} warmed up in {time.perf_counter() - started:.1f}s")
+            return True
+        except Exception as e:
+            print(f"Embedding provider warm-up failed: {str(e)}")
+            return False
+
     @classmethod
     def get_provider_by_id(cls, config_id: str):
         """
@@ -150,32 +220,114 @@ class EmbeddingServiceFactory:
         """
         return EmbeddingModelConfig.objects.filter(is_active=True)
 
+    @classmethod
+    def invalidate_config_cache(cls):
+        """Forget the cached default configuration."""
+        cls._default_config_cache = None
+
     @classmethod
     def clear_cache(cls):
         """
-        Clear the provider cache.
+        Clear the provider cache and the cached default configuration.
         Useful when configurations are updated.
         """
         cls._provider_cache.clear()
+        cls.invalidate_config_cache()
+        ConcurrentEncoder.reset_limits()
 
     @classmethod
-    def encode_texts(cls, texts: List[str], config_id: Optional[str] = None) -> List[List[float]]:
+    def get_cache_identity(cls, provider) -> Tuple[str, str]:
+        """
+        Get the (model_name, model_version) pair that scopes cached vectors.
+
+        The version names the model the provider actually calls (its API
+        model, or the model path of local providers), tagged with a hash of
+        the provider type, endpoint and model, so configurations sharing a
+        model_name never read each other's vectors.
+
+        Args:
+            provider: Provider instance
+
+        Returns:
+            Tuple of configuration model name and model version
+        """
+        model = str(
+            getattr(provider, 'model', None)
+            or getattr(provider, 'model_path', None)
+            or provider.model_name
+        )
+        endpoint = '\x1f'.join([
+            provider.__class__.__name__,
+            (getattr(provider, 'base_url', None) or '').rstrip('/'),
+            model,
+        ])
+        digest = hashlib.sha1(endpoint.encode('utf-8')).hexdigest()[:12]
+        # Fits EmbeddingCacheEntry.model_version; the digest keeps it unique
+        return provider.model_name, f"{model[:80]}@{digest}"
+
+    @classmethod
+    def _resolve_provider(cls, config_id: Optional[str] = None):
+        """Get the provider for a configuration ID, or the default provider."""
+        if config_id:
+            return cls.get_provider_by_id(config_id)
+        return cls.get_default_provider()
+
+    @classmethod
+    def encode_texts(
+        cls,
+        texts: List[str],
+        config_id: Optional[str] = None,
+        use_cache: bool = True
+    ) -> List[List[float]]:
         """
         Encode texts using specified or default provider.
 
+        Texts already in the embedding cache are not sent to the provider.
+
         Args:
             texts: List of texts to encode
             config_id: Optional configuration ID (uses default if not provided)
+            use_cache: Whether to read and write the embedding cache
 
         Returns:
             List of embedding vectors
         """
-        if config_id:
-            provider = cls.get_provider_by_id(config_id)
-        else:
-            provider = cls.get_default_provider()
+        return cls.encode_with_provider(cls._resolve_provider(config_id), texts, use_cache)
+
+    @classmethod
+    def encode_with_provider(cls, provider, texts: List[str], use_cache: bool = True) -> List[List[float]]:
+        """
+        Encode texts with a given provider, going through the embedding cache.
 
-        return provider.encode(texts)
+        Args:
+            provider: Provider instance
+            texts: List of texts to encode
+            use_cache: Whether to read and write the embedding cache
+
+        Returns:
+            List of embedding vectors
+        """
+        if not use_cache:
+            return cls._encode_planned(provider, texts, concurrent=False)
+
+        model_name, model_version = cls.get_cache_identity(provider)
+        cached = embedding_cache.get_many(model_name, model_version, texts)
+        results = [None if vector is None else vector.tolist() for vector in cached]
+
+        # Encode each distinct missing text once
+        missing_texts = cls._distinct_missing_texts(texts, cached)
+        if missing_texts:
+            embeddings = cls._encode_planned(provider, missing_texts, concurrent=False)
+            embedding_cache.set_many(model_name, model_version, missing_texts, embeddings)
+            encoded = {
+                EmbeddingCache.normalize_text(text): embedding
+                for text, embedding in zip(missing_texts, embeddings)
+            }
+            for i, text in enumerate(texts):
+                if results[i] is None:
+                    results[i] = cls._as_list(encoded[EmbeddingCache.normalize_text(text)])
+
+        return results
 
     @classmethod
     def encode_single_text(cls, text: str, config_id: Optional[str] = None) -> List[float]:
@@ -193,38 +345,185 @@ class EmbeddingServiceFactory:
         return embeddings[0] if embeddings else []
 
     @classmethod
-    def encode_batch_text(cls, texts: List[str], config_id: Optional[str] = None, batch_size: int = 50) -> List[List[float]]:
+    def encode_batch_text(
+        cls,
+        texts: List[str],
+        config_id: Optional[str] = None,
+        batch_size: Optional[int] = None
+    ) -> List[List[float]]:
         """
         Encode texts in batches to avoid API limits.
 
+        The embedding cache is checked for all texts first; only misses are
+        batched and sent to the provider, several batches at a time (see
+        ConcurrentEncoder for the per-provider limits read from model_params).
+        Batches are packed by estimated tokens and long texts are chunked
+        (see BatchPlanner). Texts that cannot be encoded get an empty embedding.
+
         Args:
             texts: List of texts to encode
             config_id: Optional configuration ID (uses default if not provided)
-            batch_size: Maximum number of texts to process in each batch
+            batch_size: Optional cap on texts per request (default: model_params max_batch_size)
 
         Returns:
             List of embedding vectors
         """
-        all_embeddings = []
+        return cls.encode_batch_with_provider(cls._resolve_provider(config_id), texts, batch_size)
+
+    @classmethod
+    def encode_batch_with_provider(
+        cls,
+        provider,
+        texts: List[str],
+        batch_size: Optional[int] = None
+    ) -> List[List[float]]:
+        """
+        Encode texts in batches with a given provider (see encode_batch_text).
 
-        # Process in batches
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            try:
-                embeddings = cls.encode_texts(batch, config_id)
-                all_embeddings.extend(embeddings)
-            except Exception as e:
-                # If batch fails, try individual items with smaller batches
-                for text in batch:
-                    try:
-                        embedding = cls.encode_single_text(text, config_id)
-                        all_embeddings.append(embedding)
-                    except Exception as item_error:
-                        print(f"Error encoding text: {str(item_error)}")
-                        # Add empty embedding to maintain order
-                        all_embeddings.append([])
+        Args:
+            provider: Provider instance
+            texts: List of texts to encode
+            batch_size: Optional cap on texts per request
 
-        return all_embeddings
+        Returns:
+            List of embedding vectors, [] for texts that could not be encoded
+        """
+        model_name, model_version = cls.get_cache_identity(provider)
+
+        cached = embedding_cache.get_many(model_name, model_version, texts)
+        missing_texts = cls._distinct_missing_texts(texts, cached)
+
+        encoded = {}
+        if missing_texts:
+            embeddings = cls._encode_planned(provider, missing_texts, batch_size=batch_size)
+            embedding_cache.set_many(model_name, model_version, missing_texts, embeddings)
+            for text, embedding in zip(missing_texts, embeddings):
+                encoded[EmbeddingCache.normalize_text(text)] = embedding
+
+        return [
+            vector.tolist() if vector is not None
+            else cls._as_list(encoded.get(EmbeddingCache.normalize_text(text), []))
+            for text, vector in zip(texts, cached)
+        ]
+
+    @classmethod
+    def _encode_planned(
+        cls,
+        provider,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        concurrent: bool = True
+    ) -> List[List[float]]:
+        """
+        Encode texts within the provider's token limits.
+
+        Texts over max_tokens_per_text are split into chunks whose embeddings
+        are pooled back into one vector per text.
+
+        Args:
+            provider: Provider instance
+            texts: Texts to encode
+            batch_size: Optional cap on texts per request
+            concurrent: Send batches through ConcurrentEncoder (failed texts
+                get []); otherwise send them one by one and let errors raise,
+                except that texts rejected as too long are re-split
+
+        Returns:
+            One embedding per text
+        """
+        planner = BatchPlanner.from_params(provider.model_params, max_batch_size=batch_size)
+        chunks, owners, tokens, batches = planner.plan(texts)
+        chunk_batches = [[chunks[i] for i in batch] for batch in batches]
+
+        if concurrent:
+            encoded_batches = ConcurrentEncoder.for_provider(provider).encode_batches(chunk_batches)
+        else:
+            encoded_batches = [cls._encode_resplitting(provider, batch) for batch in chunk_batches]
+
+        chunk_embeddings = [[] for _ in chunks]
+        for batch, embeddings in zip(batches, encoded_batches):
+            for index, embedding in zip(batch, embeddings):
+                chunk_embeddings[index] = embedding
+
+        return planner.pool(len(texts), owners, tokens, chunk_embeddings)
+
+    @classmethod
+    def _encode_resplitting(cls, provider, texts: List[str]) -> List[List[float]]:
+        """
+        Encode a batch, re-splitting texts the provider rejects as too long.
+
+        The token estimate can undercount, so a batch failing with a context
+        length error is retried text by text; a text still rejected is split
+        further and gets the pooled embedding of its pieces. Other errors raise.
+
+        Args:
+            provider: Provider instance
+            texts: Texts to encode
+
+        Returns:
+            One embedding per text
+        """
+        try:
+            return provider.encode(texts)
+        except Exception as e:
+            if not is_context_length_error(e):
+                raise
+            if len(texts) == 1:
+                pieces = BatchPlanner.resplit(texts[0])
+                if not pieces:
+                    raise
+                return [BatchPlanner.pool_chunks(pieces, cls._encode_resplitting(provider, pieces))]
+
+        embeddings = []
+        for text in texts:
+            embeddings.extend(cls._encode_resplitting(provider, [text]))
+        return embeddings
+
+    @staticmethod
+    def _as_list(embedding) -> List[float]:
+        """Plain float list of an embedding (providers may return NumPy rows)."""
+        return embedding.tolist() if isinstance(embedding, np.ndarray) else list(embedding)
+
+    @staticmethod
+    def _distinct_missing_texts(texts: List[str], cached: List) -> List[str]:
+        """
+        Get the texts without a cached vector, one per normalized text.
+
+        Args:
+            texts: Requested texts
+            cached: Cache lookup results, parallel to texts
+
+        Returns:
+            Texts to send to the provider, in first-seen order
+        """
+        missing = {}
+        for text, vector in zip(texts, cached):
+            if vector is None:
+                missing.setdefault(EmbeddingCache.normalize_text(text), text)
+        return list(missing.values())
+
+    @classmethod
+    def get_cache_stats(cls) -> Dict[str, Any]:
+        """
+        Get embedding cache statistics.
+
+        Returns:
+            Dictionary with per-process hit/miss counters and persistent entry count
+        """
+        stats = embedding_cache.stats()
+        stats['persistent_items'] = EmbeddingCacheEntry.objects.count()
+        return stats
+
+    @classmethod
+    def get_transport_stats(cls) -> List[Dict[str, Any]]:
+        """
+        Get connection pool statistics of the shared provider HTTP clients.
+
+        Returns:
+            One dictionary per base URL with request, connection, TLS
+            handshake and pool saturation counters for this process
+        """
+        return transport_stats()
 
 
 class EmbeddingService:
@@ -273,3 +572,10 @@ class EmbeddingService:
                 'is_connected': False,
                 'error': str(e),
             }
+
+
+@receiver(post_save, sender=EmbeddingModelConfig)
+@receiver(post_delete, sender=EmbeddingModelConfig)
+def invalidate_default_config(sender, instance, **kwargs):
+    """Drop the cached default configuration when any configuration changes."""
+    EmbeddingServiceFactory.invalidate_config_cache()
@@ -0,0 +1,88 @@
+"""
+Tests for the scoping of cached embedding vectors.
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.embeddings.cache import embedding_cache
+from apps.embeddings.models import EmbeddingCacheEntry
+from apps.embeddings.providers.openai_compatible_provider import OpenAICompatibleProvider
+from apps.embeddings.providers.openai_provider import OpenAIEmbeddingProvider
+from apps.embeddings.services import EmbeddingServiceFactory
+
+
+class CacheIdentityTests(TestCase):
+
+    def setUp(self):
+        embedding_cache.clear()
+        self.addCleanup(embedding_cache.clear)
+
+    def make_provider(self, provider_class, vector, **config):
+        """Provider whose encode() returns ``vector`` for every text, without network calls."""
+        provider = provider_class(dict({
+            'model_name': 'shared-name',
+            'dimension': 3,
+            'api_key': 'test',
+            'model_params': {'model': 'text-embedding-3-small'},
+        }, **config))
+        patcher = mock.patch.object(
+            provider, 'encode', side_effect=lambda texts: [list(vector) for _ in texts]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return provider
+
+    def test_same_model_name_on_other_endpoints_does_not_share_entries(self):
+        hosted = self.make_provider(OpenAIEmbeddingProvider, [1.0, 0.0, 0.0])
+        local = self.make_provider(
+            OpenAICompatibleProvider, [0.0, 1.0, 0.0], base_url='http://127.0.0.1:8001/v1'
+        )
+        other_local = self.make_provider(
+            OpenAICompatibleProvider, [0.0, 0.0, 1.0], base_url='http://127.0.0.1:8002/v1'
+        )
+
+        texts = ['支持SQL注入检测', '支持IPv6']
+        self.assertEqual(
+            EmbeddingServiceFactory.encode_batch_with_provider(hosted, texts),
+            [[1.0, 0.0, 0.0]] * 2
+        )
+        self.assertEqual(
+            EmbeddingServiceFactory.encode_batch_with_provider(local, texts),
+            [[0.0, 1.0, 0.0]] * 2
+        )
+        self.assertEqual(
+            EmbeddingServiceFactory.encode_batch_with_provider(other_local, texts),
+            [[0.0, 0.0, 1.0]] * 2
+        )
+        self.assertEqual(local.encode.call_count, 1)
+        self.assertEqual(other_local.encode.call_count, 1)
+        self.assertEqual(EmbeddingCacheEntry.objects.count(), 6)
+
+        # Each configuration reads back its own vectors, from memory and from the table
+        for _ in range(2):
+            self.assertEqual(
+                EmbeddingServiceFactory.encode_batch_with_provider(hosted, texts),
+                [[1.0, 0.0, 0.0]] * 2
+            )
+            self.assertEqual(
+                EmbeddingServiceFactory.encode_batch_with_provider(local, texts),
+                [[0.0, 1.0, 0.0]] * 2
+            )
+            embedding_cache.clear()
+        self.assertEqual(hosted.encode.call_count, 1)
+        self.assertEqual(local.encode.call_count, 1)
+
+    def test_identity_uses_the_model_actually_called(self):
+        default_model = self.make_provider(OpenAIEmbeddingProvider, [1.0, 0.0, 0.0], model_params={})
+        large_model = self.make_provider(
+            OpenAIEmbeddingProvider, [1.0, 0.0, 0.0], model_params={'model': 'text-embedding-3-large'}
+        )
+
+        default_name, default_version = EmbeddingServiceFactory.get_cache_identity(default_model)
+        large_name, large_version = EmbeddingServiceFactory.get_cache_identity(large_model)
+
+        self.assertEqual(default_name, large_name)
+        self.assertTrue(default_version.startswith('text-embedding-3-small@'))
+        self.assertTrue(large_version.startswith('text-embedding-3-large@'))
+        self.assertLessEqual(len(default_version), 100)
@@ -0,0 +1,299 @@
+"""
+Tests for concurrent batch encoding against a local HTTP stub.
+
+An OpenAI-compatible provider is pointed through ``base_url`` at an
+``http.server`` stub that embeds each text as ``[index, 1, 0]`` (the
+integer in the text), and can delay, rate-limit or fail requests.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.embeddings.concurrency import ConcurrentEncoder, RateLimiter
+from apps.embeddings.providers.openai_compatible_provider import OpenAICompatibleProvider
+from apps.embeddings.transport import close_http_clients
+
+
+class StubState:
+    """Behaviour and counters of the stub server, reset per test."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.batch_sizes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Status codes answered to the next requests, in order
+        self.failures = []
+        # Texts containing this marker are rejected with 400
+        self.bad_marker = 'BAD'
+        # Response delay range in seconds
+        self.delay = (0.0, 0.0)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        state = self.server.state
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        texts = body['input']
+        with state.lock:
+            state.requests += 1
+            state.batch_sizes.append(len(texts))
+            state.in_flight += 1
+            state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            status = state.failures.pop(0) if state.failures else 200
+        try:
+            time.sleep(random.uniform(*state.delay))
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+        if status != 200:
+            return self.send_json(status, {'error': {'message': f'stub error {status}'}})
+        if any(state.bad_marker in text for text in texts):
+            return self.send_json(400, {'error': {'message': 'bad input'}})
+
+        data = [
+            {'object': 'embedding', 'index': i, 'embedding': [float(text.split()[-1]), 1.0, 0.0]}
+            for i, text in enumerate(texts)
+        ]
+        self.send_json(200, {
+            'object': 'list',
+            'data': data,
+            'model': body['model'],
+            'usage': {'prompt_tokens': len(texts), 'total_tokens': len(texts)},
+        })
+
+    def send_json(self, status, payload):
+        content = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class FakeClock:
+    """Stand-in for the time module: sleep() advances monotonic() instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('apps.embeddings.concurrency.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_up_to_capacity_then_steady_rate(self):
+        limiter = RateLimiter(requests_per_minute=600)
+        started = self.clock.now
+
+        for _ in range(10):
+            limiter.acquire()
+        self.assertEqual(self.clock.slept, [])
+
+        for _ in range(5):
+            limiter.acquire()
+        # 10 requests per second once the burst is spent
+        self.assertAlmostEqual(self.clock.now - started, 0.5)
+
+    def test_unused_time_refills_the_bucket(self):
+        limiter = RateLimiter(requests_per_minute=60)
+        limiter.acquire()
+        self.clock.now += 5.0
+
+        limiter.acquire()
+
+        self.assertEqual(self.clock.slept, [])
+
+    def test_disabled_without_rate(self):
+        limiter = RateLimiter(requests_per_minute=None)
+
+        for _ in range(100):
+            limiter.acquire()
+
+        self.assertEqual(self.clock.slept, [])
+
+
+class ConcurrentEncoderTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.daemon_threads = True
+        cls.server.state = StubState()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}/v1'
+
+    @classmethod
+    def tearDownClass(cls):
+        close_http_clients()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.state = self.server.state = StubState()
+        ConcurrentEncoder.reset_limits()
+        self.addCleanup(ConcurrentEncoder.reset_limits)
+
+    def record_backoff(self):
+        """Patch ConcurrentEncoder._backoff_delay to record (attempt, delay) pairs."""
+        delays = []
+        backoff_delay = ConcurrentEncoder._backoff_delay
+
+        def recording(encoder, attempt):
+            delay = backoff_delay(encoder, attempt)
+            delays.append((attempt, delay))
+            return delay
+
+        patcher = mock.patch.object(ConcurrentEncoder, '_backoff_delay', autospec=True, side_effect=recording)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return delays
+
+    def make_encoder(self, **params):
+        """Encoder of a stub provider; model_params override the defaults."""
+        model_params = {'model': 'stub', 'backoff_base': 0.01, 'backoff_max': 0.05}
+        model_params.update(params)
+        provider = OpenAICompatibleProvider({
+            'model_name': f'stub-{self._testMethodName}',
+            'dimension': 3,
+            'api_key': 'test',
+            'base_url': self.base_url,
+            'model_params': model_params,
+        })
+        return ConcurrentEncoder.for_provider(provider)
+
+    def test_batches_keep_input_order(self):
+        self.state.delay = (0.0, 0.03)
+        encoder = self.make_encoder(max_concurrency=4)
+        batches = [[f'text {b * 5 + i}' for i in range(5)] for b in range(8)]
+
+        results = encoder.encode_batches(batches)
+
+        self.assertEqual(len(results), len(batches))
+        for batch, embeddings in zip(batches, results):
+            self.assertEqual(
+                [embedding[0] for embedding in embeddings],
+                [float(text.split()[-1]) for text in batch]
+            )
+        self.assertEqual(self.state.requests, len(batches))
+
+    def test_failing_batch_is_bisected(self):
+        encoder = self.make_encoder()
+        texts = [f'text {i}' for i in range(8)]
+        texts[5] = 'BAD 5'
+
+        embeddings = encoder.encode_batch(texts)
+
+        self.assertEqual(len(embeddings), 8)
+        self.assertEqual(len(embeddings[5]), 0)
+        self.assertEqual(
+            [embedding[0] for i, embedding in enumerate(embeddings) if i != 5],
+            [float(i) for i in range(8) if i != 5]
+        )
+        # 8 -> 4 + 4 -> 2 + 2 -> 1 + 1 instead of one request per text
+        self.assertEqual(self.state.requests, 7)
+        self.assertEqual(sorted(self.state.batch_sizes, reverse=True), [8, 4, 4, 2, 2, 1, 1])
+
+    def test_rate_limit_and_server_errors_are_retried_with_backoff(self):
+        self.state.failures = [429, 503, 500]
+        encoder = self.make_encoder(max_retries=3)
+        delays = self.record_backoff()
+
+        embeddings = encoder.encode_batch(['text 1', 'text 2'])
+
+        self.assertEqual([embedding[0] for embedding in embeddings], [1.0, 2.0])
+        self.assertEqual(self.state.requests, 4)
+        self.assertEqual([attempt for attempt, _ in delays], [0, 1, 2])
+        for attempt, delay in delays:
+            self.assertGreaterEqual(delay, 0.0)
+            self.assertLessEqual(delay, min(0.05, 0.01 * 2 ** attempt))
+
+    def test_retries_are_bounded(self):
+        self.state.failures = [503] * 10
+        encoder = self.make_encoder(max_retries=2)
+        delays = self.record_backoff()
+
+        embeddings = encoder.encode_batch(['text 1'])
+
+        self.assertEqual(embeddings, [[]])
+        self.assertEqual(self.state.requests, 3)
+        self.assertEqual(len(delays), 2)
+
+    def test_client_errors_are_not_retried(self):
+        encoder = self.make_encoder(max_retries=3)
+        delays = self.record_backoff()
+
+        embeddings = encoder.encode_batch(['BAD 1'])
+
+        self.assertEqual(embeddings, [[]])
+        self.assertEqual(self.state.requests, 1)
+        self.assertEqual(delays, [])
+
+    def test_in_flight_requests_are_limited(self):
+        self.state.delay = (0.05, 0.05)
+        encoder = self.make_encoder(max_concurrency=3)
+        batches = [[f'text {i}'] for i in range(12)]
+
+        results = encoder.encode_batches(batches)
+
+        self.assertEqual([embeddings[0][0] for embeddings in results], [float(i) for i in range(12)])
+        self.assertEqual(self.state.requests, 12)
+        self.assertLessEqual(self.state.max_in_flight, 3)
+        self.assertGreater(self.state.max_in_flight, 1)
+
+    def test_limit_is_shared_by_encoders_of_one_provider(self):
+        self.state.delay = (0.05, 0.05)
+        first = self.make_encoder(max_concurrency=2)
+        second = self.make_encoder(max_concurrency=2)
+        batches = [[f'text {i}'] for i in range(6)]
+
+        threads = [
+            threading.Thread(target=encoder.encode_batches, args=(batches,))
+            for encoder in (first, second)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.state.requests, 12)
+        self.assertLessEqual(self.state.max_in_flight, 2)
+
+    def test_requests_per_minute_paces_requests(self):
+        clock = FakeClock()
+        batches = [[f'text {i}'] for i in range(5)]
+
+        with mock.patch('apps.embeddings.concurrency.time', clock):
+            encoder = self.make_encoder(max_concurrency=1, requests_per_minute=60)
+            results = encoder.encode_batches(batches)
+
+        self.assertEqual([embeddings[0][0] for embeddings in results], [float(i) for i in range(5)])
+        self.assertEqual(self.state.requests, 5)
+        # One request per second after the first: four one-second waits
+        self.assertAlmostEqual(sum(clock.slept), 4.0)
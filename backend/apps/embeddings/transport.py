@@ -0,0 +1,306 @@
+"""
+Shared HTTP transport for API embedding providers.
+
+Providers talking to the same base URL with the same transport options
+share one ``httpx.Client``, so its keep-alive connections (and TLS
+sessions) outlive provider instances, which are rebuilt whenever a
+configuration changes or the provider cache is cleared. Pool limits,
+timeouts, HTTP/2 and connection retries come from ``model_params``.
+
+Async clients (for ``aencode``) are shared the same way within each
+event loop. Every shared client counts new connections, TLS handshakes
+and requests that found every pooled connection busy, see
+transport_stats().
+"""
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+# model_params keys and defaults of the shared transport
+TRANSPORT_DEFAULTS = {
+    'pool_max_connections': 20,
+    'pool_max_keepalive': 10,
+    'keepalive_expiry': 120.0,
+    'connect_timeout': 5.0,
+    'read_timeout': 60.0,
+    'http2': False,
+    'connect_retries': 1,
+}
+
+
+def transport_options(model_params: Optional[Dict[str, Any]]) -> Tuple:
+    """
+    Get the transport options of a provider's model_params.
+
+    Args:
+        model_params: Provider model parameters
+
+    Returns:
+        Options as a hashable tuple, in TRANSPORT_DEFAULTS order
+    """
+    params = model_params or {}
+    return tuple(
+        type(default)(params.get(name, default)) for name, default in TRANSPORT_DEFAULTS.items()
+    )
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class TransportMetrics:
+    """
+    Connection reuse and pool pressure counters of a transport.
+
+    New connections and TLS handshakes are counted from httpcore trace
+    events; a request is counted as saturated when it starts while every
+    connection the pool may open is already in use.
+    """
+
+    def _init_metrics(self, max_connections: int):
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.saturated_requests = 0
+        self.pool_timeouts = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.request_seconds = 0.0
+
+    def _record_event(self, event_name: str):
+        if event_name in ('connection.connect_tcp.complete', 'connection.connect_unix_socket.complete'):
+            with self._lock:
+                self.connections_opened += 1
+        elif event_name == 'connection.start_tls.complete':
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def _request_started(self) -> float:
+        with self._lock:
+            self.requests += 1
+            if self.in_flight >= self.max_connections:
+                self.saturated_requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return time.perf_counter()
+
+    def _request_failed(self, error: Exception):
+        with self._lock:
+            self.errors += 1
+            if isinstance(error, httpx.PoolTimeout):
+                self.pool_timeouts += 1
+
+    def _request_finished(self, started: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.request_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of this transport plus the current pool size."""
+        connections = list(self._pool.connections)
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'connections_opened': self.connections_opened,
+                'tls_handshakes': self.tls_handshakes,
+                'reused_requests': max(0, self.requests - self.connections_opened),
+                'saturated_requests': self.saturated_requests,
+                'pool_timeouts': self.pool_timeouts,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'max_connections': self.max_connections,
+                'open_connections': len(connections),
+                'idle_connections': sum(1 for connection in connections if connection.is_idle()),
+                'avg_request_ms': round(self.request_seconds * 1000 / self.requests, 2) if self.requests else 0.0,
+            }
+
+
+class MeteredTransport(TransportMetrics, httpx.HTTPTransport):
+    """
+    HTTP transport recording connection reuse and pool pressure.
+    """
+
+    def __init__(self, max_connections: int, **kwargs):
+        super().__init__(**kwargs)
+        self._init_metrics(max_connections)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        outer_trace = request.extensions.get('trace')
+
+        def trace(event_name, info):
+            self._record_event(event_name)
+            if outer_trace is not None:
+                outer_trace(event_name, info)
+
+        request.extensions['trace'] = trace
+        started = self._request_started()
+        try:
+            return super().handle_request(request)
+        except Exception as e:
+            self._request_failed(e)
+            raise
+        finally:
+            self._request_finished(started)
+
+
+class MeteredAsyncTransport(TransportMetrics, httpx.AsyncHTTPTransport):
+    """
+    Async HTTP transport recording connection reuse and pool pressure.
+    """
+
+    def __init__(self, max_connections: int, **kwargs):
+        super().__init__(**kwargs)
+        self._init_metrics(max_connections)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        outer_trace = request.extensions.get('trace')
+
+        async def trace(event_name, info):
+            self._record_event(event_name)
+            if outer_trace is not None:
+                await outer_trace(event_name, info)
+
+        request.extensions['trace'] = trace
+        started = self._request_started()
+        try:
+            return await super().handle_async_request(request)
+        except Exception as e:
+            self._request_failed(e)
+            raise
+        finally:
+            self._request_finished(started)
+
+
+# Shared clients: (base_url, options) -> (httpx.Client, MeteredTransport)
+_clients: Dict[Tuple, Tuple[httpx.Client, MeteredTransport]] = {}
+# Async clients are bound to their event loop: loop -> {key: (client, transport)}
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _client_kwargs(options: Tuple) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Transport and client keyword arguments of a transport_options tuple."""
+    (max_connections, max_keepalive, keepalive_expiry,
+     connect_timeout, read_timeout, http2, connect_retries) = options
+    if http2 and not _http2_available():
+        print("HTTP/2 requested for embedding provider but 'h2' is not installed; using HTTP/1.1")
+        http2 = False
+
+    transport_kwargs = {
+        'limits': httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        ),
+        'http2': http2,
+        'retries': connect_retries,
+    }
+    client_kwargs = {
+        'timeout': httpx.Timeout(read_timeout, connect=connect_timeout),
+        'follow_redirects': True,
+    }
+    return transport_kwargs, client_kwargs
+
+
+def get_http_client(base_url: str, model_params: Optional[Dict[str, Any]] = None) -> httpx.Client:
+    """
+    Get the shared HTTP client for a base URL and transport options.
+
+    Recognized model_params keys (see TRANSPORT_DEFAULTS):
+    pool_max_connections, pool_max_keepalive, keepalive_expiry,
+    connect_timeout, read_timeout, http2 (needs the ``h2`` package)
+    and connect_retries (retries of failed connection attempts only).
+
+    Args:
+        base_url: API base URL
+        model_params: Provider model parameters
+
+    Returns:
+        httpx.Client shared by every provider with the same key
+    """
+    options = transport_options(model_params)
+    key = (base_url.rstrip('/'), options)
+    with _clients_lock:
+        if key in _clients:
+            return _clients[key][0]
+
+        transport_kwargs, client_kwargs = _client_kwargs(options)
+        transport = MeteredTransport(options[0], **transport_kwargs)
+        client = httpx.Client(transport=transport, **client_kwargs)
+        _clients[key] = (client, transport)
+        return client
+
+
+def get_async_http_client(base_url: str, model_params: Optional[Dict[str, Any]] = None) -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client of the running event loop.
+
+    Same keys and options as get_http_client; each event loop gets its
+    own pool, since async connections cannot move between loops.
+
+    Args:
+        base_url: API base URL
+        model_params: Provider model parameters
+
+    Returns:
+        httpx.AsyncClient shared by every provider with the same key on this loop
+    """
+    loop = asyncio.get_running_loop()
+    options = transport_options(model_params)
+    key = (base_url.rstrip('/'), options)
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        if key in clients:
+            return clients[key][0]
+
+        transport_kwargs, client_kwargs = _client_kwargs(options)
+        transport = MeteredAsyncTransport(options[0], **transport_kwargs)
+        client = httpx.AsyncClient(transport=transport, **client_kwargs)
+        clients[key] = (client, transport)
+        return client
+
+
+def transport_stats() -> list:
+    """
+    Get connection statistics of every shared client in this process.
+
+    Returns:
+        One dictionary per client with its base URL and transport counters
+    """
+    with _clients_lock:
+        items = [(key, transport, False) for key, (_, transport) in _clients.items()]
+        for clients in list(_async_clients.values()):
+            items.extend((key, transport, True) for key, (_, transport) in clients.items())
+    return [
+        {'base_url': base_url, 'async': is_async, **transport.stats()}
+        for (base_url, _), transport, is_async in items
+    ]
+
+
+def close_http_clients():
+    """Close and forget every shared sync client (e.g. at shutdown)."""
+    with _clients_lock:
+        clients = [client for client, _ in _clients.values()]
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_http_clients():
+    """Close and forget the shared async clients of the running event loop."""
+    with _clients_lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client, _ in clients.values():
+        await client.aclose()
@@ -233,6 +233,36 @@ class EmbeddingServiceViewSet(viewsets.ViewSet):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """
+        Get embedding cache hit/miss statistics for this process.
+
+        GET /api/v1/service/cache_stats/
+        """
+        try:
+            return Response(EmbeddingServiceFactory.get_cache_stats())
+
+        except Exception as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'])
+    def transport_stats(self, request):
+        """
+        Get connection pool statistics of the provider HTTP clients in this process.
+
+        GET /api/v1/service/transport_stats/
+        """
+        try:
+            return Response(EmbeddingServiceFactory.get_transport_stats())
+
+        except Exception as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=False, methods=['post'])
     def health_check(self, request):
         """
@@ -2,7 +2,7 @@
 Admin configuration for Matching models.
 """
 from django.contrib import admin
-from .models import CapabilityRequirement, RequirementItem, MatchRecord
+from .models import CapabilityRequirement, RequirementItem, MatchRecord, AnalysisJob
 
 
 class RequirementItemInline(admin.TabularInline):
@@ -134,3 +134,34 @@ class MatchRecordAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         """Make match records read-only."""
         return False
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    """Admin interface for AnalysisJob model."""
+
+    list_display = [
+        'id',
+        'requirement',
+        'status',
+        'items_total',
+        'items_embedded',
+        'items_matched',
+        'cancel_requested',
+        'created_at'
+    ]
+    list_filter = ['status', 'created_at']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'requirement',
+        'params',
+        'items_total',
+        'items_embedded',
+        'items_matched',
+        'result',
+        'error',
+        'worker_id',
+        'started_at',
+        'finished_at',
+        'created_at'
+    ]
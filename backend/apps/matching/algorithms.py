@@ -2,19 +2,27 @@
 Matching algorithms for semantic similarity.
 """
 import os
+import time
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Func, IntegerField
+from django.db.models.functions import Cast
 
 # Conditional pgvector import
 try:
-    from pgvector.django import CosineDistance
+    from pgvector.django import CosineDistance, VectorField
     _HAS_PGVECTOR_LIB = True
 except ImportError:
     _HAS_PGVECTOR_LIB = False
     CosineDistance = None
+    VectorField = None
 
+from apps.embeddings.services import EmbeddingServiceFactory
 from apps.products.models import FeatureEmbedding, Feature
+from apps.matching.lexical import competition_ranks, get_lexical_index, reciprocal_rank_fusion
+from apps.matching.vector_index import FeatureVectorIndex, get_feature_index
 
 
 def _check_pgvector_available() -> bool:
@@ -32,6 +40,12 @@ def _check_pgvector_available() -> bool:
         return False
 
 
+class VectorDims(Func):
+    """pgvector ``vector_dims()``: the dimension of a stored vector."""
+    function = 'vector_dims'
+    output_field = IntegerField()
+
+
 class MatchingAlgorithm:
     """
     Matching algorithm class for calculating semantic similarity
@@ -45,15 +59,54 @@ class MatchingAlgorithm:
         'unmatched': 0.0,          # Below threshold
     }
 
-    def __init__(self, threshold: float = 0.75):
+    # Statuses by np.digitize bin over (partial_matched, matched) thresholds
+    MATCH_STATUSES = np.array(['unmatched', 'partial_matched', 'matched'])
+
+    # Retrieve-then-rerank parameters a profile does not set (see staged_match)
+    PIPELINE_DEFAULTS = {
+        'candidates': 100,            # Stage 1 candidates per requirement
+        'retrieve_budget_ms': 200.0,  # Stage 1 budget per requirement
+        'rerank_budget_ms': 100.0,    # Stage 2 budget per requirement
+        'lexical_weight': 0.0,        # Share of the BM25 score in the rerank score
+        'importance_weight': 0.0,     # Boost per importance_level step away from 5
+    }
+
+    def __init__(
+        self,
+        threshold: float = 0.75,
+        use_ann: Optional[bool] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        hybrid: Optional[bool] = None,
+        profile: Optional[str] = None
+    ):
         """
         Initialize the matching algorithm.
 
         Args:
             threshold: Minimum similarity score for a match (default: 0.75)
+            use_ann: Search pgvector ANN indexes in batch_match (default: MATCHING_ANN_ENABLED setting)
+            ef_search: HNSW search candidate list size (default: MATCHING_HNSW_EF_SEARCH setting)
+            probes: IVFFlat lists probed per query (default: MATCHING_IVFFLAT_PROBES setting)
+            hybrid: Fuse BM25 and vector rankings in batch_match (default: MATCHING_HYBRID_ENABLED setting)
+            profile: Retrieve-then-rerank profile used by batch_match (default:
+                MATCHING_PIPELINE_PROFILE setting; '' disables the pipeline)
         """
         self.threshold = threshold
-        self.THRESHOLDS['partial_matched'] = threshold
+        # Per-instance copy; worker threads run jobs with different thresholds
+        self.thresholds = dict(self.THRESHOLDS)
+        self.thresholds['partial_matched'] = threshold
+        self.use_ann = getattr(settings, 'MATCHING_ANN_ENABLED', False) if use_ann is None else use_ann
+        self.ef_search = ef_search or getattr(settings, 'MATCHING_HNSW_EF_SEARCH', 100)
+        self.probes = probes or getattr(settings, 'MATCHING_IVFFLAT_PROBES', 10)
+        self.hybrid = getattr(settings, 'MATCHING_HYBRID_ENABLED', False) if hybrid is None else hybrid
+        self.hybrid_candidates = getattr(settings, 'MATCHING_HYBRID_CANDIDATES', 100)
+        self.rrf_k = getattr(settings, 'MATCHING_HYBRID_RRF_K', 60)
+        self.rrf_weights = (
+            getattr(settings, 'MATCHING_HYBRID_VECTOR_WEIGHT', 1.0),
+            getattr(settings, 'MATCHING_HYBRID_LEXICAL_WEIGHT', 0.3),
+        )
+        self.pipeline = self.get_pipeline_profile(profile)
 
     def calculate_similarity(self, vector1: List[float], vector2: List[float]) -> float:
         """
@@ -96,139 +149,723 @@ class MatchingAlgorithm:
         Returns:
             Match status: 'matched', 'partial_matched', or 'unmatched'
         """
-        if similarity_score >= self.THRESHOLDS['matched']:
+        if similarity_score >= self.thresholds['matched']:
             return 'matched'
-        elif similarity_score >= self.THRESHOLDS['partial_matched']:
+        elif similarity_score >= self.thresholds['partial_matched']:
             return 'partial_matched'
         else:
             return 'unmatched'
 
+    def determine_match_statuses(self, similarity_scores) -> List[str]:
+        """
+        Determine the match statuses of many similarity scores at once.
+
+        Same thresholds as determine_match_status, applied with one
+        ``np.digitize`` over the whole score array.
+
+        Args:
+            similarity_scores: Sequence or array of similarity scores
+
+        Returns:
+            Match status per score, in the order given
+        """
+        scores = np.asarray(similarity_scores, dtype=np.float64)
+        if scores.size == 0:
+            return []
+        bins = np.array([self.thresholds['partial_matched'], self.thresholds['matched']])
+        # Keep 'matched' winning if partial_matched is configured above it
+        bins[0] = min(bins[0], bins[1])
+        return self.MATCH_STATUSES[np.digitize(scores, bins)].tolist()
+
+    @staticmethod
+    def build_filter_lookups(filters: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
+        """
+        Translate search filters into FeatureEmbedding queryset lookups.
+
+        Args:
+            filters: Optional dict with any of 'product_ids', 'subsystem_type',
+                'indicator_type' and 'level1_function'; each value is a single
+                value or a list
+
+        Returns:
+            Dictionary of ``__in`` lookups for QuerySet.filter()
+        """
+        lookups = {}
+        for name, value in (filters or {}).items():
+            if value is None or value == [] or value == '':
+                continue
+            if name == 'product_ids':
+                field = 'feature__product_id'
+            elif name in FeatureVectorIndex.FILTER_FIELDS:
+                field = FeatureVectorIndex.FILTER_FIELDS[name]
+            else:
+                raise ValueError(f"Unsupported filter: {name}")
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            lookups[f'{field}__in'] = [str(v) for v in values]
+        return lookups
+
+    @staticmethod
+    def get_active_model_name() -> Optional[str]:
+        """Get the model name of the default embedding configuration, if any."""
+        config = EmbeddingServiceFactory.get_default_config()
+        return config.model_name if config else None
+
+    @classmethod
+    def get_pipeline_profile(cls, name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a retrieve-then-rerank profile.
+
+        Args:
+            name: Profile name in MATCHING_PIPELINE_PROFILES (default:
+                MATCHING_PIPELINE_PROFILE setting)
+
+        Returns:
+            Profile parameters including its name, or None if the name is empty
+
+        Raises:
+            ValueError: If the profile is not configured
+        """
+        if name is None:
+            name = getattr(settings, 'MATCHING_PIPELINE_PROFILE', '')
+        if not name:
+            return None
+        profiles = getattr(settings, 'MATCHING_PIPELINE_PROFILES', {})
+        if name not in profiles:
+            raise ValueError(f"Unknown matching profile: {name}. Available: {list(profiles)}")
+        return dict(cls.PIPELINE_DEFAULTS, **profiles[name], name=name)
+
+    def _set_ann_parameters(self, limit: int):
+        """
+        Set HNSW/IVFFlat search parameters for the current transaction.
+
+        ef_search is raised to at least ``limit`` so an HNSW scan can return
+        ``limit`` rows.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL hnsw.ef_search = {max(int(self.ef_search), int(limit))}")
+            cursor.execute(f"SET LOCAL ivfflat.probes = {int(self.probes)}")
+
     def find_matches_using_pgvector(
         self,
         query_embedding: List[float],
         limit: int = 10,
-        min_score: Optional[float] = None
+        min_score: Optional[float] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        model_name: Optional[str] = None
     ) -> List[Dict]:
         """
         Find matching features using pgvector vector search or fallback to pure Python.
 
+        Filters are applied before ranking, so restricted searches still
+        return up to ``limit`` results. The search is scoped to one model (the
+        active one unless ``model_name`` is given), so vectors of other
+        embedding spaces are neither scanned nor returned. On PostgreSQL rows
+        are ordered by cosine distance on ``embedding::vector(d)``, so the
+        model's HNSW/IVFFlat expression index can serve the query.
+
         Args:
             query_embedding: Query embedding vector
             limit: Maximum number of results to return
             min_score: Minimum similarity score (uses threshold if not specified)
+            filters: Optional pre-filters (see build_filter_lookups)
+            model_name: Embedding model to search (default: the active model)
 
         Returns:
             List of match results with feature info and similarity scores
         """
         if min_score is None:
             min_score = self.threshold
+        model_name = model_name or self.get_active_model_name()
 
         try:
             if _check_pgvector_available():
+                dimension = len(query_embedding)
+                lookups = self.build_filter_lookups(filters)
+                embeddings = FeatureEmbedding.objects.all()
+                if model_name:
+                    lookups['model_name'] = model_name
+                else:
+                    # No model to scope to: only compare vectors of the query's dimension
+                    embeddings = embeddings.annotate(
+                        dimension=VectorDims('embedding')
+                    ).filter(dimension=dimension)
+
                 # Use pgvector for efficient similarity search
-                embeddings = FeatureEmbedding.objects.annotate(
-                    similarity=1 - CosineDistance('embedding', query_embedding)
-                ).filter(
-                    similarity__gte=min_score,
-                    feature__is_active=True,
-                    feature__product__is_active=True
-                ).select_related(
-                    'feature__product'
-                ).order_by('-similarity')[:limit]
+                with transaction.atomic():
+                    self._set_ann_parameters(limit)
+                    embeddings = list(embeddings.annotate(
+                        distance=CosineDistance(
+                            Cast('embedding', output_field=VectorField(dimensions=dimension)),
+                            query_embedding
+                        )
+                    ).filter(
+                        distance__lte=1 - min_score,
+                        feature__is_active=True,
+                        feature__product__is_active=True,
+                        **lookups
+                    ).select_related(
+                        'feature__product'
+                    ).order_by('distance')[:limit])
 
                 # Build results
-                results = []
-                for idx, emb in enumerate(embeddings):
-                    results.append({
-                        'feature_id': str(emb.feature.id),
-                        'feature_name': emb.feature.feature_name,
-                        'feature_description': emb.feature.description,
-                        'product_id': str(emb.feature.product.id),
-                        'product_name': emb.feature.product.name,
-                        'similarity': float(emb.similarity),
-                        'match_status': self.determine_match_status(float(emb.similarity)),
-                        'rank': idx + 1,
-                        'model_name': emb.model_name,
-                    })
-
-                return results
+                similarities = [1 - float(emb.distance) for emb in embeddings]
+                statuses = self.determine_match_statuses(similarities)
+                return [
+                    self._match_result(emb.feature, similarity, idx + 1, emb.model_name, status)
+                    for idx, (emb, similarity, status) in enumerate(zip(embeddings, similarities, statuses))
+                ]
             else:
-                # Fallback: Load all embeddings and calculate similarity in Python
-                embeddings = FeatureEmbedding.objects.filter(
-                    feature__is_active=True,
-                    feature__product__is_active=True
-                ).select_related(
-                    'feature__product'
-                ).all()
-
-                # Calculate similarities
-                results = []
-                for emb in embeddings:
-                    similarity = self.calculate_similarity(query_embedding, emb.embedding)
-                    if similarity >= min_score:
-                        results.append({
-                            'feature_id': str(emb.feature.id),
-                            'feature_name': emb.feature.feature_name,
-                            'feature_description': emb.feature.description,
-                            'product_id': str(emb.feature.product.id),
-                            'product_name': emb.feature.product.name,
-                            'similarity': similarity,
-                            'match_status': self.determine_match_status(similarity),
-                            'rank': 0,  # Will be set after sorting
-                            'model_name': emb.model_name,
-                        })
-
-                # Sort by similarity and assign ranks
-                results.sort(key=lambda x: x['similarity'], reverse=True)
-                results = results[:limit]
-                for idx, result in enumerate(results):
-                    result['rank'] = idx + 1
-
-                return results
+                # Fallback: score against the in-process feature matrix
+                index = get_feature_index(len(query_embedding), model_name)
+                hits = index.search(
+                    query_embedding,
+                    limit=limit,
+                    min_score=min_score,
+                    mask=index.mask(filters)
+                )
+                return self._build_index_results(index, hits)
 
         except Exception as e:
             raise RuntimeError(f"Vector search failed: {str(e)}")
 
-    def batch_match(
+    def _load_features(self, feature_ids: List[str]) -> Dict[str, Feature]:
+        """
+        Load features with their products in a single query.
+
+        Args:
+            feature_ids: Feature UUID strings
+
+        Returns:
+            Dictionary mapping feature ID strings to Feature objects
+        """
+        return {
+            str(feature.id): feature
+            for feature in Feature.objects.select_related('product').filter(
+                id__in=set(feature_ids)
+            )
+        }
+
+    def _build_index_results(
+        self,
+        index: FeatureVectorIndex,
+        hits: List[Tuple[int, float]],
+        features: Optional[Dict[str, Feature]] = None
+    ) -> List[Dict]:
+        """
+        Build match result dicts for in-process index hits.
+
+        Args:
+            index: Index the hits were found in
+            hits: List of (row, similarity) tuples, best first
+            features: Preloaded features by ID (loaded if not specified)
+
+        Returns:
+            List of match results with feature info and similarity scores
+        """
+        if not hits:
+            return []
+
+        if features is None:
+            features = self._load_features([index.feature_ids[row] for row, _ in hits])
+
+        # Features deleted since the index was built are skipped
+        hits = [(row, similarity) for row, similarity in hits if index.feature_ids[row] in features]
+        statuses = self.determine_match_statuses([similarity for _, similarity in hits])
+        return [
+            self._match_result(
+                features[index.feature_ids[row]], similarity, rank, index.model_names[row], status
+            )
+            for rank, ((row, similarity), status) in enumerate(zip(hits, statuses), start=1)
+        ]
+
+    def _match_result(
+        self,
+        feature: Feature,
+        similarity: float,
+        rank: int,
+        model_name: str,
+        match_status: str
+    ) -> Dict:
+        """Build the match result dict of one feature."""
+        return {
+            'feature_id': str(feature.id),
+            'feature_name': feature.feature_name,
+            'feature_description': feature.description,
+            'product_id': str(feature.product.id),
+            'product_name': feature.product.name,
+            'similarity': similarity,
+            'match_status': match_status,
+            'rank': rank,
+            'model_name': model_name,
+        }
+
+    def _hybrid_search(
+        self,
+        index: FeatureVectorIndex,
+        embeddings: List[List[float]],
+        texts: List[str],
+        limit: int,
+        min_score: float,
+        mask: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Rank index rows by reciprocal rank fusion of vector and BM25 rankings.
+
+        Candidates are the vector top ``hybrid_candidates`` (through the
+        index's IVF or quantized path when it has one) plus the BM25 top
+        ``hybrid_candidates``, so a semantically close feature sharing no
+        token with the query still competes. BM25 rows are rescored with
+        the query vector; tied BM25 scores share a rank, and the two
+        rankings are weighted by MATCHING_HYBRID_VECTOR_WEIGHT and
+        MATCHING_HYBRID_LEXICAL_WEIGHT. Similarities stay cosine scores, so
+        match statuses and ``min_score`` keep their meaning; fusion only
+        decides the order.
+
+        Args:
+            index: Vector index for the embedding dimension
+            embeddings: Query embedding vectors
+            texts: Query texts, parallel to embeddings
+            limit: Maximum number of results per query
+            min_score: Minimum cosine similarity
+            mask: Optional boolean row mask restricting the candidates
+
+        Returns:
+            One list of (row, similarity) tuples per query, best first
+        """
+        lexical = get_lexical_index()
+        allowed = mask
+        if index.removed is not None:
+            allowed = ~index.removed if allowed is None else allowed & ~index.removed
+        doc_mask = None
+        if allowed is not None:
+            doc_mask = np.isin(lexical.feature_ids, index.feature_ids[allowed])
+
+        # BM25 rows with their scores (a feature has one row per embedding model)
+        lexical_hits = []
+        for text in texts:
+            hits = []
+            for doc, score in lexical.search(text, limit=self.hybrid_candidates, mask=doc_mask):
+                for row in index.rows_for_features([lexical.feature_ids[doc]]):
+                    if allowed is None or allowed[row]:
+                        hits.append((int(row), score))
+            lexical_hits.append(hits)
+
+        queries = index.normalize(np.asarray(embeddings, dtype=np.float32))
+        vector_hits = index.search_batch(
+            queries,
+            limit=self.hybrid_candidates,
+            min_score=min_score,
+            mask=mask
+        )
+
+        results = []
+        for query, hits, vector_ranking in zip(queries, lexical_hits, vector_hits):
+            similarities = dict(vector_ranking)
+            rows = [row for row, _ in hits]
+            unscored = [row for row in rows if row not in similarities]
+            if unscored:
+                scores = np.clip(index.vectors(np.asarray(unscored)) @ query, 0.0, 1.0)
+                similarities.update(zip(unscored, scores.tolist()))
+
+            fused = reciprocal_rank_fusion(
+                [[row for row, _ in vector_ranking], rows],
+                k=self.rrf_k,
+                weights=self.rrf_weights,
+                ranks=[None, competition_ranks([score for _, score in hits])]
+            )
+            results.append([
+                (row, similarities[row])
+                for row, _ in fused
+                if similarities[row] >= min_score
+            ][:limit])
+
+        return results
+
+    def staged_match(
         self,
         requirement_embeddings: List[Tuple[str, List[float]]],
         limit: int = 5,
-        product_ids: Optional[List[str]] = None
+        min_score: Optional[float] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        requirement_texts: Optional[Dict[str, str]] = None,
+        stage_timings: Optional[Dict[str, Any]] = None,
+        model_name: Optional[str] = None
     ) -> Dict[str, List[Dict]]:
         """
-        Match multiple requirements against features.
+        Match requirements with the two-stage retrieve-then-rerank pipeline.
+
+        Stage 1 fetches the profile's ``candidates`` per requirement from the
+        cheapest source available: the pgvector ANN indexes, or the
+        in-process index (IVF clusters, or quantized codes without their own
+        rerank). Stage 2 rescores the candidates with exact float32 cosine
+        where stage 1 was approximate, and orders them by
+
+            ((1 - lexical_weight) * cosine + lexical_weight * bm25)
+            * (1 + importance_weight * (importance_level - 5) / 5)
+
+        with BM25 normalized by the best candidate. ``similarity``, match
+        statuses and ``min_score`` stay on the exact cosine; the combined
+        value is returned as ``score``.
+
+        Budgets are per requirement and soft: once stage 1 has used its
+        budget, remaining pgvector searches fetch only ``limit`` candidates;
+        once both budgets are used, remaining requirements keep their
+        stage-1 order (``reranked`` is False on their results).
 
         Args:
             requirement_embeddings: List of (requirement_id, embedding) tuples
             limit: Max matches per requirement
-            product_ids: Optional list of product IDs to filter by
+            min_score: Minimum similarity score (uses threshold if not specified)
+            filters: Optional pre-filters (see build_filter_lookups)
+            requirement_texts: Requirement texts by ID, for the lexical score
+            stage_timings: Optional dict filled with the profile, budgets and
+                per-stage timings in milliseconds
+            model_name: Embedding model of the requirement vectors (default: the active model)
 
         Returns:
             Dictionary mapping requirement IDs to match results
         """
-        results = {}
+        profile = self.pipeline or dict(self.PIPELINE_DEFAULTS, name='default')
+        if min_score is None:
+            min_score = self.threshold
+
+        count = len(requirement_embeddings)
+        pool = max(int(profile['candidates']), limit)
+        retrieve_budget = profile['retrieve_budget_ms'] * count / 1000
+        rerank_budget = profile['rerank_budget_ms'] * count / 1000
+        stats = stage_timings if stage_timings is not None else {}
+        stats.update({
+            'profile': profile['name'],
+            'candidates': pool,
+            'retrieve_budget_ms': round(retrieve_budget * 1000, 2),
+            'rerank_budget_ms': round(rerank_budget * 1000, 2),
+            'retrieve_reduced': 0,
+            'reranked': 0,
+            'rerank_skipped': 0,
+        })
 
+        results = {}
+        queries = []
         for req_id, req_embedding in requirement_embeddings:
+            if req_embedding is None or len(req_embedding) == 0:
+                results[req_id] = {
+                    'error': 'Missing embedding'
+                }
+                continue
+            queries.append((req_id, req_embedding))
+
+        started = time.perf_counter()
+        candidates = self._retrieve_candidates(
+            queries, pool, limit, min_score, filters,
+            model_name=model_name or self.get_active_model_name(),
+            deadline=started + retrieve_budget,
+            results=results,
+            stats=stats
+        )
+        retrieved = time.perf_counter()
+        stats['retrieve_ms'] = round((retrieved - started) * 1000, 2)
+
+        self._rerank_candidates(
+            candidates, profile, limit, min_score, requirement_texts or {},
+            deadline=started + retrieve_budget + rerank_budget,
+            results=results,
+            stats=stats
+        )
+        stats['rerank_ms'] = round((time.perf_counter() - retrieved) * 1000, 2)
+
+        return results
+
+    def _retrieve_candidates(
+        self,
+        queries: List[Tuple[str, List[float]]],
+        pool: int,
+        limit: int,
+        min_score: float,
+        filters: Optional[Dict[str, Any]],
+        model_name: Optional[str],
+        deadline: float,
+        results: Dict[str, Any],
+        stats: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Stage 1 of staged_match: fetch candidates per requirement.
+
+        Errors are stored in ``results`` by requirement ID.
+
+        Returns:
+            Dictionary mapping requirement IDs to dicts with the 'hits' as
+            (row, feature_id, model_name, similarity) tuples, whether those
+            similarities are 'exact', and the 'index' and 'query' to rescore
+            them with
+        """
+        candidates = {}
+
+        if _check_pgvector_available():
+            # Distances are computed on the stored vectors, so they are exact
+            for req_id, req_embedding in queries:
+                size = pool
+                if time.perf_counter() > deadline:
+                    size = limit
+                    stats['retrieve_reduced'] += 1
+                try:
+                    matches = self.find_matches_using_pgvector(
+                        req_embedding,
+                        limit=size,
+                        min_score=min_score,
+                        filters=filters,
+                        model_name=model_name
+                    )
+                except Exception as e:
+                    results[req_id] = {
+                        'error': str(e)
+                    }
+                    continue
+                candidates[req_id] = {
+                    'hits': [
+                        (None, match['feature_id'], match['model_name'], match['similarity'])
+                        for match in matches
+                    ],
+                    'exact': True,
+                    'index': None,
+                    'query': None,
+                }
+            return candidates
+
+        groups: Dict[int, List[Tuple[str, List[float]]]] = {}
+        for req_id, req_embedding in queries:
+            groups.setdefault(len(req_embedding), []).append((req_id, req_embedding))
+
+        for dimension, group in groups.items():
             try:
-                matches = self.find_matches_using_pgvector(
-                    req_embedding,
-                    limit=limit
+                index = get_feature_index(dimension, model_name)
+                # Code scores are approximate: min_score is applied after the rerank
+                exact = index.codes is None
+                hit_lists = index.search_batch(
+                    [req_embedding for _, req_embedding in group],
+                    limit=pool,
+                    min_score=min_score if exact else 0.0,
+                    mask=index.mask(filters),
+                    rerank=0
                 )
+            except Exception as e:
+                for req_id, _ in group:
+                    results[req_id] = {
+                        'error': str(e)
+                    }
+                continue
+
+            for (req_id, req_embedding), hits in zip(group, hit_lists):
+                candidates[req_id] = {
+                    'hits': [
+                        (row, index.feature_ids[row], index.model_names[row], similarity)
+                        for row, similarity in hits
+                    ],
+                    'exact': exact,
+                    'index': index,
+                    'query': req_embedding,
+                }
 
-                # Filter by products if specified
-                if product_ids:
-                    matches = [
-                        m for m in matches
-                        if m['product_id'] in product_ids
-                    ]
+        return candidates
 
-                results[req_id] = matches
+    def _rerank_candidates(
+        self,
+        candidates: Dict[str, Dict[str, Any]],
+        profile: Dict[str, Any],
+        limit: int,
+        min_score: float,
+        requirement_texts: Dict[str, str],
+        deadline: float,
+        results: Dict[str, Any],
+        stats: Dict[str, Any]
+    ):
+        """
+        Stage 2 of staged_match: rescore and order the candidates.
 
-            except Exception as e:
-                # Store error for this requirement
+        Match results are stored in ``results`` by requirement ID.
+        """
+        features = self._load_features([
+            hit[1] for candidate in candidates.values() for hit in candidate['hits']
+        ])
+        lexical_weight = float(profile['lexical_weight'])
+        importance_weight = float(profile['importance_weight'])
+        lexical = get_lexical_index() if lexical_weight and requirement_texts else None
+
+        for req_id, candidate in candidates.items():
+            hits = [hit for hit in candidate['hits'] if hit[1] in features]
+            similarities = np.array([hit[3] for hit in hits], dtype=np.float32)
+
+            reranked = bool(hits) and time.perf_counter() <= deadline
+            if not hits:
+                scores = similarities
+            elif not reranked:
+                # Out of budget: keep the stage-1 order and scores
+                stats['rerank_skipped'] += 1
+                scores = similarities
+            else:
+                stats['reranked'] += 1
+                if not candidate['exact']:
+                    index = candidate['index']
+                    query = index.normalize(candidate['query'])
+                    rows = np.array([hit[0] for hit in hits], dtype=np.int64)
+                    similarities = np.clip(index.vectors(rows) @ query, 0.0, 1.0)
+                scores = similarities.copy()
+
+                if lexical is not None:
+                    bm25 = lexical.feature_scores(
+                        requirement_texts.get(req_id, ''),
+                        [hit[1] for hit in hits]
+                    )
+                    if bm25.max() > 0:
+                        bm25 /= bm25.max()
+                    scores = (1 - lexical_weight) * scores + lexical_weight * bm25
+
+                if importance_weight:
+                    levels = np.array(
+                        [features[hit[1]].importance_level for hit in hits],
+                        dtype=np.float32
+                    )
+                    scores = scores * (1 + importance_weight * (levels - 5) / 5)
+
+            order = np.argsort(-scores, kind='stable')
+            order = order[similarities[order] >= min_score][:limit]
+            statuses = self.determine_match_statuses(similarities[order])
+            matches = []
+            for rank, (i, status) in enumerate(zip(order, statuses), start=1):
+                match = self._match_result(
+                    features[hits[i][1]], float(similarities[i]), rank, hits[i][2], status
+                )
+                match['score'] = float(scores[i])
+                match['reranked'] = reranked
+                matches.append(match)
+            results[req_id] = matches
+
+    def batch_match(
+        self,
+        requirement_embeddings: List[Tuple[str, List[float]]],
+        limit: int = 5,
+        product_ids: Optional[List[str]] = None,
+        min_score: Optional[float] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        requirement_texts: Optional[Dict[str, str]] = None,
+        stage_timings: Optional[Dict[str, Any]] = None,
+        model_name: Optional[str] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Match multiple requirements against features.
+
+        All requirement vectors of the same dimension are stacked into one
+        matrix and scored against the in-process feature index of their
+        model with a single matrix-matrix product, instead of one vector
+        search per requirement.
+        With ANN enabled on PostgreSQL, each requirement is instead searched
+        through the pgvector HNSW/IVFFlat indexes. In hybrid mode (in-process
+        index only), requirement texts are also ranked with BM25 and the two
+        rankings fused (see _hybrid_search). With a pipeline profile, the
+        search is delegated to staged_match instead.
+
+        Args:
+            requirement_embeddings: List of (requirement_id, embedding) tuples
+            limit: Max matches per requirement
+            product_ids: Optional list of product IDs to filter by
+            min_score: Minimum similarity score (uses threshold if not specified)
+            filters: Optional pre-filters (see build_filter_lookups)
+            requirement_texts: Requirement texts by ID, used in hybrid mode
+                and for the lexical score of the pipeline
+            stage_timings: Optional dict filled with pipeline stage timings
+                (see staged_match)
+            model_name: Embedding model of the requirement vectors (default: the active model)
+
+        Returns:
+            Dictionary mapping requirement IDs to match results
+        """
+        if min_score is None:
+            min_score = self.threshold
+
+        filters = dict(filters or {})
+        if product_ids:
+            filters['product_ids'] = product_ids
+        model_name = model_name or self.get_active_model_name()
+
+        if self.pipeline:
+            return self.staged_match(
+                requirement_embeddings,
+                limit=limit,
+                min_score=min_score,
+                filters=filters,
+                requirement_texts=requirement_texts,
+                stage_timings=stage_timings,
+                model_name=model_name
+            )
+
+        results = {}
+
+        if self.use_ann and _check_pgvector_available():
+            # Index-backed search per requirement instead of loading the catalogue
+            for req_id, req_embedding in requirement_embeddings:
+                if req_embedding is None or len(req_embedding) == 0:
+                    results[req_id] = {
+                        'error': 'Missing embedding'
+                    }
+                    continue
+                try:
+                    results[req_id] = self.find_matches_using_pgvector(
+                        req_embedding,
+                        limit=limit,
+                        min_score=min_score,
+                        filters=filters,
+                        model_name=model_name
+                    )
+                except Exception as e:
+                    results[req_id] = {
+                        'error': str(e)
+                    }
+            return results
+
+        # Group requirements by vector dimension, one index per model and dimension
+        groups: Dict[int, List[Tuple[str, List[float]]]] = {}
+        for req_id, req_embedding in requirement_embeddings:
+            if req_embedding is None or len(req_embedding) == 0:
                 results[req_id] = {
-                    'error': str(e)
+                    'error': 'Missing embedding'
                 }
+                continue
+            groups.setdefault(len(req_embedding), []).append((req_id, req_embedding))
+
+        for dimension, group in groups.items():
+            try:
+                index = get_feature_index(dimension, model_name)
+                if self.hybrid and requirement_texts:
+                    hit_lists = self._hybrid_search(
+                        index,
+                        [req_embedding for _, req_embedding in group],
+                        [requirement_texts.get(req_id, '') for req_id, _ in group],
+                        limit=limit,
+                        min_score=min_score,
+                        mask=index.mask(filters)
+                    )
+                else:
+                    hit_lists = index.search_batch(
+                        [req_embedding for _, req_embedding in group],
+                        limit=limit,
+                        min_score=min_score,
+                        mask=index.mask(filters)
+                    )
+
+                features = self._load_features([
+                    index.feature_ids[row]
+                    for hits in hit_lists
+                    for row, _ in hits
+                ])
+
+                for (req_id, _), hits in zip(group, hit_lists):
+                    results[req_id] = self._build_index_results(index, hits, features)
+
+            except Exception as e:
+                # Store error for every requirement of this group
+                for req_id, _ in group:
+                    results[req_id] = {
+                        'error': str(e)
+                    }
 
         return results
 
@@ -251,19 +888,15 @@ class MatchingAlgorithm:
         }
 
         if matches:
-            similarity_scores = []
-
-            for match in matches:
-                status = match.get('match_status', 'unmatched')
+            statuses, counts = np.unique(
+                [match.get('match_status', 'unmatched') for match in matches],
+                return_counts=True
+            )
+            for status, count in zip(statuses.tolist(), counts.tolist()):
                 if status in summary:
-                    summary[status] += 1
-
-                similarity = match.get('similarity', 0.0)
-                similarity_scores.append(similarity)
+                    summary[status] = count
 
-            # Calculate average similarity
-            if similarity_scores:
-                summary['avg_similarity'] = float(np.mean(similarity_scores))
+            summary['avg_similarity'] = float(np.mean([match.get('similarity', 0.0) for match in matches]))
 
         return summary
 
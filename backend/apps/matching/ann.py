@@ -0,0 +1,336 @@
+"""
+Approximate nearest-neighbour search for the non-pgvector matching path.
+
+An IVF (inverted file) index partitions the normalized feature matrix
+into clusters with spherical k-means; a query is scored only against the
+rows of its ``nprobe`` nearest clusters. Trained centroids are persisted
+next to the database, so an index rebuilt after catalogue changes only
+re-assigns rows to the existing centroids instead of retraining.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+
+class IVFIndex:
+    """
+    Inverted-file index over the rows of a FeatureVectorIndex matrix.
+    """
+
+    # Rows scored per assignment step, bounds the (rows, nlist) score matrix
+    ASSIGN_CHUNK_SIZE = 4096
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        centroids: np.ndarray,
+        assignments: np.ndarray,
+        trained_rows: int,
+        blocks: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            matrix: The indexed (n, dimension) matrix, referenced, not copied
+            centroids: (nlist, dimension) float32 matrix of normalized centroids
+            assignments: Cluster of every matrix row
+            trained_rows: Number of rows the centroids were trained on
+            blocks: Optional matrix rows in cluster order (a shared memmap,
+                see apps.matching.index_store), so each cluster is one
+                contiguous block scored without gathering rows
+        """
+        self.matrix = matrix
+        self.blocks = blocks
+        self.centroids = centroids
+        self.trained_rows = trained_rows
+        self.assignments = assignments
+
+        # CSR layout: rows of cluster c are order[offsets[c]:offsets[c + 1]].
+        # Only row ids are kept per list; without blocks, the rows of a
+        # probed cluster are gathered from the matrix when scored.
+        self.order = np.argsort(assignments, kind='stable').astype(np.int64)
+        self.offsets = np.searchsorted(
+            assignments[self.order],
+            np.arange(len(centroids) + 1)
+        )
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @staticmethod
+    def default_nlist(row_count: int) -> int:
+        """Number of clusters for a row count (about sqrt(rows))."""
+        return max(1, int(np.sqrt(row_count)))
+
+    @classmethod
+    def assign(cls, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """
+        Assign normalized vectors to their nearest centroid.
+
+        Args:
+            vectors: (n, dimension) float32 matrix
+            centroids: (nlist, dimension) float32 matrix
+
+        Returns:
+            int32 cluster index per vector
+        """
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), cls.ASSIGN_CHUNK_SIZE):
+            chunk = vectors[start:start + cls.ASSIGN_CHUNK_SIZE]
+            assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+
+    @classmethod
+    def train(
+        cls,
+        matrix: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = 10,
+        sample_per_list: int = 64,
+        seed: int = 0
+    ) -> 'IVFIndex':
+        """
+        Train centroids with spherical k-means and assign all rows.
+
+        Args:
+            matrix: (n, dimension) float32 matrix of normalized vectors
+            nlist: Number of clusters (default: about sqrt(n))
+            iterations: k-means iterations
+            sample_per_list: Training rows sampled per cluster
+            seed: Random seed
+
+        Returns:
+            IVFIndex instance
+        """
+        rng = np.random.default_rng(seed)
+        nlist = min(nlist or cls.default_nlist(len(matrix)), len(matrix))
+
+        sample = matrix
+        if len(matrix) > nlist * sample_per_list:
+            sample = matrix[rng.choice(len(matrix), nlist * sample_per_list, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = cls.assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=nlist)
+
+            # Reseed empty clusters with random sample rows
+            empty = np.flatnonzero(counts == 0)
+            if len(empty) > 0:
+                sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        return cls(matrix, centroids, cls.assign(matrix, centroids), trained_rows=len(matrix))
+
+    @classmethod
+    def from_centroids(cls, matrix: np.ndarray, centroids: np.ndarray, trained_rows: int) -> 'IVFIndex':
+        """
+        Build an index from existing centroids by assigning all rows.
+
+        Args:
+            matrix: (n, dimension) float32 matrix of normalized vectors
+            centroids: Previously trained centroids
+            trained_rows: Number of rows the centroids were trained on
+
+        Returns:
+            IVFIndex instance
+        """
+        return cls(matrix, centroids, cls.assign(matrix, centroids), trained_rows=trained_rows)
+
+    @staticmethod
+    def needs_retraining(trained_rows: int, row_count: int) -> bool:
+        """Whether the catalogue has grown or shrunk too much for the centroids."""
+        return row_count > 2 * trained_rows or row_count < trained_rows // 2
+
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        limit: int,
+        min_score: float,
+        mask: Optional[np.ndarray] = None,
+        nprobe: int = 8
+    ) -> List[Optional[List[Tuple[int, float]]]]:
+        """
+        Find the top-k rows for normalized queries, probing the nearest clusters.
+
+        Work is done cluster by cluster: the rows of every probed cluster are
+        scored against all queries probing it with one matrix product.
+
+        Args:
+            queries: (q, dimension) float32 matrix of normalized queries
+            limit: Maximum number of results per query
+            min_score: Minimum similarity score
+            mask: Optional boolean row mask restricting the candidates
+            nprobe: Number of clusters scored per query
+
+        Returns:
+            One list of (row, similarity) tuples per query, best first; None
+            where the probed clusters held fewer than ``limit`` candidates
+            (the caller should fall back to exact search)
+        """
+        nprobe = min(nprobe, self.nlist)
+        centroid_scores = queries @ self.centroids.T
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), centroid_scores.shape)
+
+        # Group (query, cluster) pairs by cluster
+        clusters = probes.ravel()
+        query_ids = np.repeat(np.arange(len(queries)), probes.shape[1])
+        by_cluster = np.argsort(clusters, kind='stable')
+        clusters = clusters[by_cluster]
+        query_ids = query_ids[by_cluster]
+        bounds = np.flatnonzero(np.diff(clusters)) + 1
+
+        candidate_rows = [[] for _ in range(len(queries))]
+        candidate_scores = [[] for _ in range(len(queries))]
+        for group in np.split(np.arange(len(clusters)), bounds):
+            if len(group) == 0:
+                continue
+            cluster = clusters[group[0]]
+            start, end = self.offsets[cluster], self.offsets[cluster + 1]
+            if start == end:
+                continue
+            rows = self.order[start:end]
+            block = self.blocks[start:end] if self.blocks is not None else None
+            if mask is not None:
+                selected = mask[rows]
+                rows = rows[selected]
+                if len(rows) == 0:
+                    continue
+                if block is not None:
+                    block = block[selected]
+
+            if block is None:
+                block = self.matrix[rows]
+            group_queries = query_ids[group]
+            scores = block @ queries[group_queries].T
+            for column, query_id in enumerate(group_queries):
+                candidate_rows[query_id].append(rows)
+                candidate_scores[query_id].append(scores[:, column])
+
+        results = []
+        for rows_parts, score_parts in zip(candidate_rows, candidate_scores):
+            count = sum(len(part) for part in rows_parts)
+            if count < limit:
+                results.append(None)
+                continue
+
+            rows = np.concatenate(rows_parts)
+            scores = np.clip(np.concatenate(score_parts), 0.0, 1.0)
+            top = np.argpartition(-scores, limit - 1)[:limit] if limit < len(rows) else np.arange(len(rows))
+            top = top[np.argsort(-scores[top], kind='stable')]
+            results.append([
+                (int(rows[i]), float(scores[i]))
+                for i in top
+                if scores[i] >= min_score
+            ])
+
+        return results
+
+
+def get_storage_dir() -> Optional[Path]:
+    """
+    Get the directory where trained centroids and shared index files are stored.
+
+    Defaults to ``<database file>.ann`` for file-based SQLite databases
+    and ``BASE_DIR/ann_indexes`` otherwise; None for in-memory databases.
+    """
+    configured = getattr(settings, 'MATCHING_LOCAL_ANN_DIR', None)
+    if configured:
+        return Path(configured)
+
+    name = str(settings.DATABASES['default'].get('NAME') or '')
+    if connection.vendor == 'sqlite':
+        if not name or name == ':memory:' or name.startswith('file:'):
+            return None
+        return Path(name + '.ann')
+    return Path(settings.BASE_DIR) / 'ann_indexes'
+
+
+def storage_key(dimension: int, model_name: Optional[str] = None) -> str:
+    """
+    File name part identifying an index scope.
+
+    ``<dimension>`` for indexes over every model, ``<model hash>_<dimension>``
+    for indexes scoped to one model (names are hashed to stay file-safe).
+    """
+    if not model_name:
+        return str(dimension)
+    return f"{hashlib.sha1(model_name.encode('utf-8')).hexdigest()[:12]}_{dimension}"
+
+
+def _centroids_path(dimension: int, model_name: Optional[str] = None) -> Optional[Path]:
+    directory = get_storage_dir()
+    return directory / f"ivf_{storage_key(dimension, model_name)}.npz" if directory else None
+
+
+def save_centroids(ivf: IVFIndex, dimension: int, model_name: Optional[str] = None):
+    """Persist trained centroids atomically (write to a temp file, then replace)."""
+    path = _centroids_path(dimension, model_name)
+    if path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, centroids=ivf.centroids, trained_rows=np.int64(ivf.trained_rows))
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_centroids(dimension: int, model_name: Optional[str] = None) -> Optional[Tuple[np.ndarray, int]]:
+    """Load persisted centroids for a dimension (and model), or None."""
+    path = _centroids_path(dimension, model_name)
+    if path is None or not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            centroids = data['centroids'].astype(np.float32)
+            trained_rows = int(data['trained_rows'])
+    except Exception as e:
+        print(f"Ignoring unreadable ANN centroids {path}: {str(e)}")
+        return None
+    if centroids.ndim != 2 or centroids.shape[1] != dimension:
+        return None
+    return centroids, trained_rows
+
+
+def build_ivf_index(matrix: np.ndarray, model_name: Optional[str] = None) -> IVFIndex:
+    """
+    Get an IVF index for a matrix, reusing persisted centroids when they still fit.
+
+    Args:
+        matrix: (n, dimension) float32 matrix of normalized vectors
+        model_name: Embedding model the matrix is scoped to, if any
+
+    Returns:
+        IVFIndex instance
+    """
+    dimension = matrix.shape[1]
+    persisted = load_centroids(dimension, model_name)
+    if persisted is not None:
+        centroids, trained_rows = persisted
+        if not IVFIndex.needs_retraining(trained_rows, len(matrix)):
+            return IVFIndex.from_centroids(matrix, centroids, trained_rows)
+
+    ivf = IVFIndex.train(matrix)
+    save_centroids(ivf, dimension, model_name)
+    return ivf
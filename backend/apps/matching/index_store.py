@@ -0,0 +1,284 @@
+"""
+Versioned index files shared by worker processes.
+
+The normalized feature matrix of a FeatureVectorIndex is exported as a
+``.npy`` file that every worker maps read-only with ``np.load(mmap_mode='r')``,
+so the pages are shared through the OS page cache instead of being copied
+into each process. Row metadata goes to a companion ``.npz``.
+
+Each export is a new version; ``features_<key>.json`` points to the
+current one together with the database signature it was built from, and is
+replaced atomically. Workers compare that signature with the database to
+pick up a new version without restarting. Superseded files are removed;
+processes still mapping them keep a valid mapping on POSIX. ``<key>`` is
+the dimension, prefixed with a model hash for model-scoped indexes (see
+apps.matching.ann.storage_key).
+
+When local ANN is enabled, the IVF layout of a version is exported next to
+it: the matrix rows in cluster order (``features_<key>_<version>_ivf_<token>.npy``,
+mapped read-only like the matrix) and the centroids and row assignments
+(``features_<key>_<version>_ivf.npz``, naming the blocks file it belongs to).
+"""
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from apps.matching.ann import IVFIndex, get_storage_dir, storage_key
+
+# Rows copied per write when exporting IVF blocks, bounds the temporary copy
+IVF_WRITE_CHUNK_ROWS = 8192
+
+
+def _pointer_path(directory: Path, key: str) -> Path:
+    return directory / f"features_{key}.json"
+
+
+def _data_paths(directory: Path, key: str, version: str) -> Tuple[Path, Path]:
+    stem = f"features_{key}_{version}"
+    return directory / f"{stem}.npy", directory / f"{stem}.npz"
+
+
+def _ivf_layout_path(directory: Path, key: str, version: str) -> Path:
+    return directory / f"features_{key}_{version}_ivf.npz"
+
+
+def signature_key(signature: Optional[Sequence]) -> Optional[list]:
+    """JSON-comparable form of a database signature."""
+    return [str(value) for value in signature] if signature is not None else None
+
+
+def atomic_write(path: Path, write: Callable):
+    """Write through a temp file in the same directory, then replace the target."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_pointer(dimension: int, model_name: Optional[str] = None) -> Optional[dict]:
+    """Read the current version pointer of a dimension (and model), or None."""
+    directory = get_storage_dir()
+    if directory is None:
+        return None
+    try:
+        with open(_pointer_path(directory, storage_key(dimension, model_name)), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_index_files(
+    dimension: int,
+    matrix: np.ndarray,
+    columns: Dict[str, np.ndarray],
+    signature: Optional[Sequence] = None,
+    model_name: Optional[str] = None
+) -> Optional[str]:
+    """
+    Export a matrix and its row metadata as a new version and make it current.
+
+    Args:
+        dimension: Embedding dimension of the matrix
+        matrix: (n, dimension) float32 matrix
+        columns: Row metadata arrays (strings), one value per row each
+        signature: Database signature the matrix was built from
+        model_name: Embedding model the matrix is scoped to, if any
+
+    Returns:
+        The new version, or None if there is no storage directory
+    """
+    directory = get_storage_dir()
+    if directory is None:
+        return None
+    directory.mkdir(parents=True, exist_ok=True)
+
+    key = storage_key(dimension, model_name)
+    version = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+    matrix_path, columns_path = _data_paths(directory, key, version)
+    atomic_write(matrix_path, lambda f: np.save(f, np.ascontiguousarray(matrix, dtype=np.float32)))
+    atomic_write(columns_path, lambda f: np.savez(f, **{
+        name: np.asarray(values, dtype=str) for name, values in columns.items()
+    }))
+
+    pointer = {
+        'version': version,
+        'signature': signature_key(signature),
+        'rows': int(matrix.shape[0]),
+        'created_at': datetime.now().isoformat(),
+    }
+    atomic_write(
+        _pointer_path(directory, key),
+        lambda f: f.write(json.dumps(pointer).encode('utf-8'))
+    )
+
+    _remove_superseded(directory, key, version)
+    return version
+
+
+def _remove_superseded(directory: Path, key: str, version: str):
+    """Delete files of older versions; files still open elsewhere are left for later."""
+    current = f"features_{key}_{version}"
+    for pattern in (f"features_{key}_*.npy", f"features_{key}_*.npz"):
+        for path in directory.glob(pattern):
+            if path.name.startswith(current):
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def load_index_files(
+    dimension: int,
+    signature: Optional[Sequence] = None,
+    model_name: Optional[str] = None
+) -> Optional[Tuple[str, np.ndarray, Dict[str, np.ndarray]]]:
+    """
+    Map the current version of a dimension.
+
+    Args:
+        dimension: Embedding dimension
+        signature: Only load a version built from this database signature
+        model_name: Embedding model the index is scoped to, if any
+
+    Returns:
+        (version, read-only memmap matrix, metadata columns as object arrays),
+        or None if no usable version exists
+    """
+    pointer = read_pointer(dimension, model_name)
+    if pointer is None:
+        return None
+    if signature is not None and pointer.get('signature') != signature_key(signature):
+        return None
+
+    matrix_path, columns_path = _data_paths(
+        get_storage_dir(), storage_key(dimension, model_name), pointer['version']
+    )
+    try:
+        matrix = np.load(matrix_path, mmap_mode='r')
+        with np.load(columns_path) as data:
+            columns = {name: data[name].astype(object) for name in data.files}
+    except (OSError, ValueError) as e:
+        # Superseded and removed between reading the pointer and opening the files
+        print(f"Could not load shared feature index {pointer['version']}: {str(e)}")
+        return None
+
+    if matrix.ndim != 2 or matrix.shape[1] != dimension:
+        return None
+    if any(len(values) != matrix.shape[0] for values in columns.values()):
+        return None
+    return pointer['version'], matrix, columns
+
+
+def save_ivf_files(
+    dimension: int,
+    version: str,
+    matrix: np.ndarray,
+    ivf: IVFIndex,
+    model_name: Optional[str] = None
+) -> bool:
+    """
+    Export the IVF layout of an exported version, with its rows in cluster order.
+
+    Blocks are written in chunks of IVF_WRITE_CHUNK_ROWS rows, so the
+    export never holds a full copy of the matrix.
+
+    Args:
+        dimension: Embedding dimension of the matrix
+        version: Version of the exported matrix (see save_index_files)
+        matrix: The (n, dimension) matrix of that version
+        ivf: IVF index built over the matrix
+        model_name: Embedding model the matrix is scoped to, if any
+
+    Returns:
+        True if written, False if there is no storage directory
+    """
+    directory = get_storage_dir()
+    if directory is None:
+        return False
+
+    key = storage_key(dimension, model_name)
+    blocks_path = directory / f"features_{key}_{version}_ivf_{uuid.uuid4().hex[:8]}.npy"
+
+    def write_blocks(f):
+        np.lib.format.write_array_header_1_0(f, {
+            'descr': np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+            'fortran_order': False,
+            'shape': (len(ivf.order), matrix.shape[1]),
+        })
+        for start in range(0, len(ivf.order), IVF_WRITE_CHUNK_ROWS):
+            rows = ivf.order[start:start + IVF_WRITE_CHUNK_ROWS]
+            f.write(np.ascontiguousarray(matrix[rows], dtype=np.float32).tobytes())
+
+    # Blocks first: the layout file only ever names a complete blocks file
+    atomic_write(blocks_path, write_blocks)
+    atomic_write(_ivf_layout_path(directory, key, version), lambda f: np.savez(
+        f,
+        centroids=ivf.centroids,
+        assignments=ivf.assignments,
+        trained_rows=np.int64(ivf.trained_rows),
+        blocks=np.array(blocks_path.name),
+    ))
+
+    # Blocks of a concurrent export of the same version lost the race
+    for path in directory.glob(f"features_{key}_{version}_ivf_*.npy"):
+        if path != blocks_path:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+    return True
+
+
+def load_ivf_files(
+    dimension: int,
+    version: str,
+    matrix: np.ndarray,
+    model_name: Optional[str] = None
+) -> Optional[IVFIndex]:
+    """
+    Map the exported IVF layout of a version.
+
+    Args:
+        dimension: Embedding dimension
+        version: Version of the matrix (see load_index_files)
+        matrix: The (n, dimension) matrix of that version
+        model_name: Embedding model the index is scoped to, if any
+
+    Returns:
+        IVFIndex over read-only memmap blocks, or None if the version has
+        no usable IVF layout
+    """
+    directory = get_storage_dir()
+    if directory is None:
+        return None
+
+    path = _ivf_layout_path(directory, storage_key(dimension, model_name), version)
+    try:
+        with np.load(path) as data:
+            centroids = data['centroids'].astype(np.float32)
+            assignments = data['assignments']
+            trained_rows = int(data['trained_rows'])
+            blocks_name = str(data['blocks'])
+        blocks = np.load(directory / blocks_name, mmap_mode='r')
+    except (OSError, ValueError, KeyError) as e:
+        if path.exists():
+            print(f"Could not load shared IVF layout {version}: {str(e)}")
+        return None
+
+    if centroids.ndim != 2 or centroids.shape[1] != dimension:
+        return None
+    if len(assignments) != len(matrix) or blocks.shape != matrix.shape:
+        return None
+    return IVFIndex(matrix, centroids, assignments, trained_rows, blocks=blocks)
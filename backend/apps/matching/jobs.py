@@ -0,0 +1,343 @@
+"""
+Background job engine for requirement analysis.
+
+Jobs are queued as AnalysisJob rows and claimed by workers with a
+conditional UPDATE, so the queue needs nothing but the local database.
+Workers run either as threads inside the web process or as separate
+processes via the ``run_analysis_worker`` management command.
+"""
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from apps.matching.models import AnalysisJob, CapabilityRequirement
+from apps.matching.services import AnalysisCancelled, MatchingService
+
+
+class AnalysisJobError(Exception):
+    """Raised when a job cannot be submitted or changed."""
+
+
+class AnalysisJobService:
+    """
+    Service class for submitting, running and cancelling analysis jobs.
+    """
+
+    @staticmethod
+    def submit(
+        requirement_id: str,
+        threshold: float = 0.75,
+        limit: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        profile: Optional[str] = None
+    ) -> AnalysisJob:
+        """
+        Queue a matching analysis for a requirement.
+
+        Args:
+            requirement_id: UUID of the requirement to analyse
+            threshold: Similarity threshold for matching
+            limit: Max matches per requirement item
+            filters: Optional search pre-filters
+            profile: Retrieve-then-rerank profile (default: MATCHING_PIPELINE_PROFILE setting)
+
+        Returns:
+            The queued AnalysisJob
+
+        Raises:
+            AnalysisJobError: If the requirement already has an active job
+        """
+        with transaction.atomic():
+            # Lock the requirement row so concurrent submits serialize
+            requirement = CapabilityRequirement.objects.select_for_update().get(id=requirement_id)
+
+            if AnalysisJobService.has_active_job(requirement.id):
+                raise AnalysisJobError("Requirement already has an active analysis job")
+
+            job = AnalysisJob.objects.create(
+                requirement=requirement,
+                items_total=requirement.items.count(),
+                params={
+                    'threshold': threshold,
+                    'limit': limit,
+                    'filters': {
+                        name: [str(v) for v in values]
+                        for name, values in (filters or {}).items()
+                    },
+                    'profile': profile,
+                },
+            )
+
+        if getattr(settings, 'MATCHING_JOB_RUNNER', 'thread') == 'thread':
+            AnalysisWorkerPool.ensure_started()
+
+        return job
+
+    @staticmethod
+    def cancel(job_id: str) -> AnalysisJob:
+        """
+        Cancel a job.
+
+        Queued jobs are cancelled immediately; running jobs are flagged and
+        stop at the next progress report.
+
+        Args:
+            job_id: UUID of the job
+
+        Returns:
+            The updated AnalysisJob
+
+        Raises:
+            AnalysisJobError: If the job has already finished
+        """
+        cancelled = AnalysisJob.objects.filter(id=job_id, status='queued').update(
+            status='cancelled',
+            cancel_requested=True,
+            finished_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+        if not cancelled:
+            flagged = AnalysisJob.objects.filter(id=job_id, status='running').update(
+                cancel_requested=True,
+                updated_at=timezone.now()
+            )
+            if not flagged:
+                job = AnalysisJob.objects.get(id=job_id)
+                raise AnalysisJobError(f"Job is already {job.status}")
+
+        return AnalysisJob.objects.get(id=job_id)
+
+    @staticmethod
+    def claim_next(worker_id: str) -> Optional[AnalysisJob]:
+        """
+        Claim the oldest queued job.
+
+        The claim is a conditional UPDATE on the job status, so exactly one
+        worker wins even when several poll the same database.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+
+        Returns:
+            The claimed AnalysisJob, or None if the queue is empty
+        """
+        candidates = AnalysisJob.objects.filter(
+            status='queued'
+        ).order_by('created_at').values_list('id', flat=True)[:10]
+
+        for job_id in candidates:
+            claimed = AnalysisJob.objects.filter(id=job_id, status='queued').update(
+                status='running',
+                worker_id=worker_id,
+                started_at=timezone.now(),
+                updated_at=timezone.now()
+            )
+            if claimed:
+                return AnalysisJob.objects.get(id=job_id)
+
+        return None
+
+    @staticmethod
+    def requeue_stale(max_age_seconds: int) -> int:
+        """
+        Requeue running jobs whose worker stopped reporting progress.
+
+        Their requirements are released from 'processing' back to 'pending'
+        so the requeued run can claim them again.
+
+        Args:
+            max_age_seconds: Age of the last update after which a job is stale
+
+        Returns:
+            Number of requeued jobs
+        """
+        cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+        stale = AnalysisJob.objects.filter(status='running', updated_at__lt=cutoff)
+        stale_jobs = dict(stale.values_list('id', 'requirement_id'))
+        if not stale_jobs:
+            return 0
+
+        with transaction.atomic():
+            requeued = AnalysisJob.objects.filter(
+                id__in=list(stale_jobs),
+                status='running',
+                updated_at__lt=cutoff
+            ).update(status='queued', worker_id='', updated_at=timezone.now())
+            CapabilityRequirement.objects.filter(
+                id__in=set(stale_jobs.values()),
+                status='processing'
+            ).update(status='pending', updated_at=timezone.now())
+        return requeued
+
+    @staticmethod
+    def has_active_job(requirement_id: str) -> bool:
+        """Whether a queued or running job exists for a requirement."""
+        return AnalysisJob.objects.filter(
+            requirement_id=requirement_id,
+            status__in=AnalysisJob.ACTIVE_STATUSES
+        ).exists()
+
+    @staticmethod
+    def run(job: AnalysisJob) -> AnalysisJob:
+        """
+        Run a claimed job to completion.
+
+        Args:
+            job: AnalysisJob in 'running' status
+
+        Returns:
+            The finished AnalysisJob
+        """
+        params = job.params or {}
+        service = MatchingService(
+            threshold=params.get('threshold', 0.75),
+            profile=params.get('profile')
+        )
+
+        def check_cancelled():
+            if AnalysisJob.objects.filter(id=job.id, cancel_requested=True).exists():
+                raise AnalysisCancelled()
+
+        def report_progress(stage: str, done: int, total: int):
+            field = 'items_embedded' if stage == 'embedding' else 'items_matched'
+            AnalysisJob.objects.filter(id=job.id).update(
+                **{field: done},
+                items_total=total,
+                updated_at=timezone.now()
+            )
+            # Matching results are committed once done == total, so only
+            # earlier reports are cancellation points
+            if done < total:
+                check_cancelled()
+
+        try:
+            check_cancelled()
+            result = service.process_requirement(
+                requirement_id=str(job.requirement_id),
+                generate_embeddings=True,
+                limit=params.get('limit', 5),
+                filters=params.get('filters') or None,
+                progress_callback=report_progress
+            )
+            AnalysisJob.objects.filter(id=job.id).update(
+                status='completed',
+                result=result,
+                finished_at=timezone.now(),
+                updated_at=timezone.now()
+            )
+
+        except AnalysisCancelled:
+            AnalysisJob.objects.filter(id=job.id).update(
+                status='cancelled',
+                finished_at=timezone.now(),
+                updated_at=timezone.now()
+            )
+
+        except Exception as e:
+            traceback.print_exc()
+            AnalysisJob.objects.filter(id=job.id).update(
+                status='failed',
+                error=str(e),
+                finished_at=timezone.now(),
+                updated_at=timezone.now()
+            )
+
+        return AnalysisJob.objects.get(id=job.id)
+
+    @classmethod
+    def run_pending(cls, worker_id: str, max_jobs: Optional[int] = None) -> int:
+        """
+        Claim and run queued jobs until the queue is empty.
+
+        Args:
+            worker_id: Identifier of the worker
+            max_jobs: Optional maximum number of jobs to run
+
+        Returns:
+            Number of jobs run
+        """
+        count = 0
+        while max_jobs is None or count < max_jobs:
+            job = cls.claim_next(worker_id)
+            if job is None:
+                break
+            cls.run(job)
+            count += 1
+        return count
+
+
+class AnalysisWorkerPool:
+    """
+    Pool of daemon threads that poll the job queue inside this process.
+    """
+
+    _threads = []
+    _lock = threading.Lock()
+    _stop = threading.Event()
+
+    @classmethod
+    def ensure_started(cls, workers: Optional[int] = None):
+        """
+        Start the worker threads if they are not running yet.
+
+        Args:
+            workers: Number of threads (default: MATCHING_JOB_WORKERS setting)
+        """
+        with cls._lock:
+            cls._threads = [t for t in cls._threads if t.is_alive()]
+            if cls._threads:
+                return
+
+            cls._stop.clear()
+            workers = workers or getattr(settings, 'MATCHING_JOB_WORKERS', 2)
+            for n in range(workers):
+                thread = threading.Thread(
+                    target=cls.work_loop,
+                    args=(cls.make_worker_id(n), cls._stop),
+                    name=f'analysis-worker-{n}',
+                    daemon=True
+                )
+                thread.start()
+                cls._threads.append(thread)
+
+    @classmethod
+    def stop(cls):
+        """Signal all worker threads to exit after their current job."""
+        cls._stop.set()
+
+    @staticmethod
+    def make_worker_id(n: int = 0) -> str:
+        """Build a worker identifier unique across hosts and processes."""
+        return f"{socket.gethostname()}:{os.getpid()}:{n}"
+
+    @staticmethod
+    def work_loop(worker_id: str, stop: threading.Event, poll_interval: Optional[float] = None):
+        """
+        Poll for queued jobs and run them until stopped.
+
+        Args:
+            worker_id: Identifier of the worker
+            stop: Event that ends the loop when set
+            poll_interval: Seconds between polls of an empty queue
+        """
+        if poll_interval is None:
+            poll_interval = getattr(settings, 'MATCHING_JOB_POLL_INTERVAL', 1.0)
+
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                ran = AnalysisJobService.run_pending(worker_id, max_jobs=1)
+            except Exception:
+                traceback.print_exc()
+                ran = 0
+            if not ran:
+                stop.wait(poll_interval)
+
+        close_old_connections()
@@ -0,0 +1,409 @@
+"""
+BM25 lexical retrieval over product features, and rank fusion with vector search.
+
+Requirements often name exact products, protocols and Chinese technical
+terms that embeddings blur. Feature texts (name, description and
+function levels) are tokenized into lowercase ASCII words and CJK
+character bigrams and kept in an in-process inverted index, persisted
+next to the database for the signature it was built from.
+"""
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from apps.matching.ann import get_storage_dir
+from apps.matching.index_store import atomic_write, signature_key
+from apps.products.changes import catalogue_signature, register_listener
+from apps.products.models import Feature
+
+_CJK_CHARS = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_CJK_RUN_RE = re.compile(f'[{_CJK_CHARS}]+')
+# ASCII terms keep inner dots/dashes/plus signs: tls1.2, sha-256, c++
+_TOKEN_RE = re.compile(f'[{_CJK_CHARS}]+|' + r'[a-z0-9]+(?:[._+-][a-z0-9]+)*\+*')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into BM25 terms.
+
+    ASCII words and numbers are lowercased whole; runs of CJK characters
+    become overlapping bigrams (a single character stays a unigram).
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms, in order, with repeats
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer((text or '').lower()):
+        term = match.group()
+        if _CJK_RUN_RE.fullmatch(term):
+            if len(term) == 1:
+                tokens.append(term)
+            else:
+                tokens.extend(term[i:i + 2] for i in range(len(term) - 1))
+        else:
+            tokens.append(term)
+    return tokens
+
+
+def competition_ranks(scores: Sequence[float]) -> List[int]:
+    """
+    Rank scores sorted best first, tied scores sharing the best rank (1, 2, 2, 4).
+
+    Args:
+        scores: Scores in descending order
+
+    Returns:
+        1-based rank of each score
+    """
+    ranks = []
+    for position, score in enumerate(scores, start=1):
+        if ranks and score == scores[position - 2]:
+            ranks.append(ranks[-1])
+        else:
+            ranks.append(position)
+    return ranks
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence],
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None,
+    ranks: Optional[Sequence[Optional[Sequence[int]]]] = None
+) -> List[Tuple[object, float]]:
+    """
+    Fuse several rankings with reciprocal rank fusion.
+
+    Each ranking contributes weight / (k + rank) to every key it contains.
+
+    Args:
+        rankings: Ranked key lists, best first
+        k: Rank offset damping the head of each ranking
+        weights: Optional weight per ranking
+        ranks: Optional explicit ranks per ranking (e.g. competition_ranks,
+            so ties share a rank); None uses positions 1, 2, 3, ...
+
+    Returns:
+        List of (key, fused score) tuples, best first
+    """
+    scores: Dict[object, float] = {}
+    for i, ranking in enumerate(rankings):
+        weight = weights[i] if weights else 1.0
+        positions = ranks[i] if ranks and ranks[i] is not None else range(1, len(ranking) + 1)
+        for rank, key in zip(positions, ranking):
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring.
+
+    Postings are stored CSR-style: the documents of term t are
+    ``doc_ids[offsets[t]:offsets[t + 1]]`` with matching ``term_freqs``.
+    """
+
+    FILE_NAME = 'bm25.npz'
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        feature_ids: np.ndarray,
+        product_ids: np.ndarray,
+        signature: Optional[Tuple] = None,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            terms: Vocabulary, sorted
+            offsets: Posting list boundaries, len(terms) + 1
+            doc_ids: Document of each posting
+            term_freqs: Term frequency of each posting
+            doc_lengths: Token count per document
+            feature_ids: Feature UUID strings, one per document
+            product_ids: Product UUID strings, one per document
+            signature: Catalogue signature the index was built from
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+        """
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.feature_ids = feature_ids
+        self.product_ids = product_ids
+        self.signature = signature
+        self.k1 = k1
+        self.b = b
+        self.removed: Optional[np.ndarray] = None
+
+        doc_count = len(feature_ids)
+        doc_freqs = np.diff(offsets)
+        self.idf = np.log(1.0 + (doc_count - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        average = doc_lengths.mean() if doc_count else 1.0
+        # Per-document part of the BM25 denominator
+        self.length_norm = (k1 * (1 - b + b * doc_lengths / max(average, 1.0))).astype(np.float32)
+        self._rows: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.feature_ids)
+
+    @staticmethod
+    def feature_text(feature: Feature) -> str:
+        """Text of a feature that is indexed."""
+        return ' '.join(filter(None, [
+            feature.feature_name,
+            feature.description,
+            feature.level1_function,
+            feature.level2_function,
+        ]))
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: Iterable[Tuple[str, str, str]],
+        signature: Optional[Tuple] = None
+    ) -> 'BM25Index':
+        """
+        Build an index from (feature_id, product_id, text) documents.
+
+        Args:
+            documents: Iterable of (feature_id, product_id, text)
+            signature: Catalogue signature to record on the index
+
+        Returns:
+            BM25Index instance
+        """
+        feature_ids = []
+        product_ids = []
+        doc_lengths = []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc, (feature_id, product_id, text) in enumerate(documents):
+            tokens = tokenize(text)
+            feature_ids.append(feature_id)
+            product_ids.append(product_id)
+            doc_lengths.append(len(tokens))
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc, count))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        pairs = [pair for term in terms for pair in postings[term]]
+        doc_ids = np.array([doc for doc, _ in pairs], dtype=np.int32)
+        term_freqs = np.array([count for _, count in pairs], dtype=np.float32)
+
+        return cls(
+            np.array(terms, dtype=object),
+            offsets,
+            doc_ids,
+            term_freqs,
+            np.array(doc_lengths, dtype=np.float32),
+            np.array(feature_ids, dtype=object),
+            np.array(product_ids, dtype=object),
+            signature=signature,
+        )
+
+    @classmethod
+    def build(cls, signature: Optional[Tuple] = None) -> 'BM25Index':
+        """
+        Build an index over all active features of active products.
+
+        Args:
+            signature: Catalogue signature to record on the index
+
+        Returns:
+            BM25Index instance
+        """
+        features = Feature.objects.filter(
+            is_active=True,
+            product__is_active=True
+        ).only(
+            'id', 'product_id', 'feature_name', 'description', 'level1_function', 'level2_function'
+        ).iterator(chunk_size=2000)
+        return cls.from_documents(
+            ((str(f.id), str(f.product_id), cls.feature_text(f)) for f in features),
+            signature=signature,
+        )
+
+    def save(self):
+        """Persist the index atomically next to the database."""
+        directory = get_storage_dir()
+        if directory is None:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        atomic_write(directory / self.FILE_NAME, lambda f: np.savez(
+            f,
+            terms=self.terms.astype(str),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths,
+            feature_ids=self.feature_ids.astype(str),
+            product_ids=self.product_ids.astype(str),
+            signature=np.array(signature_key(self.signature), dtype=str),
+        ))
+
+    @classmethod
+    def load(cls, signature: Tuple) -> Optional['BM25Index']:
+        """Load the persisted index if it was built for this signature."""
+        directory = get_storage_dir()
+        path = directory / cls.FILE_NAME if directory else None
+        if path is None or not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                if data['signature'].tolist() != signature_key(signature):
+                    return None
+                return cls(
+                    data['terms'].astype(object),
+                    data['offsets'],
+                    data['doc_ids'],
+                    data['term_freqs'],
+                    data['doc_lengths'],
+                    data['feature_ids'].astype(object),
+                    data['product_ids'].astype(object),
+                    signature=signature,
+                )
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable BM25 index {path}: {str(e)}")
+            return None
+
+    def _feature_rows(self) -> Dict[str, int]:
+        if self._rows is None:
+            self._rows = {feature_id: row for row, feature_id in enumerate(self.feature_ids)}
+        return self._rows
+
+    def rows(self, feature_ids: Iterable[str]) -> np.ndarray:
+        """Documents of the given features."""
+        rows = self._feature_rows()
+        return np.array(
+            [rows[f] for f in feature_ids if f in rows],
+            dtype=np.int64
+        )
+
+    def feature_scores(self, text: str, feature_ids: Sequence[str]) -> np.ndarray:
+        """
+        BM25 scores of some features for a query.
+
+        Args:
+            text: Query text
+            feature_ids: Feature UUID strings
+
+        Returns:
+            float32 score per feature, in the order given (0 for unknown features)
+        """
+        scores = self.scores(text)
+        rows = self._feature_rows()
+        return np.array(
+            [scores[rows[f]] if f in rows else 0.0 for f in feature_ids],
+            dtype=np.float32
+        )
+
+    def remove(self, feature_ids: Sequence[str] = (), product_ids: Sequence[str] = ()):
+        """Hide the documents of removed features or products without rebuilding."""
+        hidden = np.isin(self.feature_ids, list(feature_ids)) | np.isin(self.product_ids, list(product_ids))
+        self.removed = hidden if self.removed is None else self.removed | hidden
+
+    def scores(self, text: str) -> np.ndarray:
+        """
+        BM25 score of every document for a query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            float32 score per document (0 for documents without query terms)
+        """
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(text)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            freqs = self.term_freqs[start:end]
+            scores[docs] += self.idf[term_id] * freqs * (self.k1 + 1) / (freqs + self.length_norm[docs])
+        return scores
+
+    def search(
+        self,
+        text: str,
+        limit: int = 100,
+        mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the top-k documents for a query.
+
+        Args:
+            text: Query text
+            limit: Maximum number of results
+            mask: Optional boolean document mask restricting the candidates
+
+        Returns:
+            List of (document, score) tuples with a positive score, best first
+        """
+        scores = self.scores(text)
+        if self.removed is not None:
+            scores[self.removed] = 0.0
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return [(int(doc), float(scores[doc])) for doc in matched]
+
+
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> BM25Index:
+    """
+    Get the process-wide BM25 index, loading or rebuilding it when stale.
+
+    Returns:
+        BM25Index instance
+    """
+    global _index
+    signature = catalogue_signature()
+    if _index is not None and _index.signature == signature:
+        return _index
+
+    with _index_lock:
+        if _index is None or _index.signature != signature:
+            index = BM25Index.load(signature)
+            if index is None:
+                index = BM25Index.build(signature)
+                index.save()
+            _index = index
+        return _index
+
+
+def apply_removals(feature_ids: List[str], product_ids: List[str], before: Tuple, after: Tuple):
+    """Apply committed soft deletes to the cached index (see apps.products.changes)."""
+    with _index_lock:
+        if _index is not None and _index.signature == before:
+            _index.remove(feature_ids, product_ids)
+            _index.signature = after
+
+
+register_listener(apply_removals)
@@ -0,0 +1,84 @@
+"""
+Django management command to report stored embeddings and index footprint per model.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Func, IntegerField, Max, Min, Q, Sum
+
+from apps.matching.algorithms import MatchingAlgorithm, VectorDims
+from apps.matching.index_store import read_pointer
+from apps.products.models import FeatureEmbedding
+from apps.products.vector_indexes import INDEX_METHODS, get_index_name, list_vector_indexes
+
+
+class ColumnSize(Func):
+    """Stored size in bytes of a column value."""
+    function = 'length'
+    output_field = IntegerField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='pg_column_size', **extra_context)
+
+
+class Command(BaseCommand):
+    help = 'Report row counts, dimensions and storage/index footprint of the embeddings of each model'
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        postgres = connection.vendor == 'postgresql'
+        active = Q(feature__is_active=True, feature__product__is_active=True)
+
+        if postgres:
+            dimensions = {
+                'min_dimension': Min(VectorDims('embedding')),
+                'max_dimension': Max(VectorDims('embedding')),
+            }
+        else:
+            # float BLOBs (see apps.products.fields.BinaryVectorField)
+            itemsize = FeatureEmbedding._meta.get_field('embedding').dtype.itemsize
+            dimensions = {
+                'min_dimension': Min(ColumnSize('embedding')) / itemsize,
+                'max_dimension': Max(ColumnSize('embedding')) / itemsize,
+            }
+
+        models = FeatureEmbedding.objects.values('model_name').annotate(
+            rows=Count('id'),
+            active_rows=Count('id', filter=active),
+            stored_bytes=Sum(ColumnSize('embedding')),
+            **dimensions
+        ).order_by('model_name')
+
+        ann_sizes = {}
+        if postgres:
+            ann_sizes = {index['name']: index['size'] for index in list_vector_indexes(connection)}
+
+        active_model = MatchingAlgorithm.get_active_model_name()
+        self.stdout.write(
+            f"{'model':<40}{'dim':>7}{'rows':>10}{'active':>10}{'stored MB':>11}{'matrix MB':>11}  indexes"
+        )
+        for row in models:
+            model_name = row['model_name']
+            min_dimension = int(row['min_dimension'] or 0)
+            max_dimension = int(row['max_dimension'] or 0)
+            dimension = str(min_dimension) if min_dimension == max_dimension else f"{min_dimension}-{max_dimension}"
+            # In-process float32 matrix of the model's active rows
+            matrix_mb = row['active_rows'] * max_dimension * 4 / 1024 ** 2
+
+            indexes = []
+            for method in INDEX_METHODS:
+                name = get_index_name(model_name, method)
+                if name in ann_sizes:
+                    indexes.append(f"{method} {ann_sizes[name]}")
+            pointer = read_pointer(max_dimension, model_name) if max_dimension else None
+            if pointer is not None:
+                indexes.append(f"shared {pointer['version']} ({pointer['rows']} rows)")
+
+            label = f"{model_name} *" if model_name == active_model else model_name
+            self.stdout.write(
+                f"{label:<40}{dimension:>7}{row['rows']:>10}{row['active_rows']:>10}"
+                f"{(row['stored_bytes'] or 0) / 1024 ** 2:>11.1f}{matrix_mb:>11.1f}  "
+                f"{', '.join(indexes) or '-'}"
+            )
+
+        if active_model:
+            self.stdout.write("* active model; searches only scan its embeddings")
@@ -0,0 +1,105 @@
+"""
+Django management command to measure recall and memory of quantized feature indexes.
+"""
+import copy
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.embeddings.services import EmbeddingServiceFactory
+from apps.matching.quantization import QUANTIZATION_METHODS
+from apps.matching.vector_index import FeatureVectorIndex
+
+
+class Command(BaseCommand):
+    help = 'Report recall@k, latency and memory of sq8/pq quantized search against exact search'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dimension',
+            type=int,
+            default=None,
+            help='Embedding dimension to index (default: the active model dimension)'
+        )
+        parser.add_argument('--model', default=None, help='Only search embeddings of this model')
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Number of stored embeddings sampled as queries'
+        )
+        parser.add_argument('--limit', type=int, default=5, help='k for recall@k')
+        parser.add_argument(
+            '--methods',
+            default=','.join(QUANTIZATION_METHODS),
+            help='Comma-separated quantization methods'
+        )
+        parser.add_argument(
+            '--rerank',
+            default='0,50',
+            help='Comma-separated rerank candidate counts (0: rank by codes only)'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        dimension = options['dimension']
+        if dimension is None:
+            config = EmbeddingServiceFactory.get_default_config()
+            if config is None:
+                raise CommandError('No active embedding configuration; pass --dimension')
+            dimension = config.dimension
+
+        index = FeatureVectorIndex.build(dimension, model_name=options['model'])
+        if len(index) <= options['limit']:
+            raise CommandError(f"Not enough {dimension}-dimensional embeddings to benchmark")
+
+        rng = np.random.default_rng(0)
+        query_rows = rng.choice(len(index), min(options['queries'], len(index)), replace=False)
+        queries = index.matrix[query_rows]
+        limit = options['limit']
+
+        def top_rows(hits_per_query):
+            # Drop each query's own row, which every method finds first
+            return [
+                [row for row, _ in hits if row != query_row][:limit]
+                for query_row, hits in zip(query_rows, hits_per_query)
+            ]
+
+        started = time.perf_counter()
+        exact = top_rows(index.search_batch(queries, limit=limit + 1, exact=True))
+        exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        self.stdout.write(
+            f"{len(index)} vectors of dimension {dimension}, {len(queries)} queries, k={limit}"
+        )
+        self.stdout.write(
+            f"Exact: {index.matrix.nbytes / 1024 ** 2:.1f} MB, {exact_ms:.2f} ms/query"
+        )
+        self.stdout.write(
+            f"{'method':<8}{'rerank':>8}{'recall@k':>10}{'ms/query':>10}{'codes MB':>10}{'train s':>9}"
+        )
+
+        for method in [m.strip() for m in options['methods'].split(',') if m.strip()]:
+            if method not in QUANTIZATION_METHODS:
+                raise CommandError(f"Unsupported method: {method}")
+            quantized = copy.copy(index)
+            started = time.perf_counter()
+            quantized.quantize(method, keep_matrix=True)
+            train_seconds = time.perf_counter() - started
+            code_mb = (quantized.codes.nbytes + quantized.quantizer.nbytes) / 1024 ** 2
+
+            for rerank in [int(r) for r in options['rerank'].split(',') if r.strip()]:
+                # The query's own row takes one rerank slot
+                quantized.rerank = rerank + 1 if rerank else 0
+                started = time.perf_counter()
+                approximate = top_rows(quantized.search_batch(queries, limit=limit + 1))
+                ms = (time.perf_counter() - started) * 1000 / len(queries)
+                recall = np.mean([
+                    len(set(found) & set(expected)) / len(expected)
+                    for found, expected in zip(approximate, exact)
+                    if expected
+                ])
+                self.stdout.write(
+                    f"{method:<8}{rerank:>8}{recall:>10.3f}{ms:>10.2f}{code_mb:>10.1f}{train_seconds:>9.1f}"
+                )
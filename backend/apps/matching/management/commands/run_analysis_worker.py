@@ -0,0 +1,73 @@
+"""
+Django management command to run background analysis job workers.
+"""
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.embeddings.services import EmbeddingServiceFactory
+from apps.matching.jobs import AnalysisJobService, AnalysisWorkerPool
+
+
+class Command(BaseCommand):
+    help = 'Run workers that process queued requirement analysis jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'MATCHING_JOB_WORKERS', 2),
+            help='Number of worker threads'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run all queued jobs in this thread and exit'
+        )
+        parser.add_argument(
+            '--requeue-stale',
+            type=int,
+            default=None,
+            metavar='SECONDS',
+            help='Requeue running jobs not updated for this many seconds before starting'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        if options['requeue_stale'] is not None:
+            count = AnalysisJobService.requeue_stale(options['requeue_stale'])
+            self.stdout.write(f"Requeued {count} stale job(s)")
+
+        if options['once']:
+            count = AnalysisJobService.run_pending(AnalysisWorkerPool.make_worker_id())
+            self.stdout.write(self.style.SUCCESS(f"Processed {count} job(s)"))
+            return
+
+        if getattr(settings, 'EMBEDDING_WARMUP', True):
+            EmbeddingServiceFactory.warm_up()
+
+        stop = threading.Event()
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        threads = []
+        for n in range(options['workers']):
+            thread = threading.Thread(
+                target=AnalysisWorkerPool.work_loop,
+                args=(AnalysisWorkerPool.make_worker_id(n), stop),
+                name=f'analysis-worker-{n}'
+            )
+            thread.start()
+            threads.append(thread)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Started {len(threads)} analysis worker(s). Press Ctrl+C to stop."
+        ))
+
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1.0)
+
+        self.stdout.write('Workers stopped.')
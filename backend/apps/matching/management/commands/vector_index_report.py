@@ -0,0 +1,112 @@
+"""
+Django management command to measure ANN recall and latency against exact search.
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.matching.algorithms import MatchingAlgorithm, _check_pgvector_available
+from apps.matching.vector_index import get_feature_index
+from apps.products.models import FeatureEmbedding
+from apps.products.vector_indexes import INDEX_METHODS, get_index_name, list_vector_indexes
+
+
+class Command(BaseCommand):
+    help = 'Report recall@k and latency of pgvector ANN search for several ef_search/probes values'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            required=True,
+            help='Embedding model name to evaluate'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=100,
+            help='Number of stored embeddings sampled as queries'
+        )
+        parser.add_argument('--limit', type=int, default=10, help='k for recall@k')
+        parser.add_argument(
+            '--ef-search',
+            default='20,40,100,200',
+            help='Comma-separated HNSW ef_search values'
+        )
+        parser.add_argument(
+            '--probes',
+            default='1,5,10,20',
+            help='Comma-separated IVFFlat probes values'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        if not _check_pgvector_available():
+            raise CommandError('ANN search requires PostgreSQL with pgvector')
+
+        model_name = options['model']
+        limit = options['limit']
+
+        queries = [
+            np.asarray(embedding, dtype=np.float32)
+            for embedding in FeatureEmbedding.objects.filter(
+                model_name=model_name,
+                feature__is_active=True,
+                feature__product__is_active=True
+            ).order_by('?').values_list('embedding', flat=True)[:options['queries']]
+        ]
+        if not queries:
+            raise CommandError(f"No embeddings stored for model {model_name}")
+
+        # Exact top-k from the in-process index of this model
+        index = get_feature_index(len(queries[0]), model_name)
+        started = time.perf_counter()
+        exact_hits = index.search_batch(queries, limit=limit, min_score=0.0, exact=True)
+        exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        exact = [{index.feature_ids[row] for row, _ in hits} for hits in exact_hits]
+
+        self.stdout.write(
+            f"Model {model_name}: {len(index)} vectors, {len(queries)} queries, k={limit}"
+        )
+        self.stdout.write(f"Exact (in-process): {exact_ms:.2f} ms/query")
+
+        index_names = {get_index_name(model_name, method) for method in INDEX_METHODS}
+        existing = [i['name'] for i in list_vector_indexes(connection) if i['name'] in index_names]
+        if existing:
+            self.stdout.write(f"ANN indexes: {', '.join(existing)}")
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"No ANN index for {model_name}; the timings below are exact scans. "
+                f"Create one with `python manage.py vector_indexes create --model {model_name}`"
+            ))
+        self.stdout.write(f"{'setting':<20}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}")
+
+        settings_to_test = [
+            ('ef_search', int(value)) for value in options['ef_search'].split(',') if value.strip()
+        ] + [
+            ('probes', int(value)) for value in options['probes'].split(',') if value.strip()
+        ]
+        for name, value in settings_to_test:
+            algorithm = MatchingAlgorithm(**{name: value})
+            recalls = []
+            latencies = []
+            for query, expected in zip(queries, exact):
+                started = time.perf_counter()
+                matches = algorithm.find_matches_using_pgvector(
+                    query.tolist(),
+                    limit=limit,
+                    min_score=0.0,
+                    model_name=model_name
+                )
+                latencies.append((time.perf_counter() - started) * 1000)
+                if expected:
+                    found = {match['feature_id'] for match in matches}
+                    recalls.append(len(found & expected) / len(expected))
+
+            self.stdout.write(
+                f"{name + '=' + str(value):<20}"
+                f"{np.mean(recalls) if recalls else 0.0:>10.3f}"
+                f"{np.mean(latencies):>10.2f}"
+                f"{np.percentile(latencies, 95):>10.2f}"
+            )
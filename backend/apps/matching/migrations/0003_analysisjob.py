@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-17 12:34
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matching', '0002_capabilityrequirement_title'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], db_index=True, default='queued', max_length=20)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('items_total', models.IntegerField(default=0)),
+                ('items_embedded', models.IntegerField(default=0)),
+                ('items_matched', models.IntegerField(default=0)),
+                ('cancel_requested', models.BooleanField(default=False)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('worker_id', models.CharField(blank=True, max_length=100)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requirement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_jobs', to='matching.capabilityrequirement')),
+            ],
+            options={
+                'verbose_name': 'Analysis Job',
+                'verbose_name_plural': 'Analysis Jobs',
+                'db_table': 'analysis_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -121,3 +121,48 @@ class MatchRecord(TimeStampedModel):
 
     def __str__(self):
         return f"Match: {self.requirement_item.item_text[:30]} -> {self.feature.feature_name} ({self.similarity_score:.2f})"
+
+
+class AnalysisJob(TimeStampedModel):
+    """Background matching analysis job."""
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    ACTIVE_STATUSES = ['queued', 'running']
+
+    requirement = models.ForeignKey(
+        CapabilityRequirement,
+        on_delete=models.CASCADE,
+        related_name='analysis_jobs'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued',
+        db_index=True
+    )
+    params = models.JSONField(default=dict, blank=True)
+    items_total = models.IntegerField(default=0)
+    items_embedded = models.IntegerField(default=0)
+    items_matched = models.IntegerField(default=0)
+    cancel_requested = models.BooleanField(default=False)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    worker_id = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'analysis_jobs'
+        verbose_name = 'Analysis Job'
+        verbose_name_plural = 'Analysis Jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status})"
@@ -0,0 +1,263 @@
+"""
+Compressed vector codes for the in-process feature index.
+
+Two quantizers are available:
+
+- ``ScalarQuantizer`` (``sq8``): one byte per component, each dimension
+  mapped linearly from its [min, max] range onto 0-255 (4x smaller).
+- ``ProductQuantizer`` (``pq``): the vector is split into subspaces and
+  each sub-vector replaced by the id of its nearest of 256 k-means
+  centroids, one byte per subspace (32x smaller with 8-dim subspaces).
+
+Both score normalized queries against codes directly (asymmetric
+distance: queries stay full precision); FeatureVectorIndex reranks the
+best candidates with the original vectors.
+"""
+from typing import Optional
+
+import numpy as np
+
+# Rows scored per step, bounds the temporary (queries, rows) matrices
+SCORE_CHUNK_SIZE = 4096
+
+QUANTIZATION_METHODS = ('sq8', 'pq')
+
+
+class ScalarQuantizer:
+    """
+    int8 scalar quantization with a per-dimension range.
+    """
+
+    method = 'sq8'
+
+    def __init__(self, low: np.ndarray, scale: np.ndarray):
+        """
+        Initialize the quantizer.
+
+        Args:
+            low: Per-dimension minimum
+            scale: Per-dimension step between two code values
+        """
+        self.low = low.astype(np.float32)
+        self.scale = scale.astype(np.float32)
+
+    @property
+    def dimension(self) -> int:
+        return self.low.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.low.nbytes + self.scale.nbytes
+
+    @classmethod
+    def train(cls, matrix: np.ndarray) -> 'ScalarQuantizer':
+        """
+        Fit the per-dimension ranges of a matrix.
+
+        Args:
+            matrix: (n, dimension) float32 matrix
+
+        Returns:
+            ScalarQuantizer instance
+        """
+        low = matrix.min(axis=0)
+        scale = (matrix.max(axis=0) - low) / 255.0
+        scale[scale == 0] = 1.0
+        return cls(low, scale)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        """Encode a (n, dimension) matrix as (n, dimension) uint8 codes."""
+        codes = np.rint((matrix - self.low) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Approximate vectors back from codes."""
+        return codes.astype(np.float32) * self.scale + self.low
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Approximate dot products of queries with encoded rows.
+
+        q.x ~= q.low + (q * scale).codes, so codes are only converted to
+        float chunk by chunk.
+
+        Args:
+            queries: (q, dimension) float32 matrix
+            codes: (n, dimension) uint8 codes
+
+        Returns:
+            (q, n) float32 score matrix
+        """
+        offsets = queries @ self.low
+        scaled = queries * self.scale
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_CHUNK_SIZE):
+            chunk = codes[start:start + SCORE_CHUNK_SIZE].astype(np.float32)
+            scores[:, start:start + len(chunk)] = scaled @ chunk.T
+        scores += offsets[:, None]
+        return scores
+
+
+class ProductQuantizer:
+    """
+    Product quantization with 256 centroids per subspace.
+    """
+
+    method = 'pq'
+
+    def __init__(self, centroids: np.ndarray):
+        """
+        Initialize the quantizer.
+
+        Args:
+            centroids: (subspaces, 256, subspace dimension) float32 codebooks
+        """
+        self.centroids = centroids.astype(np.float32)
+
+    @property
+    def subspaces(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        return self.centroids.shape[0] * self.centroids.shape[2]
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes
+
+    @staticmethod
+    def default_subspaces(dimension: int, subspace_dimension: int = 8) -> int:
+        """Largest subspace count that divides the dimension, with about 8 dims each."""
+        for subspaces in range(max(1, dimension // subspace_dimension), 0, -1):
+            if dimension % subspaces == 0:
+                return subspaces
+        return 1
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Nearest centroid (Euclidean) of each vector."""
+        distances = (centroids ** 2).sum(axis=1) - 2 * (vectors @ centroids.T)
+        return np.argmin(distances, axis=1)
+
+    @classmethod
+    def train(
+        cls,
+        matrix: np.ndarray,
+        subspaces: Optional[int] = None,
+        iterations: int = 10,
+        sample_size: int = 16384,
+        seed: int = 0
+    ) -> 'ProductQuantizer':
+        """
+        Train one k-means codebook per subspace.
+
+        Args:
+            matrix: (n, dimension) float32 matrix
+            subspaces: Number of subspaces (default: about dimension / 8)
+            iterations: k-means iterations
+            sample_size: Training rows sampled from the matrix
+            seed: Random seed
+
+        Returns:
+            ProductQuantizer instance
+        """
+        rng = np.random.default_rng(seed)
+        dimension = matrix.shape[1]
+        subspaces = subspaces or cls.default_subspaces(dimension)
+        if dimension % subspaces != 0:
+            raise ValueError(f"{subspaces} subspaces do not divide dimension {dimension}")
+        width = dimension // subspaces
+
+        sample = matrix
+        if len(matrix) > sample_size:
+            sample = matrix[rng.choice(len(matrix), sample_size, replace=False)]
+        ksub = min(256, len(sample))
+
+        centroids = np.zeros((subspaces, 256, width), dtype=np.float32)
+        for j in range(subspaces):
+            vectors = np.ascontiguousarray(sample[:, j * width:(j + 1) * width])
+            codebook = vectors[rng.choice(len(vectors), ksub, replace=False)].copy()
+            for _ in range(iterations):
+                assignments = cls._assign(vectors, codebook)
+                # Per-column bincount is much faster than np.add.at for narrow subspaces
+                sums = np.stack([
+                    np.bincount(assignments, weights=vectors[:, d], minlength=ksub)
+                    for d in range(width)
+                ], axis=1)
+                counts = np.bincount(assignments, minlength=ksub)
+
+                # Reseed empty clusters with random sample rows
+                empty = counts == 0
+                counts[empty] = 1
+                codebook = (sums / counts[:, None]).astype(np.float32)
+                if empty.any():
+                    codebook[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            centroids[j, :ksub] = codebook
+            # Unused slots (fewer than 256 rows) repeat a real centroid
+            centroids[j, ksub:] = codebook[0]
+
+        return cls(centroids)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        """Encode a (n, dimension) matrix as (n, subspaces) uint8 codes."""
+        width = self.centroids.shape[2]
+        codes = np.empty((len(matrix), self.subspaces), dtype=np.uint8)
+        for start in range(0, len(matrix), SCORE_CHUNK_SIZE):
+            chunk = matrix[start:start + SCORE_CHUNK_SIZE]
+            for j in range(self.subspaces):
+                codes[start:start + len(chunk), j] = self._assign(
+                    chunk[:, j * width:(j + 1) * width], self.centroids[j]
+                )
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Approximate vectors back from codes."""
+        parts = [self.centroids[j][codes[:, j]] for j in range(self.subspaces)]
+        return np.concatenate(parts, axis=1)
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Approximate dot products of queries with encoded rows.
+
+        Each query's dot product with every centroid is tabulated once;
+        a row's score is then the sum of its subspaces' table entries.
+
+        Args:
+            queries: (q, dimension) float32 matrix
+            codes: (n, subspaces) uint8 codes
+
+        Returns:
+            (q, n) float32 score matrix
+        """
+        width = self.centroids.shape[2]
+        # tables[j] is the (q, 256) dot-product table of subspace j
+        tables = np.stack([
+            queries[:, j * width:(j + 1) * width] @ self.centroids[j].T
+            for j in range(self.subspaces)
+        ])
+        scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_CHUNK_SIZE):
+            chunk = codes[start:start + SCORE_CHUNK_SIZE]
+            block = scores[:, start:start + len(chunk)]
+            for j in range(self.subspaces):
+                block += tables[j][:, chunk[:, j]]
+        return scores
+
+
+def train_quantizer(matrix: np.ndarray, method: str):
+    """
+    Train a quantizer of the given method on a matrix.
+
+    Args:
+        matrix: (n, dimension) float32 matrix of normalized vectors
+        method: 'sq8' or 'pq'
+
+    Returns:
+        ScalarQuantizer or ProductQuantizer instance
+    """
+    if method == 'sq8':
+        return ScalarQuantizer.train(matrix)
+    if method == 'pq':
+        return ProductQuantizer.train(matrix)
+    raise ValueError(f"Unsupported quantization: {method}. Supported: {list(QUANTIZATION_METHODS)}")
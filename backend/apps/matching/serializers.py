@@ -1,8 +1,10 @@
 """
 Serializers for Matching models.
 """
+from django.conf import settings
 from rest_framework import serializers
-from .models import CapabilityRequirement, RequirementItem, MatchRecord
+from apps.products.models import Product, Feature
+from .models import CapabilityRequirement, RequirementItem, MatchRecord, AnalysisJob
 
 
 class RequirementItemSerializer(serializers.ModelSerializer):
@@ -114,7 +116,26 @@ class MatchAnalyzeSerializer(serializers.Serializer):
         required=False,
         allow_empty=True
     )
+    subsystem_type = serializers.ListField(
+        child=serializers.ChoiceField(choices=Product.SUBSYSTEM_TYPE_CHOICES),
+        required=False,
+        allow_empty=True
+    )
+    indicator_type = serializers.ListField(
+        child=serializers.ChoiceField(choices=Feature.INDICATOR_TYPE_CHOICES),
+        required=False,
+        allow_empty=True
+    )
+    level1_function = serializers.ListField(
+        child=serializers.CharField(max_length=200),
+        required=False,
+        allow_empty=True
+    )
     limit = serializers.IntegerField(default=5, min_value=1, max_value=20)
+    profile = serializers.CharField(required=False, allow_blank=True)
+    background = serializers.BooleanField(default=False)
+
+    FILTER_FIELDS = ['product_ids', 'subsystem_type', 'indicator_type', 'level1_function']
 
     def validate_requirement_id(self, value):
         """Validate that requirement exists."""
@@ -122,6 +143,50 @@ class MatchAnalyzeSerializer(serializers.Serializer):
             raise serializers.ValidationError("Requirement not found.")
         return value
 
+    def validate_profile(self, value):
+        """Validate that the retrieve-then-rerank profile is configured."""
+        if value and value not in getattr(settings, 'MATCHING_PIPELINE_PROFILES', {}):
+            raise serializers.ValidationError("Unknown matching profile.")
+        return value
+
+
+class AnalysisJobSerializer(serializers.ModelSerializer):
+    """Serializer for AnalysisJob model."""
+
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AnalysisJob
+        fields = [
+            'id',
+            'requirement',
+            'status',
+            'status_display',
+            'params',
+            'items_total',
+            'items_embedded',
+            'items_matched',
+            'progress',
+            'cancel_requested',
+            'result',
+            'error',
+            'started_at',
+            'finished_at',
+            'created_at',
+            'updated_at',
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Get overall progress in percent; embedding and matching count half each."""
+        if obj.status == 'completed':
+            return 100.0
+        if not obj.items_total:
+            return 0.0
+        done = obj.items_embedded + obj.items_matched
+        return round(min(done / (2 * obj.items_total), 1.0) * 100, 1)
+
 
 class MatchResultSerializer(serializers.Serializer):
     """Serializer for match analysis results."""
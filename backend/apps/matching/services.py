@@ -2,88 +2,169 @@
 Matching service for processing requirements and finding matches.
 """
 import uuid
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from typing import Callable, List, Dict, Any, Optional, Sequence
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q
+from django.utils import timezone
 from django.core.cache import cache
 from apps.matching.models import CapabilityRequirement, RequirementItem, MatchRecord
 from apps.matching.algorithms import MatchingAlgorithm
 from apps.embeddings.services import EmbeddingServiceFactory
 
 
+class AnalysisCancelled(Exception):
+    """Raised by a progress callback to stop processing a requirement."""
+
+
+class RequirementBusy(Exception):
+    """Raised when a requirement's status does not allow the requested transition."""
+
+
 class MatchingService:
     """
     Service class for processing requirements and performing matching.
     """
 
-    def __init__(self, threshold: float = 0.75):
+    # Requirement items sent to the embedding provider between progress reports
+    EMBEDDING_PROGRESS_CHUNK_SIZE = 100
+
+    MATCH_STATUSES = ('matched', 'partial_matched', 'unmatched')
+
+    # Requirement statuses an analysis may start from
+    STARTABLE_STATUSES = ('pending', 'failed', 'completed')
+
+    def __init__(self, threshold: float = 0.75, profile: Optional[str] = None):
         """
         Initialize the matching service.
 
         Args:
             threshold: Similarity threshold for matching
+            profile: Retrieve-then-rerank profile (default: MATCHING_PIPELINE_PROFILE setting)
         """
         self.threshold = threshold
-        self.algorithm = MatchingAlgorithm(threshold)
+        self.algorithm = MatchingAlgorithm(threshold, profile=profile)
+        self.bulk_create_batch_size = getattr(settings, 'MATCHING_BULK_CREATE_BATCH_SIZE', 500)
         # Use EmbeddingServiceFactory directly for static method calls
 
-    @transaction.atomic
     def process_requirement(
         self,
         requirement_id: str,
-        generate_embeddings: bool = True
+        generate_embeddings: bool = True,
+        limit: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None
     ) -> Dict[str, Any]:
         """
         Process a requirement and perform matching.
 
+        Embeddings are generated outside of any database transaction so slow
+        provider calls never hold one open; old match records are then
+        replaced atomically.
+
         Args:
             requirement_id: UUID of the requirement to process
             generate_embeddings: Whether to generate embeddings for items
+            limit: Max matches per requirement item
+            filters: Optional search pre-filters (product_ids, subsystem_type,
+                indicator_type, level1_function)
+            progress_callback: Optional callable(stage, done, total), called as
+                items are embedded ('embedding') and matched ('matching').
+                It may raise AnalysisCancelled to stop processing.
 
         Returns:
             Dictionary with processing results
+
+        Raises:
+            RequirementBusy: If the requirement is already being processed, or
+                its status changed under this run before results were saved
         """
         # Get requirement
         requirement = CapabilityRequirement.objects.get(id=requirement_id)
 
-        # Update status
-        requirement.status = 'processing'
-        requirement.save()
+        # Claim the requirement; a concurrent run holds it in 'processing'
+        if not self.set_requirement_status(requirement_id, 'processing', self.STARTABLE_STATUSES):
+            raise RequirementBusy(f"Requirement {requirement_id} is already being processed")
 
         try:
             # Get requirement items
-            requirement_items = RequirementItem.objects.filter(
+            requirement_items = list(RequirementItem.objects.filter(
                 requirement_id=requirement_id
-            )
-
-            # Delete old match records for this requirement to avoid duplicates
-            MatchRecord.objects.filter(requirement_id=requirement_id).delete()
-            print(f"Deleted old match records for requirement {requirement_id}")
+            ))
 
             # Generate embeddings if needed
             if generate_embeddings:
-                self._generate_embeddings_for_items(requirement_items)
+                self._generate_embeddings_for_items(requirement_items, progress_callback)
+
+            if progress_callback:
+                progress_callback('matching', 0, len(requirement_items))
+
+            with transaction.atomic():
+                # Delete old match records for this requirement to avoid duplicates
+                MatchRecord.objects.filter(requirement_id=requirement_id).delete()
+                print(f"Deleted old match records for requirement {requirement_id}")
+
+                # Perform matching
+                results = self._perform_matching(
+                    requirement,
+                    requirement_items,
+                    limit=limit,
+                    filters=filters
+                )
 
-            # Perform matching
-            results = self._perform_matching(requirement, requirement_items)
+                # Update status to completed; roll the records back if this run lost the requirement
+                if not self.set_requirement_status(requirement_id, 'completed', ['processing']):
+                    raise RequirementBusy(f"Requirement {requirement_id} changed status during processing")
 
-            # Update status to completed
-            requirement.status = 'completed'
-            requirement.save()
+            if progress_callback:
+                progress_callback('matching', len(requirement_items), len(requirement_items))
 
             return results
 
+        except AnalysisCancelled:
+            # Back to pending so the requirement can be analysed again
+            self.set_requirement_status(requirement_id, 'pending', ['processing'])
+            raise
+
         except Exception as e:
             # Update status to failed
-            requirement.status = 'failed'
-            requirement.save()
+            self.set_requirement_status(requirement_id, 'failed', ['processing'])
             raise e
 
-    def _generate_embeddings_for_items(self, items: List[RequirementItem]):
+    @staticmethod
+    def set_requirement_status(
+        requirement_id: str,
+        status: str,
+        from_statuses: Optional[Sequence[str]] = None
+    ) -> bool:
+        """
+        Atomically update a requirement's status with a single UPDATE.
+
+        Args:
+            requirement_id: UUID of the requirement
+            status: New status
+            from_statuses: Only transition if the current status is one of these
+
+        Returns:
+            True if the requirement was updated
+        """
+        queryset = CapabilityRequirement.objects.filter(id=requirement_id)
+        if from_statuses is not None:
+            queryset = queryset.filter(status__in=from_statuses)
+        return queryset.update(status=status, updated_at=timezone.now()) > 0
+
+    def _generate_embeddings_for_items(
+        self,
+        items: List[RequirementItem],
+        progress_callback: Optional[Callable[[str, int, int], None]] = None
+    ):
         """
         Generate embeddings for requirement items in batches.
 
         Args:
             items: List of RequirementItem objects
+            progress_callback: Optional callable(stage, done, total)
         """
         # Process items without embeddings
         items_need_embedding = [item for item in items if not item.embedding]
@@ -91,27 +172,24 @@ class MatchingService:
         if not items_need_embedding:
             return
 
-        # Truncate text to avoid token limits (SiliconFlow has 512 token limit)
-        # Approximate: 1 token ≈ 0.75 Chinese characters, so ~300 chars is safe (~400 tokens)
-        max_length = 300
-        texts = []
-        for item in items_need_embedding:
-            text = item.item_text
-            if len(text) > max_length:
-                text = text[:max_length]
-                print(f"Truncated item text from {len(item.item_text)} to {max_length} chars")
-            texts.append(text)
-
-        # Use batch encoding to process multiple items at once
-        # SiliconFlow has a 512 token limit, so we use moderate batch size
-        # Each text is already truncated to 300 chars (~400 tokens) to stay within limits
-        embeddings = EmbeddingServiceFactory.encode_batch_text(texts, batch_size=10)
+        texts = [item.item_text for item in items_need_embedding]
+
+        # Batches are packed by estimated tokens within the provider's limits
+        # (model_params max_tokens_per_text/max_tokens_per_batch); long items
+        # are chunked and pooled instead of truncated.
+        # Items are sent in chunks so progress can be reported between them
+        embeddings = []
+        for i in range(0, len(texts), self.EMBEDDING_PROGRESS_CHUNK_SIZE):
+            chunk = texts[i:i + self.EMBEDDING_PROGRESS_CHUNK_SIZE]
+            embeddings.extend(EmbeddingServiceFactory.encode_batch_text(chunk))
+            if progress_callback:
+                progress_callback('embedding', len(embeddings), len(texts))
 
         # Store embeddings
         success_count = 0
         failed_count = 0
         for item, embedding in zip(items_need_embedding, embeddings):
-            if embedding:  # Only save if embedding was successfully generated
+            if len(embedding) > 0:  # Only save if embedding was successfully generated
                 item._embedding_vector = embedding
                 item.save()
                 success_count += 1
@@ -124,7 +202,9 @@ class MatchingService:
     def _perform_matching(
         self,
         requirement: CapabilityRequirement,
-        items: List[RequirementItem]
+        items: List[RequirementItem],
+        limit: int = 5,
+        filters: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Perform matching for all requirement items.
@@ -132,54 +212,69 @@ class MatchingService:
         Args:
             requirement: Requirement object
             items: List of RequirementItem objects
+            limit: Max matches per requirement item
+            filters: Optional search pre-filters
 
         Returns:
             Dictionary with matching results
         """
         all_matches = []
-        item_count = items.count()
+        item_count = len(items)
+
+        # Get embeddings (either generated earlier or on-the-fly in one batch)
+        missing_items = [item for item in items if not hasattr(item, '_embedding_vector')]
+        if missing_items:
+            texts = [item.item_text for item in missing_items]
+            embeddings = EmbeddingServiceFactory.encode_batch_text(texts)
+            for item, embedding in zip(missing_items, embeddings):
+                item._embedding_vector = embedding
+
+        # Find matches for all items with one batched search
+        stage_timings = {}
+        item_matches = self.algorithm.batch_match(
+            [(str(item.id), item._embedding_vector) for item in items],
+            limit=limit,
+            filters=filters,
+            requirement_texts={str(item.id): item.item_text for item in items},
+            stage_timings=stage_timings
+        )
 
+        # Build match records in memory, referencing features by ID
         for item in items:
-            # Get embedding (either from database or generated)
-            if hasattr(item, '_embedding_vector'):
-                query_embedding = item._embedding_vector
-            else:
-                # Generate on-the-fly with text truncation (max 300 chars for ~400 tokens)
-                text = item.item_text
-                if len(text) > 300:
-                    text = text[:300]
-                query_embedding = EmbeddingServiceFactory.encode_single_text(text)
-
-            # Find matches
-            matches = self.algorithm.find_matches_using_pgvector(
-                query_embedding,
-                limit=5  # Top 5 matches per requirement
-            )
-
-            # Save match records
-            from apps.products.models import Feature
+            matches = item_matches.get(str(item.id), [])
+            if isinstance(matches, dict):
+                if len(item._embedding_vector) == 0:
+                    print(f"Skipping item without embedding: {item.item_text[:50]}...")
+                    continue
+                raise RuntimeError(matches['error'])
+
             for match in matches:
-                match_record = MatchRecord.objects.create(
+                all_matches.append(MatchRecord(
                     requirement=requirement,
                     requirement_item=item,
-                    feature=Feature.objects.get(id=match['feature_id']),
+                    feature_id=match['feature_id'],
                     similarity_score=match['similarity'],
                     match_status=match['match_status'],
                     threshold_used=self.threshold,
                     rank=match['rank'],
                     metadata=match
-                )
-                all_matches.append(match_record)
+                ))
+
+        # Save match records in chunks
+        MatchRecord.objects.bulk_create(all_matches, batch_size=self.bulk_create_batch_size)
 
         # Calculate summary
+        status_counts = Counter(m.match_status for m in all_matches)
         summary = {
             'requirement_id': str(requirement.id),
             'total_items': item_count,
             'total_matches': len(all_matches),
-            'matched': len([m for m in all_matches if m.match_status == 'matched']),
-            'partial_matched': len([m for m in all_matches if m.match_status == 'partial_matched']),
-            'unmatched': len([m for m in all_matches if m.match_status == 'unmatched']),
+            'matched': status_counts['matched'],
+            'partial_matched': status_counts['partial_matched'],
+            'unmatched': status_counts['unmatched'],
         }
+        if stage_timings:
+            summary['pipeline'] = stage_timings
 
         return summary
 
@@ -196,8 +291,13 @@ class MatchingService:
         matches = MatchRecord.objects.filter(
             requirement_id=requirement_id
         ).select_related(
-            'requirement_item__requirement',
+            'requirement_item',
             'feature__product'
+        ).only(
+            'id', 'match_status', 'similarity_score', 'rank',
+            'requirement_item', 'requirement_item__item_text',
+            'feature', 'feature__feature_name', 'feature__description',
+            'feature__product', 'feature__product__name'
         ).order_by('-similarity_score')
 
         # Group by status
@@ -225,42 +325,31 @@ class MatchingService:
         """
         Get statistics for a requirement's matches.
 
+        Counts per status come from the same aggregate query as the
+        similarity statistics (conditional counts), so this costs two
+        queries in total.
+
         Args:
             requirement_id: UUID of the requirement
 
         Returns:
             Dictionary with statistics
         """
-        from .models import CapabilityRequirement
+        total_items = RequirementItem.objects.filter(requirement_id=requirement_id).count()
 
-        # Get requirement to count total items
-        try:
-            requirement = CapabilityRequirement.objects.get(id=requirement_id)
-            total_items = requirement.items.count()
-        except CapabilityRequirement.DoesNotExist:
-            total_items = 0
-
-        matches = MatchRecord.objects.filter(requirement_id=requirement_id)
-
-        from django.db.models import Avg, Max, Min, Count
-
-        stats = matches.aggregate(
+        stats = MatchRecord.objects.filter(requirement_id=requirement_id).aggregate(
             total_matches=Count('id'),
             avg_similarity=Avg('similarity_score'),
             max_similarity=Max('similarity_score'),
             min_similarity=Min('similarity_score'),
+            **{
+                status: Count('id', filter=Q(match_status=status))
+                for status in MatchingService.MATCH_STATUSES
+            }
         )
 
-        # Count by status
-        status_counts = {}
-        for status in ['matched', 'partial_matched', 'unmatched']:
-            count = matches.filter(match_status=status).count()
-            status_counts[status] = count
-
+        status_counts = {status: stats[status] for status in MatchingService.MATCH_STATUSES}
         stats['status_counts'] = status_counts
         stats['total_items'] = total_items
-        stats['matched'] = status_counts.get('matched', 0)
-        stats['partial_matched'] = status_counts.get('partial_matched', 0)
-        stats['unmatched'] = status_counts.get('unmatched', 0)
 
         return stats
@@ -0,0 +1,164 @@
+"""
+Tests for the background analysis job engine.
+
+Everything runs against the local test database; the embedding provider
+is replaced by deterministic vectors.
+"""
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.embeddings.services import EmbeddingServiceFactory
+from apps.matching.jobs import AnalysisJobError, AnalysisJobService
+from apps.matching.models import AnalysisJob, CapabilityRequirement, MatchRecord, RequirementItem
+from apps.matching.services import MatchingService, RequirementBusy
+from apps.products.models import Feature, FeatureEmbedding, Product
+
+DIMENSION = 8
+
+
+def fake_encode_batch_text(texts, config_id=None, batch_size=None):
+    """Deterministic unit vectors, one per text."""
+    vectors = []
+    for text in texts:
+        rng = np.random.default_rng(sum(map(ord, text)))
+        vector = rng.normal(size=DIMENSION)
+        vectors.append((vector / np.linalg.norm(vector)).tolist())
+    return vectors
+
+
+@override_settings(MATCHING_JOB_RUNNER='external', ALLOWED_HOSTS=['testserver'])
+class AnalysisJobTests(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        product = Product.objects.create(name='Product')
+        for i in range(10):
+            feature = Feature.objects.create(product=product, feature_name=f'Feature {i}', description=f'desc {i}')
+            FeatureEmbedding.objects.create(
+                feature=feature,
+                embedding=rng.normal(size=DIMENSION).tolist(),
+                model_name='test-model'
+            )
+
+        self.requirement = CapabilityRequirement.objects.create(session_id=uuid.uuid4())
+        for i in range(3):
+            RequirementItem.objects.create(requirement=self.requirement, item_text=f'item {i}', item_order=i)
+
+        self.client = APIClient()
+        patcher = mock.patch.object(
+            EmbeddingServiceFactory, 'encode_batch_text', side_effect=fake_encode_batch_text
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def analyze(self, **data):
+        return self.client.post(
+            '/api/v1/matching/',
+            {'requirement_id': str(self.requirement.id), 'threshold': 0.0, **data},
+            format='json'
+        )
+
+    def test_submit_returns_job_id(self):
+        response = self.analyze(background=True)
+
+        self.assertEqual(response.status_code, 202)
+        job = AnalysisJob.objects.get(id=response.json()['id'])
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.items_total, 3)
+
+    def test_duplicate_submit_conflicts(self):
+        self.assertEqual(self.analyze(background=True).status_code, 202)
+
+        response = self.analyze(background=True)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+
+    def test_synchronous_analyze_conflicts_with_active_job(self):
+        self.analyze(background=True)
+
+        response = self.analyze()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(MatchRecord.objects.count(), 0)
+
+    def test_run_pending_updates_progress_and_status(self):
+        job = AnalysisJobService.submit(str(self.requirement.id), threshold=0.0, limit=2)
+
+        self.assertEqual(AnalysisJobService.run_pending('worker'), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.worker_id, 'worker')
+        self.assertEqual((job.items_total, job.items_embedded, job.items_matched), (3, 3, 3))
+        self.assertIsNotNone(job.finished_at)
+        self.requirement.refresh_from_db()
+        self.assertEqual(self.requirement.status, 'completed')
+        self.assertEqual(MatchRecord.objects.filter(requirement=self.requirement).count(), 6)
+        self.assertEqual(AnalysisJobService.run_pending('worker'), 0)
+
+    def test_cancel_queued_job(self):
+        job = AnalysisJobService.submit(str(self.requirement.id))
+
+        job = AnalysisJobService.cancel(str(job.id))
+
+        self.assertEqual(job.status, 'cancelled')
+        self.assertEqual(AnalysisJobService.run_pending('worker'), 0)
+        with self.assertRaises(AnalysisJobError):
+            AnalysisJobService.cancel(str(job.id))
+
+    def test_cancel_running_job(self):
+        AnalysisJobService.submit(str(self.requirement.id))
+        job = AnalysisJobService.claim_next('worker')
+
+        flagged = AnalysisJobService.cancel(str(job.id))
+        self.assertEqual(flagged.status, 'running')
+        self.assertTrue(flagged.cancel_requested)
+
+        job = AnalysisJobService.run(job)
+
+        self.assertEqual(job.status, 'cancelled')
+        self.requirement.refresh_from_db()
+        self.assertEqual(self.requirement.status, 'pending')
+        self.assertEqual(MatchRecord.objects.count(), 0)
+
+    def test_requeue_stale(self):
+        AnalysisJobService.submit(str(self.requirement.id))
+        job = AnalysisJobService.claim_next('dead-worker')
+        CapabilityRequirement.objects.filter(id=self.requirement.id).update(status='processing')
+        AnalysisJob.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(minutes=10))
+
+        self.assertEqual(AnalysisJobService.requeue_stale(60), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker_id), ('queued', ''))
+        self.requirement.refresh_from_db()
+        self.assertEqual(self.requirement.status, 'pending')
+        self.assertEqual(AnalysisJobService.requeue_stale(60), 0)
+
+        # The requeued job runs normally
+        self.assertEqual(AnalysisJobService.run_pending('worker'), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+
+    def test_requeue_stale_keeps_active_jobs(self):
+        AnalysisJobService.submit(str(self.requirement.id))
+        AnalysisJobService.claim_next('worker')
+
+        self.assertEqual(AnalysisJobService.requeue_stale(60), 0)
+
+    def test_processing_requirement_is_not_claimed_twice(self):
+        CapabilityRequirement.objects.filter(id=self.requirement.id).update(status='processing')
+
+        with self.assertRaises(RequirementBusy):
+            MatchingService(threshold=0.0).process_requirement(str(self.requirement.id))
+
+        self.requirement.refresh_from_db()
+        self.assertEqual(self.requirement.status, 'processing')
+        self.assertEqual(MatchRecord.objects.count(), 0)
@@ -4,11 +4,12 @@ URL configuration for matching app.
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import MatchingViewSet, RequirementViewSet
+from .views import MatchingViewSet, AnalysisJobViewSet, RequirementViewSet
 
 app_name = 'matching'
 
 router = DefaultRouter()
+router.register(r'matching/jobs', AnalysisJobViewSet, basename='analysis-job')
 router.register(r'matching', MatchingViewSet, basename='matching')
 router.register(r'requirements', RequirementViewSet, basename='requirement')
 
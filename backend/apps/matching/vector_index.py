@@ -0,0 +1,702 @@
+"""
+In-process vector index for the non-pgvector matching path.
+"""
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+
+from apps.matching.ann import IVFIndex, build_ivf_index
+from apps.matching.index_store import load_index_files, load_ivf_files, save_index_files, save_ivf_files
+from apps.matching.quantization import train_quantizer
+from apps.products.changes import catalogue_signature, register_listener
+from apps.products.models import FeatureEmbedding
+
+
+class FeatureVectorIndex:
+    """
+    Process-resident matrix of active feature embeddings.
+
+    Rows are L2-normalized float32 vectors, so cosine similarity against
+    the whole catalogue is a single matrix-vector product. An index holds
+    the embeddings of one model (or of every model of its dimension when
+    built without one), so queries never score vectors from another
+    embedding space. Feature, product
+    and model identifiers are kept in arrays parallel to the matrix rows.
+    An optional IVF index (see apps.matching.ann) limits scoring to the
+    clusters nearest to each query. A quantized index (see
+    apps.matching.quantization) scores compact codes instead of the matrix
+    and reranks the best candidates with the original vectors. With
+    MATCHING_INDEX_MMAP the matrix is a read-only memmap shared by all
+    worker processes (see apps.matching.index_store).
+    """
+
+    # Batch size of embedding ids fetched for reranking when the matrix is dropped
+    RERANK_FETCH_SIZE = 500
+
+    # Filterable attributes and the FeatureEmbedding lookups they are loaded from
+    FILTER_FIELDS = {
+        'subsystem_type': 'feature__product__subsystem_type',
+        'indicator_type': 'feature__indicator_type',
+        'level1_function': 'feature__level1_function',
+    }
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        feature_ids: np.ndarray,
+        product_ids: np.ndarray,
+        model_names: np.ndarray,
+        attributes: Optional[Dict[str, np.ndarray]] = None,
+        signature: Optional[Tuple] = None,
+        embedding_ids: Optional[np.ndarray] = None,
+        model_name: Optional[str] = None
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            matrix: (n, dimension) float32 matrix of normalized embeddings
+            feature_ids: Feature UUID strings, one per row
+            product_ids: Product UUID strings, one per row
+            model_names: Embedding model names, one per row
+            attributes: Filterable feature attributes (see FILTER_FIELDS), one array each
+            signature: Database signature the index was built from
+            embedding_ids: FeatureEmbedding UUID strings, one per row
+            model_name: Embedding model the index is scoped to (None: all models)
+        """
+        self.matrix = matrix
+        self.feature_ids = feature_ids
+        self.product_ids = product_ids
+        self.model_names = model_names
+        self.attributes = attributes or {}
+        self.signature = signature
+        self.embedding_ids = embedding_ids
+        self.model_name = model_name
+        self.ann: Optional[IVFIndex] = None
+        self.nprobe = 8
+        self.quantizer = None
+        self.codes: Optional[np.ndarray] = None
+        self.rerank = 50
+        self.version: Optional[str] = None
+        # Rows of features removed since the build (see remove())
+        self.removed: Optional[np.ndarray] = None
+        self._dimension = matrix.shape[1]
+        self._feature_rows: Optional[Dict[str, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.feature_ids)
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the vectors (matrix, codes and IVF centroids)."""
+        total = self.matrix.nbytes if self.matrix is not None else 0
+        if self.codes is not None:
+            total += self.codes.nbytes + self.quantizer.nbytes
+        if self.ann is not None:
+            total += self.ann.centroids.nbytes + self.ann.order.nbytes
+        return total
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        L2-normalize vectors row-wise, leaving zero vectors untouched.
+
+        Args:
+            vectors: 1-D vector or 2-D matrix
+
+        Returns:
+            float32 array of the same shape
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @classmethod
+    def build(
+        cls,
+        dimension: int,
+        signature: Optional[Tuple] = None,
+        model_name: Optional[str] = None
+    ) -> 'FeatureVectorIndex':
+        """
+        Build an index from the active feature embeddings of a dimension.
+
+        Args:
+            dimension: Embedding dimension to index
+            signature: Database signature to record on the index
+            model_name: Only index embeddings of this model (default: all models)
+
+        Returns:
+            FeatureVectorIndex instance
+        """
+        embeddings = FeatureEmbedding.objects.filter(
+            feature__is_active=True,
+            feature__product__is_active=True
+        )
+        if model_name:
+            embeddings = embeddings.filter(model_name=model_name)
+        rows = embeddings.values_list(
+            'id',
+            'feature_id',
+            'feature__product_id',
+            'model_name',
+            'embedding',
+            *cls.FILTER_FIELDS.values()
+        ).iterator(chunk_size=2000)
+
+        embedding_ids = []
+        feature_ids = []
+        product_ids = []
+        model_names = []
+        vectors = []
+        attributes = {name: [] for name in cls.FILTER_FIELDS}
+        for embedding_id, feature_id, product_id, row_model_name, embedding, *values in rows:
+            if embedding is None or len(embedding) != dimension:
+                continue
+            embedding_ids.append(str(embedding_id))
+            feature_ids.append(str(feature_id))
+            product_ids.append(str(product_id))
+            model_names.append(row_model_name)
+            vectors.append(embedding)
+            for name, value in zip(cls.FILTER_FIELDS, values):
+                attributes[name].append(value or '')
+
+        if vectors:
+            matrix = cls.normalize(np.array(vectors, dtype=np.float32))
+        else:
+            matrix = np.empty((0, dimension), dtype=np.float32)
+
+        return cls(
+            np.ascontiguousarray(matrix),
+            np.array(feature_ids, dtype=object),
+            np.array(product_ids, dtype=object),
+            np.array(model_names, dtype=object),
+            attributes={
+                name: np.array(values, dtype=object)
+                for name, values in attributes.items()
+            },
+            signature=signature,
+            embedding_ids=np.array(embedding_ids, dtype=object),
+            model_name=model_name,
+        )
+
+    def export(self) -> Optional[str]:
+        """
+        Export the matrix and row metadata as the current shared version.
+
+        Returns:
+            The exported version, or None if there is no storage directory
+        """
+        columns = {
+            'embedding_ids': self.embedding_ids,
+            'feature_ids': self.feature_ids,
+            'product_ids': self.product_ids,
+            'model_names': self.model_names,
+        }
+        columns.update({f"attr_{name}": values for name, values in self.attributes.items()})
+        self.version = save_index_files(
+            self.dimension, self.matrix, columns, self.signature, model_name=self.model_name
+        )
+        return self.version
+
+    @classmethod
+    def load(
+        cls,
+        dimension: int,
+        signature: Optional[Tuple] = None,
+        model_name: Optional[str] = None
+    ) -> Optional['FeatureVectorIndex']:
+        """
+        Map the current shared version of a dimension.
+
+        Args:
+            dimension: Embedding dimension
+            signature: Only load a version built from this database signature
+            model_name: Embedding model the index is scoped to (default: all models)
+
+        Returns:
+            FeatureVectorIndex over a read-only memmap, or None
+        """
+        loaded = load_index_files(dimension, signature, model_name=model_name)
+        if loaded is None:
+            return None
+
+        version, matrix, columns = loaded
+        index = cls(
+            matrix,
+            columns['feature_ids'],
+            columns['product_ids'],
+            columns['model_names'],
+            attributes={
+                name[len('attr_'):]: values
+                for name, values in columns.items()
+                if name.startswith('attr_')
+            },
+            signature=signature,
+            embedding_ids=columns['embedding_ids'],
+            model_name=model_name,
+        )
+        index.version = version
+        return index
+
+    def rows_for_features(self, feature_ids: List[str]) -> np.ndarray:
+        """
+        Get the rows of some features, in the order given.
+
+        Args:
+            feature_ids: Feature UUID strings
+
+        Returns:
+            Row indices (a feature has one row per embedding model)
+        """
+        if self._feature_rows is None:
+            feature_rows: Dict[str, List[int]] = {}
+            for row, feature_id in enumerate(self.feature_ids):
+                feature_rows.setdefault(feature_id, []).append(row)
+            self._feature_rows = feature_rows
+        return np.array(
+            [row for feature_id in feature_ids for row in self._feature_rows.get(feature_id, ())],
+            dtype=np.int64
+        )
+
+    def remove(self, feature_ids: List[str] = (), product_ids: List[str] = ()) -> int:
+        """
+        Hide the rows of removed features or products without rebuilding.
+
+        Args:
+            feature_ids: Feature UUID strings
+            product_ids: Product UUID strings
+
+        Returns:
+            Number of rows newly hidden
+        """
+        hidden = np.isin(self.feature_ids, list(feature_ids)) | np.isin(self.product_ids, list(product_ids))
+        if self.removed is not None:
+            hidden &= ~self.removed
+            self.removed |= hidden
+        else:
+            self.removed = hidden
+        return int(hidden.sum())
+
+    def quantize(self, method: str, rerank: int = 50, keep_matrix: bool = False):
+        """
+        Replace the full-precision matrix by quantized codes.
+
+        Args:
+            method: 'sq8' or 'pq'
+            rerank: Candidates per query rescored with the original vectors
+            keep_matrix: Keep the matrix in memory for reranking; otherwise
+                candidates are reloaded from the database
+        """
+        self.quantizer = train_quantizer(self.matrix, method)
+        self.codes = self.quantizer.encode(self.matrix)
+        self.rerank = rerank
+        if not keep_matrix:
+            self.matrix = None
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Get the normalized full-precision vectors of some rows.
+
+        Read from the matrix, or from the database once the matrix has
+        been dropped by quantize(); rows deleted since the build come back
+        as zero vectors.
+
+        Args:
+            rows: Row indices
+
+        Returns:
+            (len(rows), dimension) float32 matrix
+        """
+        if self.matrix is not None:
+            return self.matrix[rows]
+
+        ids = self.embedding_ids[rows]
+        found = {}
+        for start in range(0, len(ids), self.RERANK_FETCH_SIZE):
+            found.update(
+                (str(pk), embedding)
+                for pk, embedding in FeatureEmbedding.objects.filter(
+                    id__in=list(ids[start:start + self.RERANK_FETCH_SIZE])
+                ).values_list('id', 'embedding')
+            )
+
+        vectors = np.zeros((len(rows), self.dimension), dtype=np.float32)
+        for i, embedding_id in enumerate(ids):
+            embedding = found.get(embedding_id)
+            if embedding is not None and len(embedding) == self.dimension:
+                vectors[i] = embedding
+        return self.normalize(vectors)
+
+    def mask(self, filters: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+        """
+        Build a boolean row mask from search filters.
+
+        Args:
+            filters: Optional dict with any of 'product_ids' and the
+                FILTER_FIELDS names; each value is a single value or a list
+
+        Returns:
+            Boolean array over rows, or None if no filter applies
+        """
+        if not filters:
+            return None
+
+        mask = None
+        columns = dict(self.attributes, product_ids=self.product_ids)
+        for name, value in filters.items():
+            if value is None or value == [] or value == '':
+                continue
+            if name not in columns:
+                raise ValueError(f"Unsupported filter: {name}")
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            column_mask = np.isin(columns[name], [str(v) for v in values])
+            mask = column_mask if mask is None else mask & column_mask
+
+        return mask
+
+    def _top_k(
+        self,
+        scores: np.ndarray,
+        rows: Optional[np.ndarray],
+        limit: int,
+        min_score: float
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Extract per-query top-k from a (queries, candidates) score matrix.
+
+        Args:
+            scores: Similarity scores, one row per query
+            rows: Index rows the score columns refer to (all rows if None)
+            limit: Maximum number of results per query
+            min_score: Minimum similarity score
+
+        Returns:
+            One list of (row, similarity) tuples per query, best first
+        """
+        np.clip(scores, 0.0, 1.0, out=scores)
+
+        k = min(limit, scores.shape[1])
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        if rows is not None:
+            top = rows[top]
+
+        return [
+            [
+                (int(row), float(score))
+                for row, score in zip(query_rows, query_scores)
+                if score >= min_score
+            ]
+            for query_rows, query_scores in zip(top, top_scores)
+        ]
+
+    def _search_quantized(
+        self,
+        queries: np.ndarray,
+        rows: Optional[np.ndarray],
+        limit: int,
+        min_score: float,
+        rerank: int
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Score queries against the codes, then rerank the best candidates exactly.
+
+        Args:
+            queries: (q, dimension) normalized query matrix
+            rows: Index rows to search (all rows if None)
+            limit: Maximum number of results per query
+            min_score: Minimum similarity score
+            rerank: Candidates rescored exactly (0: return the code scores)
+
+        Returns:
+            One list of (row, similarity) tuples per query, best first
+        """
+        codes = self.codes if rows is None else self.codes[rows]
+        scores = self.quantizer.score(queries, codes)
+        if rerank <= 0:
+            return self._top_k(scores, rows, limit, min_score)
+
+        k = min(max(rerank, limit), scores.shape[1])
+        if k < scores.shape[1]:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        if rows is not None:
+            candidates = rows[candidates]
+
+        # Rerank: exact scores of every distinct candidate, then per query
+        unique, inverse = np.unique(candidates, return_inverse=True)
+        exact = queries @ self.vectors(unique).T
+        exact = np.take_along_axis(exact, inverse.reshape(candidates.shape), axis=1)
+
+        return [
+            [(int(query_candidates[position]), score) for position, score in hits]
+            for query_candidates, hits in zip(
+                candidates, self._top_k(exact, None, limit, min_score)
+            )
+        ]
+
+    def search(
+        self,
+        query_embedding: List[float],
+        limit: int = 10,
+        min_score: float = 0.0,
+        mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the top-k rows most similar to a query vector.
+
+        Args:
+            query_embedding: Query embedding vector
+            limit: Maximum number of results to return
+            min_score: Minimum similarity score
+            mask: Optional boolean row mask restricting the candidates
+
+        Returns:
+            List of (row, similarity) tuples, best first
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape != (self.dimension,) or not np.any(query):
+            return []
+
+        return self.search_batch([query], limit=limit, min_score=min_score, mask=mask)[0]
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        limit: int = 10,
+        min_score: float = 0.0,
+        mask: Optional[np.ndarray] = None,
+        chunk_size: int = 256,
+        exact: bool = False,
+        rerank: Optional[int] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Find the top-k rows for many query vectors at once.
+
+        Queries are scored with one matrix-matrix product per chunk of
+        ``chunk_size`` queries, which bounds the size of the score matrix.
+        With an IVF index attached, queries are answered from their nearest
+        clusters and only fall back to the full matrix when those hold fewer
+        than ``limit`` candidates. A quantized index scores its codes and
+        reranks the top ``rerank`` candidates per query; with ``rerank=0``
+        the approximate code scores are returned as they are.
+        A mask restricts scoring to the selected rows before top-k, so
+        filtered searches still return up to ``limit`` results.
+
+        Args:
+            query_embeddings: Query embedding vectors, all of the index dimension
+            limit: Maximum number of results per query
+            min_score: Minimum similarity score
+            mask: Optional boolean row mask restricting the candidates
+            chunk_size: Number of queries scored per matrix product
+            exact: Ignore the IVF index and codes and score every candidate
+                at full precision (quantized indexes must keep their matrix)
+            rerank: Candidates rescored exactly by a quantized index
+                (default: the index's rerank setting)
+
+        Returns:
+            One list of (row, similarity) tuples per query, best first
+        """
+        results = [[] for _ in query_embeddings]
+        if len(self) == 0 or limit <= 0 or len(query_embeddings) == 0:
+            return results
+        if self.removed is not None:
+            mask = ~self.removed if mask is None else mask & ~self.removed
+
+        queries = self.normalize(np.asarray(query_embeddings, dtype=np.float32))
+        if queries.ndim != 2 or queries.shape[1] != self.dimension:
+            raise ValueError(
+                f"Query dimension does not match index dimension {self.dimension}"
+            )
+
+        # Approximate search first; queries it cannot serve fall back to exact
+        pending = np.arange(len(queries))
+        if self.ann is not None and not exact:
+            approximate = self.ann.search_batch(
+                queries, limit, min_score, mask=mask, nprobe=self.nprobe
+            )
+            for i, hits in enumerate(approximate):
+                if hits is not None:
+                    results[i] = hits
+            pending = np.array([i for i, hits in enumerate(approximate) if hits is None], dtype=np.int64)
+            if len(pending) == 0:
+                return results
+
+        rows = None
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                return results
+
+        if self.codes is not None and not (exact and self.matrix is not None):
+            rerank = self.rerank if rerank is None else rerank
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                for i, hits in zip(chunk, self._search_quantized(queries[chunk], rows, limit, min_score, rerank)):
+                    results[i] = hits
+            return results
+
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            scores = queries[chunk] @ matrix.T
+            for i, hits in zip(chunk, self._top_k(scores, rows, limit, min_score)):
+                results[i] = hits
+
+        return results
+
+
+# Cached indexes by (model name, dimension); model None indexes every model
+_indexes: Dict[Tuple[Optional[str], int], FeatureVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_feature_index(dimension: int, model_name: Optional[str] = None) -> FeatureVectorIndex:
+    """
+    Get the process-wide index for a model and dimension, rebuilding it when stale.
+
+    Args:
+        dimension: Embedding dimension of the query vectors
+        model_name: Embedding model that produced the query vectors
+            (default: index the embeddings of every model)
+
+    Returns:
+        FeatureVectorIndex instance
+    """
+    key = (model_name or None, dimension)
+    signature = catalogue_signature()
+    index = _indexes.get(key)
+    if index is not None and index.signature == signature:
+        return index
+
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.signature != signature:
+            index = _load_or_build(dimension, signature, key[0])
+            _quantize(index)
+            _attach_ann(index)
+            _indexes[key] = index
+        return index
+
+
+def get_cached_indexes() -> Dict[Tuple[Optional[str], int], FeatureVectorIndex]:
+    """Snapshot of this process's cached indexes by (model name, dimension)."""
+    with _indexes_lock:
+        return dict(_indexes)
+
+
+def _load_or_build(dimension: int, signature: Tuple, model_name: Optional[str] = None) -> FeatureVectorIndex:
+    """
+    Build the index for a signature, sharing it through index files when enabled.
+
+    With MATCHING_INDEX_MMAP, a version exported by another process for the
+    same signature is mapped instead of rebuilt; otherwise the index is built
+    from the database, exported, and mapped back so this process holds no
+    private copy of the matrix.
+    """
+    if not getattr(settings, 'MATCHING_INDEX_MMAP', False):
+        return FeatureVectorIndex.build(dimension, signature=signature, model_name=model_name)
+
+    index = FeatureVectorIndex.load(dimension, signature, model_name=model_name)
+    if index is not None:
+        return index
+
+    index = FeatureVectorIndex.build(dimension, signature=signature, model_name=model_name)
+    if index.export() is None:
+        return index
+    return FeatureVectorIndex.load(dimension, signature, model_name=model_name) or index
+
+
+def _attach_ann(index: FeatureVectorIndex):
+    """
+    Attach an IVF index when local ANN is enabled and the catalogue is large enough.
+
+    Controlled by the MATCHING_LOCAL_ANN_ENABLED, MATCHING_LOCAL_ANN_MIN_ROWS
+    and MATCHING_LOCAL_ANN_NPROBE settings. Not used on quantized indexes:
+    their codes already bound the scoring cost, and IVF would score the
+    full-precision matrix instead of the codes.
+
+    On a shared (exported) version, the IVF layout is shared too: loaded
+    from the version's IVF files when another process exported them,
+    otherwise built, exported and mapped back (see apps.matching.index_store).
+    """
+    if not getattr(settings, 'MATCHING_LOCAL_ANN_ENABLED', False):
+        return
+    if index.matrix is None or index.codes is not None:
+        return
+    if len(index) < getattr(settings, 'MATCHING_LOCAL_ANN_MIN_ROWS', 20000):
+        return
+
+    ann = None
+    if index.version is not None:
+        ann = load_ivf_files(index.dimension, index.version, index.matrix, model_name=index.model_name)
+    if ann is None:
+        ann = build_ivf_index(index.matrix, index.model_name)
+        if index.version is not None and save_ivf_files(
+            index.dimension, index.version, index.matrix, ann, model_name=index.model_name
+        ):
+            ann = load_ivf_files(index.dimension, index.version, index.matrix, model_name=index.model_name) or ann
+
+    index.ann = ann
+    index.nprobe = getattr(settings, 'MATCHING_LOCAL_ANN_NPROBE', 8)
+
+
+def _quantize(index: FeatureVectorIndex):
+    """
+    Quantize the index when MATCHING_QUANTIZATION is set and the catalogue is large enough.
+
+    Controlled by the MATCHING_QUANTIZATION, MATCHING_QUANTIZATION_MIN_ROWS
+    and MATCHING_QUANTIZATION_RERANK settings.
+    """
+    method = getattr(settings, 'MATCHING_QUANTIZATION', '')
+    if not method:
+        return
+    if len(index) < getattr(settings, 'MATCHING_QUANTIZATION_MIN_ROWS', 20000):
+        return
+
+    # A shared memmap costs no private memory, so it stays as the rerank source
+    index.quantize(
+        method,
+        rerank=getattr(settings, 'MATCHING_QUANTIZATION_RERANK', 50),
+        keep_matrix=isinstance(index.matrix, np.memmap)
+    )
+
+
+def apply_removals(feature_ids: List[str], product_ids: List[str], before: Tuple, after: Tuple):
+    """
+    Apply committed soft deletes to the cached indexes in place.
+
+    Only indexes built for the ``before`` signature are updated (and moved
+    to ``after``); others are already stale and rebuild on next use.
+    """
+    with _indexes_lock:
+        for index in _indexes.values():
+            if index.signature == before:
+                index.remove(feature_ids, product_ids)
+                index.signature = after
+
+
+register_listener(apply_removals)
+
+
+def clear_feature_indexes():
+    """
+    Drop all cached indexes.
+    Useful after bulk changes made outside the ORM.
+    """
+    with _indexes_lock:
+        _indexes.clear()
@@ -6,7 +6,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
 
-from .models import CapabilityRequirement, RequirementItem, MatchRecord
+from .models import CapabilityRequirement, RequirementItem, MatchRecord, AnalysisJob
 from .serializers import (
     CapabilityRequirementSerializer,
     CapabilityRequirementCreateSerializer,
@@ -16,8 +16,10 @@ from .serializers import (
     MatchResultSerializer,
     MatchResultDetailSerializer,
     MatchSummarySerializer,
+    AnalysisJobSerializer,
 )
-from .services import MatchingService
+from .services import MatchingService, RequirementBusy
+from .jobs import AnalysisJobService, AnalysisJobError
 import time
 
 
@@ -36,7 +38,13 @@ class MatchingViewSet(viewsets.ViewSet):
         Perform matching analysis.
 
         POST /api/v1/matching/analyze
-        Body: { requirement_id, threshold?, product_ids?, limit? }
+        Body: { requirement_id, threshold?, product_ids?, subsystem_type?,
+                indicator_type?, level1_function?, limit?, profile?, background? }
+
+        With background=true the analysis is queued as a job and the job
+        is returned immediately (202); poll /api/v1/matching/jobs/{id}/.
+        Either way, 409 is returned while another analysis of the
+        requirement is queued or running.
         """
         serializer = MatchAnalyzeSerializer(data=request.data)
 
@@ -45,21 +53,58 @@ class MatchingViewSet(viewsets.ViewSet):
 
         requirement_id = serializer.validated_data['requirement_id']
         threshold = serializer.validated_data['threshold']
-        product_ids = serializer.validated_data.get('product_ids')
         limit = serializer.validated_data['limit']
+        profile = serializer.validated_data.get('profile')
+        filters = {
+            name: serializer.validated_data[name]
+            for name in MatchAnalyzeSerializer.FILTER_FIELDS
+            if serializer.validated_data.get(name)
+        }
 
         try:
             # Get requirement
             requirement = CapabilityRequirement.objects.get(id=requirement_id)
 
+            if serializer.validated_data['background']:
+                try:
+                    job = AnalysisJobService.submit(
+                        requirement_id=str(requirement_id),
+                        threshold=threshold,
+                        limit=limit,
+                        filters=filters,
+                        profile=profile
+                    )
+                except AnalysisJobError as e:
+                    return Response({
+                        'error': str(e)
+                    }, status=status.HTTP_409_CONFLICT)
+
+                return Response(
+                    AnalysisJobSerializer(job).data,
+                    status=status.HTTP_202_ACCEPTED
+                )
+
+            # A queued job would replace this run's match records (and vice versa)
+            if AnalysisJobService.has_active_job(requirement_id):
+                return Response({
+                    'error': 'Requirement already has an active analysis job'
+                }, status=status.HTTP_409_CONFLICT)
+
             # Perform matching
-            service = MatchingService(threshold=threshold)
+            service = MatchingService(threshold=threshold, profile=profile)
             start_time = time.time()
 
-            result = service.process_requirement(
-                requirement_id=str(requirement_id),
-                generate_embeddings=True
-            )
+            try:
+                result = service.process_requirement(
+                    requirement_id=str(requirement_id),
+                    generate_embeddings=True,
+                    limit=limit,
+                    filters=filters
+                )
+            except RequirementBusy as e:
+                return Response({
+                    'error': str(e)
+                }, status=status.HTTP_409_CONFLICT)
 
             processing_time = time.time() - start_time
 
@@ -139,6 +184,38 @@ class MatchingViewSet(viewsets.ViewSet):
         }, status=status.HTTP_501_NOT_IMPLEMENTED)
 
 
+class AnalysisJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for background analysis jobs.
+
+    list: List analysis jobs
+    retrieve: Get job status and progress
+    cancel: Cancel a queued or running job
+    """
+
+    queryset = AnalysisJob.objects.all()
+    serializer_class = AnalysisJobSerializer
+    filterset_fields = ['status', 'requirement']
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """
+        Cancel an analysis job.
+
+        POST /api/v1/matching/jobs/{id}/cancel/
+        """
+        job = self.get_object()
+
+        try:
+            job = AnalysisJobService.cancel(str(job.id))
+        except AnalysisJobError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
+
+        return Response(self.get_serializer(job).data)
+
+
 class RequirementViewSet(viewsets.ModelViewSet):
     """
     ViewSet for CapabilityRequirement model.
@@ -248,7 +325,7 @@ class RequirementViewSet(viewsets.ModelViewSet):
 
             for item in requirement.items.all():
                 text = item.item_text
-                embedding = provider.encode_single(text)
+                embedding = EmbeddingServiceFactory.encode_with_provider(provider, [text])[0]
 
                 # Create or update embedding record
                 FeatureEmbedding.objects.update_or_create(
@@ -0,0 +1,86 @@
+"""
+Change tracking for the feature catalogue.
+
+Soft deletes of features and products report the affected ids, together
+with the catalogue signature just before and just after the change, to
+registered listeners once the transaction commits. A listener holding a
+cache built for the ``before`` signature (the in-process vector index)
+can then apply the removal in place and move to ``after`` instead of
+rebuilding; any other change in between makes the signatures disagree
+and the cache falls back to a rebuild.
+"""
+from typing import Callable, Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Max
+
+RemovalListener = Callable[[List[str], List[str], Tuple, Tuple], None]
+
+_listeners: List[RemovalListener] = []
+
+
+def catalogue_signature() -> Tuple:
+    """
+    Get a cheap signature of the embeddings, features and products.
+
+    Any insert, update or delete of embeddings, or activation change on
+    features and products, changes at least one component.
+    """
+    from .models import Feature, FeatureEmbedding, Product
+
+    embeddings = FeatureEmbedding.objects.aggregate(
+        count=Count('id'),
+        updated=Max('updated_at')
+    )
+    return (
+        embeddings['count'],
+        embeddings['updated'],
+        Feature.objects.aggregate(updated=Max('updated_at'))['updated'],
+        Product.objects.aggregate(updated=Max('updated_at'))['updated'],
+    )
+
+
+def register_listener(listener: RemovalListener):
+    """
+    Register a callback for committed removals.
+
+    Args:
+        listener: Called as listener(feature_ids, product_ids, before, after)
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def has_listeners() -> bool:
+    """Whether removals need to be tracked at all."""
+    return bool(_listeners)
+
+
+def notify_removed(
+    before: Tuple,
+    after: Tuple,
+    feature_ids: Iterable = (),
+    product_ids: Iterable = ()
+):
+    """
+    Report removed features/products to the listeners on commit.
+
+    Nothing is reported if the transaction rolls back.
+
+    Args:
+        before: Catalogue signature before the change
+        after: Catalogue signature after the change
+        feature_ids: Deactivated feature ids
+        product_ids: Deactivated product ids (all their features are removed)
+    """
+    feature_ids = [str(i) for i in feature_ids]
+    product_ids = [str(i) for i in product_ids]
+
+    def notify():
+        for listener in _listeners:
+            try:
+                listener(feature_ids, product_ids, before, after)
+            except Exception as e:
+                print(f"Change listener {listener.__name__} failed: {str(e)}")
+
+    transaction.on_commit(notify)
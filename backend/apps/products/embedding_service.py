@@ -0,0 +1,237 @@
+"""
+Bulk feature embedding generation.
+"""
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+from apps.embeddings.services import EmbeddingServiceFactory
+from .models import Feature, FeatureEmbedding
+
+
+class FeatureEmbeddingService:
+    """
+    Generate and store feature embeddings in batches.
+
+    Existing embeddings are looked up in one query, missing texts are
+    encoded in provider-sized batches, and rows are upserted with
+    ``bulk_create(update_conflicts=True)``.
+    """
+
+    # Features encoded and written per step (progress is reported between steps)
+    CHUNK_SIZE = 200
+
+    def __init__(self, provider, write_batch_size: Optional[int] = None):
+        """
+        Initialize the service.
+
+        Args:
+            provider: Embedding provider instance
+            write_batch_size: Rows per INSERT (default: MATCHING_BULK_CREATE_BATCH_SIZE setting)
+        """
+        self.provider = provider
+        self.model_version = provider.model_params.get('model', 'unknown')
+        if write_batch_size is None:
+            write_batch_size = getattr(settings, 'MATCHING_BULK_CREATE_BATCH_SIZE', 500)
+        self.write_batch_size = write_batch_size
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Get the SHA-256 hex digest stored as FeatureEmbedding.text_hash."""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def existing_embeddings(self, feature_ids: List) -> Dict[Any, Tuple[str, datetime]]:
+        """
+        Get the stored text hash and update time of existing embeddings for this model.
+
+        Args:
+            feature_ids: Feature IDs to check
+
+        Returns:
+            Dictionary of feature ID -> (text_hash, updated_at)
+        """
+        existing = {}
+        for i in range(0, len(feature_ids), 500):
+            for feature_id, text_hash, updated_at in FeatureEmbedding.objects.filter(
+                feature_id__in=feature_ids[i:i + 500],
+                model_name=self.provider.model_name
+            ).values_list('feature_id', 'text_hash', 'updated_at'):
+                existing[feature_id] = (text_hash, updated_at)
+        return existing
+
+    def select_pending(
+        self,
+        features: List[Feature],
+        regenerate: bool = False,
+        only_changed: bool = False,
+        done_since: Optional[datetime] = None
+    ) -> Tuple[List[Feature], List[Feature]]:
+        """
+        Split features into those to embed and those to skip.
+
+        Args:
+            features: Candidate features
+            regenerate: Embed every feature
+            only_changed: Also embed features whose text hash differs from the stored one
+            done_since: Skip features whose current embedding was written at or
+                after this time (used to resume an interrupted run)
+
+        Returns:
+            Tuple of (pending, skipped) features
+        """
+        existing = self.existing_embeddings([feature.id for feature in features])
+
+        pending = []
+        skipped = []
+        for feature in features:
+            stored = existing.get(feature.id)
+            if stored is None:
+                pending.append(feature)
+                continue
+
+            text_hash, updated_at = stored
+            changed = text_hash != self.hash_text(feature.get_embedding_text())
+            if done_since is not None and updated_at >= done_since and not changed:
+                skipped.append(feature)
+            elif regenerate or (only_changed and changed):
+                pending.append(feature)
+            else:
+                skipped.append(feature)
+
+        return pending, skipped
+
+    def write(self, embeddings: List[FeatureEmbedding]):
+        """
+        Insert or update embedding rows on (feature, model_name).
+
+        Args:
+            embeddings: Unsaved FeatureEmbedding instances
+        """
+        FeatureEmbedding.objects.bulk_create(
+            embeddings,
+            batch_size=self.write_batch_size,
+            update_conflicts=True,
+            unique_fields=['feature', 'model_name'],
+            update_fields=['embedding', 'model_version', 'text_hash', 'updated_at']
+        )
+
+    def embed_chunk(self, features: List[Feature]) -> Dict[str, Any]:
+        """
+        Encode and write one chunk of features.
+
+        Args:
+            features: Features to embed
+
+        Returns:
+            Dictionary with success/failed feature IDs and encode/write seconds
+        """
+        texts = [feature.get_embedding_text() for feature in features]
+
+        started = time.monotonic()
+        vectors = EmbeddingServiceFactory.encode_batch_with_provider(self.provider, texts)
+        encoded = time.monotonic()
+
+        result = {'success': [], 'failed': []}
+        rows = []
+        for feature, text, vector in zip(features, texts, vectors):
+            if len(vector) > 0:
+                rows.append(FeatureEmbedding(
+                    feature=feature,
+                    model_name=self.provider.model_name,
+                    model_version=self.model_version,
+                    text_hash=self.hash_text(text),
+                    embedding=list(vector)
+                ))
+                result['success'].append(str(feature.id))
+            else:
+                result['failed'].append({
+                    'feature_id': str(feature.id),
+                    'error': 'Embedding generation failed'
+                })
+
+        self.write(rows)
+        result['encode_seconds'] = encoded - started
+        result['write_seconds'] = time.monotonic() - encoded
+        return result
+
+    def generate(
+        self,
+        features: Iterable[Feature],
+        regenerate: bool = False,
+        only_changed: bool = False,
+        done_since: Optional[datetime] = None,
+        workers: int = 1,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate embeddings for features.
+
+        By default only features without an embedding are embedded.
+
+        Args:
+            features: Features to embed
+            regenerate: Re-embed features that already have an embedding
+            only_changed: Re-embed features whose text changed since they were embedded
+            done_since: Skip features already re-embedded since this time (resume)
+            workers: Number of chunks encoded and written in parallel
+            progress_callback: Optional callable(done, total) called after each chunk
+
+        Returns:
+            Dictionary with success/failed/skipped feature IDs and throughput
+        """
+        pending, skipped = self.select_pending(
+            list(features),
+            regenerate=regenerate,
+            only_changed=only_changed,
+            done_since=done_since
+        )
+        results = {
+            'success': [],
+            'failed': [],
+            'skipped': [str(feature.id) for feature in skipped]
+        }
+        chunks = [pending[i:i + self.CHUNK_SIZE] for i in range(0, len(pending), self.CHUNK_SIZE)]
+
+        lock = threading.Lock()
+        timings = {'encode_seconds': 0.0, 'write_seconds': 0.0}
+        started = time.monotonic()
+
+        def run_chunk(chunk: List[Feature]):
+            result = self.embed_chunk(chunk)
+            with lock:
+                results['success'].extend(result['success'])
+                results['failed'].extend(result['failed'])
+                timings['encode_seconds'] += result['encode_seconds']
+                timings['write_seconds'] += result['write_seconds']
+                done = len(results['success']) + len(results['failed'])
+            if progress_callback:
+                progress_callback(done, len(pending))
+
+        def run_chunk_in_thread(chunk: List[Feature]):
+            try:
+                run_chunk(chunk)
+            finally:
+                # Worker threads open their own connections
+                connection.close()
+
+        if workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                list(executor.map(run_chunk_in_thread, chunks))
+        else:
+            for chunk in chunks:
+                run_chunk(chunk)
+
+        elapsed = time.monotonic() - started
+        results['throughput'] = {
+            'elapsed_seconds': round(elapsed, 3),
+            'encode_seconds': round(timings['encode_seconds'], 3),
+            'write_seconds': round(timings['write_seconds'], 3),
+            'features_per_second': round(len(results['success']) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+        return results
@@ -0,0 +1,71 @@
+"""
+Custom model fields for products.
+"""
+import json
+
+import numpy as np
+from django.db import models
+
+
+class BinaryVectorField(models.BinaryField):
+    """
+    Vector stored as a raw little-endian float BLOB.
+
+    Used for embeddings when pgvector is unavailable (SQLite). A float32
+    vector takes 4 bytes per component instead of ~13 characters of JSON,
+    and loads with ``np.frombuffer`` (no parsing, no copy) as a read-only
+    numpy array. Lists and arrays are accepted on assignment.
+
+    Serialized (dumpdata) as JSON list text, the format pgvector also
+    parses, so fixtures move between SQLite and PostgreSQL.
+    """
+
+    def __init__(self, *args, dtype: str = '<f4', **kwargs):
+        """
+        Initialize the field.
+
+        Args:
+            dtype: Stored numpy dtype, '<f4' (float32) or '<f2' (float16)
+        """
+        self.dtype = np.dtype(dtype)
+        if self.dtype.kind != 'f':
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dtype != np.dtype('<f4'):
+            kwargs['dtype'] = self.dtype.str
+        return name, path, args, kwargs
+
+    def decode(self, value) -> np.ndarray:
+        """Decode a stored BLOB into a read-only vector."""
+        return np.frombuffer(value, dtype=self.dtype)
+
+    def encode(self, value) -> bytes:
+        """Encode a list or array as a BLOB."""
+        return np.ascontiguousarray(value, dtype=self.dtype).tobytes()
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return self.decode(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, np.ndarray):
+            return value
+        if isinstance(value, str) and value.startswith('['):
+            value = json.loads(value)
+        if isinstance(value, (list, tuple)):
+            return np.asarray(value, dtype=self.dtype)
+        return self.decode(super().to_python(value))
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, (bytes, bytearray, memoryview)):
+            return value
+        return self.encode(value)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return json.dumps(self.to_python(value).tolist()) if value is not None else None
@@ -0,0 +1,107 @@
+"""
+Django management command to manage HNSW/IVFFlat indexes on feature embeddings.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.products.vector_indexes import (
+    INDEX_METHODS,
+    create_vector_index,
+    drop_vector_index,
+    get_embedding_column_type,
+    get_model_dimensions,
+    list_vector_indexes,
+)
+
+
+class Command(BaseCommand):
+    help = 'List, create or drop per-model ANN (HNSW/IVFFlat) indexes on feature embeddings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['list', 'create', 'drop'],
+            help='Action to perform'
+        )
+        parser.add_argument(
+            '--model',
+            action='append',
+            default=None,
+            help='Embedding model name (repeatable; default: every stored model)'
+        )
+        parser.add_argument(
+            '--method',
+            choices=INDEX_METHODS,
+            default='hnsw',
+            help='Index method'
+        )
+        parser.add_argument('--m', type=int, default=16, help='HNSW max connections per layer')
+        parser.add_argument(
+            '--ef-construction',
+            type=int,
+            default=64,
+            help='HNSW candidate list size during build'
+        )
+        parser.add_argument(
+            '--lists',
+            type=int,
+            default=None,
+            help='IVFFlat list count (default: rows/1000, or sqrt(rows) above 1M rows)'
+        )
+        parser.add_argument(
+            '--concurrently',
+            action='store_true',
+            help='Build/drop without blocking writes'
+        )
+        parser.add_argument(
+            '--maintenance-work-mem',
+            default=None,
+            help="maintenance_work_mem for index builds, e.g. '1GB'"
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        if connection.vendor != 'postgresql':
+            raise CommandError('Vector indexes require PostgreSQL with pgvector')
+
+        if options['action'] == 'list':
+            indexes = list_vector_indexes(connection)
+            if not indexes:
+                self.stdout.write('No vector indexes')
+            for index in indexes:
+                self.stdout.write(f"{index['name']} ({index['size']})")
+                self.stdout.write(f"  {index['definition']}")
+            return
+
+        column_type = get_embedding_column_type(connection)
+        if not column_type or not column_type.startswith('vector'):
+            raise CommandError(f"Embedding column is {column_type}, not a pgvector column")
+
+        model_names = options['model'] or list(get_model_dimensions(connection))
+        if options['maintenance_work_mem']:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('maintenance_work_mem', %s, false)",
+                    [options['maintenance_work_mem']]
+                )
+
+        for model_name in model_names:
+            if options['action'] == 'create':
+                name = create_vector_index(
+                    connection,
+                    model_name,
+                    method=options['method'],
+                    m=options['m'],
+                    ef_construction=options['ef_construction'],
+                    lists=options['lists'],
+                    concurrently=options['concurrently']
+                )
+                self.stdout.write(self.style.SUCCESS(f"Created {name} for {model_name}"))
+            else:
+                name = drop_vector_index(
+                    connection,
+                    model_name,
+                    method=options['method'],
+                    concurrently=options['concurrently']
+                )
+                self.stdout.write(self.style.SUCCESS(f"Dropped {name} for {model_name}"))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-17 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_alter_feature_options_alter_product_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='featureembedding',
+            name='text_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated migration for per-model HNSW indexes on feature embeddings
+
+from django.db import migrations
+
+
+def create_vector_indexes(apps, schema_editor):
+    """Create an HNSW index per stored embedding model (PostgreSQL only)."""
+    from apps.products.vector_indexes import (
+        MAX_INDEX_DIMENSIONS,
+        create_vector_index,
+        get_embedding_column_type,
+        get_model_dimensions,
+    )
+
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    column_type = get_embedding_column_type(connection)
+    if not column_type or not column_type.startswith('vector'):
+        # Column not converted to pgvector yet (see docs/supabase-migration-guide.md)
+        print(f"\n  Skipping vector indexes: embedding column is {column_type}")
+        return
+
+    for model_name, dimension in get_model_dimensions(connection).items():
+        if dimension <= MAX_INDEX_DIMENSIONS:
+            create_vector_index(connection, model_name, dimension, method='hnsw')
+
+
+def drop_vector_indexes(apps, schema_editor):
+    """Drop all HNSW/IVFFlat indexes on feature embeddings (PostgreSQL only)."""
+    from apps.products.vector_indexes import list_vector_indexes
+
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    for index in list_vector_indexes(connection):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index['name']}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_featureembedding_text_hash'),
+    ]
+
+    operations = [
+        # Indexes for models added later are created with `manage.py vector_indexes create`
+        migrations.RunPython(
+            create_vector_indexes,
+            drop_vector_indexes,
+        ),
+    ]
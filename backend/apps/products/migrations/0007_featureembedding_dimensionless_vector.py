@@ -0,0 +1,56 @@
+# Generated migration for per-model vector dimensions on feature embeddings
+
+from django.db import migrations
+
+
+def convert_to_dimensionless_vector(apps, schema_editor):
+    """
+    Store embeddings in a dimensionless vector column (PostgreSQL only).
+
+    Existing ANN indexes are dropped and recreated per model as expression
+    indexes on embedding::vector(d).
+    """
+    from apps.products.vector_indexes import (
+        TABLE_NAME,
+        MAX_INDEX_DIMENSIONS,
+        create_vector_index,
+        get_embedding_column_type,
+        get_model_dimensions,
+        list_vector_indexes,
+    )
+
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    column_type = get_embedding_column_type(connection)
+    if column_type is None:
+        return
+
+    for index in list_vector_indexes(connection):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index['name']}")
+
+    if column_type != 'vector':
+        # jsonb columns (never converted) go through their text form
+        using = 'embedding::vector' if column_type.startswith('vector') else 'embedding::text::vector'
+        schema_editor.execute(
+            f"ALTER TABLE {TABLE_NAME} ALTER COLUMN embedding TYPE vector USING {using}"
+        )
+
+    for model_name, dimension in get_model_dimensions(connection).items():
+        if dimension <= MAX_INDEX_DIMENSIONS:
+            create_vector_index(connection, model_name, dimension, method='hnsw')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_enable_pgvector'),
+        ('products', '0006_featureembedding_vector_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            convert_to_dimensionless_vector,
+            migrations.RunPython.noop,
+        ),
+    ]
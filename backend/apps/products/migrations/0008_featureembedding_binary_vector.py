@@ -0,0 +1,79 @@
+# Generated migration for binary embedding storage on SQLite
+
+import json
+
+from django.db import migrations, models
+
+from apps.products.fields import BinaryVectorField
+
+CONVERT_BATCH_SIZE = 1000
+
+
+def _alter_embedding_field(apps, schema_editor, to_binary):
+    """Swap the embedding column between JSON text and float32 BLOB."""
+    FeatureEmbedding = apps.get_model('products', 'FeatureEmbedding')
+    current = FeatureEmbedding._meta.get_field('embedding')
+    target = BinaryVectorField(default=list) if to_binary else models.JSONField(default=list)
+    target.set_attributes_from_name('embedding')
+    target.model = FeatureEmbedding
+    schema_editor.alter_field(FeatureEmbedding, current, target)
+
+
+def _convert_rows(schema_editor, source_type, convert):
+    """Rewrite every embedding stored as ``source_type`` ('text' or 'blob')."""
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            # Converted rows change type, so each batch selects the next ones
+            cursor.execute(
+                "SELECT id, embedding FROM feature_embeddings "
+                "WHERE typeof(embedding) = %s LIMIT %s",
+                [source_type, CONVERT_BATCH_SIZE]
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                "UPDATE feature_embeddings SET embedding = %s WHERE id = %s",
+                [(convert(value), pk) for pk, value in rows]
+            )
+
+
+def json_to_binary(apps, schema_editor):
+    """Convert JSON embeddings to float32 BLOBs (SQLite only)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    _alter_embedding_field(apps, schema_editor, to_binary=True)
+    encoder = BinaryVectorField()
+    _convert_rows(schema_editor, 'text', lambda value: encoder.encode(json.loads(value)))
+
+
+def binary_to_json(apps, schema_editor):
+    """Convert float32 BLOB embeddings back to JSON (SQLite only)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    decoder = BinaryVectorField()
+    _convert_rows(schema_editor, 'blob', lambda value: json.dumps(decoder.decode(value).tolist()))
+    _alter_embedding_field(apps, schema_editor, to_binary=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_featureembedding_dimensionless_vector'),
+    ]
+
+    operations = [
+        # Only the SQLite schema changes; on PostgreSQL the column stays a pgvector vector
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='featureembedding',
+                    name='embedding',
+                    field=BinaryVectorField(default=list, editable=True),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(json_to_binary, binary_to_json),
+            ],
+        ),
+    ]
@@ -2,9 +2,11 @@
 Product and Feature models.
 """
 from django.db import models
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from apps.core.models import TimeStampedModel
+from . import changes
+from .fields import BinaryVectorField
 import os
 
 # Conditional import for pgvector
@@ -15,7 +17,30 @@ else:
     from pgvector.django import VectorField
 
 
-class Product(TimeStampedModel):
+class ActiveStateTrackingMixin:
+    """
+    Remember the ``is_active`` value loaded from the database, so a soft
+    delete is detected on save without reading the row again.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        return instance
+
+    def was_deactivated(self) -> bool:
+        """Whether this save turns is_active from True to False."""
+        if self.is_active or self.pk is None or self._state.adding:
+            return False
+        loaded = getattr(self, '_loaded_is_active', None)
+        if loaded is None:
+            # Built without loading (or is_active was deferred)
+            loaded = type(self).objects.filter(pk=self.pk).values_list('is_active', flat=True).first()
+        return bool(loaded)
+
+
+class Product(ActiveStateTrackingMixin, TimeStampedModel):
     """Product model."""
 
     # 子系统类型选择
@@ -62,7 +87,7 @@ class Product(TimeStampedModel):
         return f"{self.name} {self.version or ''}".strip()
 
 
-class Feature(TimeStampedModel):
+class Feature(ActiveStateTrackingMixin, TimeStampedModel):
     """Feature model."""
 
     MATCH_STATUS_CHOICES = [
@@ -127,6 +152,14 @@ class Feature(TimeStampedModel):
     def __str__(self):
         return f"{self.feature_name} - {self.product.name}"
 
+    def get_embedding_text(self) -> str:
+        """
+        Get the text embedded for this feature.
+
+        The description is repeated to give it more weight in semantic matching.
+        """
+        return f"{self.feature_name}。功能描述：{self.description}。详细说明：{self.description}"
+
 
 class FeatureEmbedding(TimeStampedModel):
     """Feature embedding vector storage."""
@@ -136,9 +169,14 @@ class FeatureEmbedding(TimeStampedModel):
         on_delete=models.CASCADE,
         related_name='embeddings'
     )
-    embedding = VectorField(dimensions=1536) if not os.environ.get('USE_SQLITE') else models.JSONField(default=list)  # OpenAI dimension, configurable
+    # Dimensionless vector: each model stores its own dimension, indexed per
+    # model by an expression index on embedding::vector(d) (see vector_indexes).
+    # Without pgvector, vectors are float32 BLOBs loaded as numpy arrays.
+    embedding = VectorField() if not os.environ.get('USE_SQLITE') else BinaryVectorField(default=list)
     model_name = models.CharField(max_length=100, db_index=True)
     model_version = models.CharField(max_length=50, blank=True)
+    # SHA-256 of the embedded text, used to detect features whose text changed
+    text_hash = models.CharField(max_length=64, blank=True)
 
     class Meta:
         db_table = 'feature_embeddings'
@@ -158,39 +196,39 @@ def cleanup_feature_embeddings_on_soft_delete(sender, instance, **kwargs):
     """
     当功能被软删除时（is_active 从 True 变为 False），自动清理其向量数据。
     """
-    if instance.pk is not None:
-        try:
-            old_instance = Feature.objects.get(pk=instance.pk)
-            # 如果从活跃变为非活跃，删除该功能的所有向量
-            if old_instance.is_active and not instance.is_active:
-                embeddings = instance.embeddings.all()
-                count = embeddings.count()
-                if count > 0:
-                    embeddings.delete()
-                    print(f"[信号处理器] 已删除功能 '{instance.feature_name}' 的 {count} 个向量")
-        except Feature.DoesNotExist:
-            pass
+    if not instance.was_deactivated():
+        return
+    instance._signature_before_removal = changes.catalogue_signature() if changes.has_listeners() else None
+    _, per_model = FeatureEmbedding.objects.filter(feature_id=instance.pk).delete()
+    deleted = per_model.get(FeatureEmbedding._meta.label, 0)
+    if deleted:
+        print(f"[信号处理器] 已删除功能 '{instance.feature_name}' 的 {deleted} 个向量")
 
 
 @receiver(pre_save, sender=Product)
 def cleanup_product_embeddings_on_soft_delete(sender, instance, **kwargs):
     """
-    当产品被软删除时（is_active 从 True 变为 False），自动清理其所有功能的向量数据。
+    当产品被软删除时（is_active 从 True 变为 False），用一次批量删除清理其所有功能的向量数据。
+    """
+    if not instance.was_deactivated():
+        return
+    instance._signature_before_removal = changes.catalogue_signature() if changes.has_listeners() else None
+    _, per_model = FeatureEmbedding.objects.filter(feature__product_id=instance.pk).delete()
+    deleted = per_model.get(FeatureEmbedding._meta.label, 0)
+    if deleted:
+        print(f"[信号处理器] 已删除产品 '{instance.name}' 的所有功能的 {deleted} 个向量")
+
+
+@receiver(post_save, sender=Feature)
+@receiver(post_save, sender=Product)
+def record_soft_delete(sender, instance, **kwargs):
     """
-    if instance.pk is not None:
-        try:
-            old_instance = Product.objects.get(pk=instance.pk)
-            # 如果从活跃变为非活跃，删除该产品所有功能的向量
-            if old_instance.is_active and not instance.is_active:
-                total_count = 0
-                for feature in instance.features.all():
-                    embeddings = feature.embeddings.all()
-                    count = embeddings.count()
-                    if count > 0:
-                        embeddings.delete()
-                        total_count += count
-                        print(f"[信号处理器] 已删除功能 '{feature.feature_name}' 的 {count} 个向量")
-                if total_count > 0:
-                    print(f"[信号处理器] 已删除产品 '{instance.name}' 的所有功能的 {total_count} 个向量")
-        except Product.DoesNotExist:
-            pass
+    记录保存后的 is_active 状态；软删除时通知索引等监听者增量移除对应的功能。
+    """
+    instance._loaded_is_active = instance.is_active
+    before = instance.__dict__.pop('_signature_before_removal', None)
+    if before is None:
+        return
+
+    ids = {'feature_ids' if sender is Feature else 'product_ids': [instance.pk]}
+    changes.notify_removed(before, changes.catalogue_signature(), **ids)
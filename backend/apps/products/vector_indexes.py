@@ -0,0 +1,193 @@
+"""
+Approximate nearest-neighbour (HNSW/IVFFlat) indexes on feature embeddings.
+
+PostgreSQL/pgvector only. The embedding column is a dimensionless
+``vector`` so every model stores vectors of its own dimension. One partial
+expression index is kept per model, ``(embedding::vector(d)) WHERE
+model_name = ...``; queries scoped to a model and casting to the same
+dimension (see MatchingAlgorithm.find_matches_using_pgvector) use it.
+"""
+import hashlib
+import math
+from typing import Dict, List, Optional
+
+TABLE_NAME = 'feature_embeddings'
+
+INDEX_METHODS = ('hnsw', 'ivfflat')
+
+# Largest vector dimension pgvector can index with HNSW/IVFFlat
+MAX_INDEX_DIMENSIONS = 2000
+
+
+def get_index_name(model_name: str, method: str) -> str:
+    """
+    Get the index name for a model and method.
+
+    Model names are hashed so the name stays a valid, short identifier.
+    """
+    digest = hashlib.sha1(model_name.encode('utf-8')).hexdigest()[:12]
+    return f"{TABLE_NAME}_{method}_{digest}"
+
+
+def quote_literal(value: str) -> str:
+    """Quote a string literal for DDL, which cannot take query parameters."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def get_embedding_column_type(connection) -> Optional[str]:
+    """
+    Get the SQL type of the embedding column (e.g. 'vector(1536)' or 'jsonb').
+
+    Args:
+        connection: PostgreSQL database connection
+
+    Returns:
+        Type name, or None if the table does not exist
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = to_regclass(%s) AND attname = 'embedding'",
+            [TABLE_NAME]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def get_model_dimensions(connection) -> Dict[str, int]:
+    """
+    Get the vector dimension stored for each embedding model.
+
+    Models whose rows have mixed dimensions cannot be indexed and are left out.
+
+    Args:
+        connection: PostgreSQL database connection
+
+    Returns:
+        Dictionary of model name -> dimension
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT model_name, MIN(vector_dims(embedding)), MAX(vector_dims(embedding)) "
+            f"FROM {TABLE_NAME} GROUP BY model_name ORDER BY model_name"
+        )
+        rows = cursor.fetchall()
+
+    dimensions = {}
+    for model_name, min_dimension, max_dimension in rows:
+        if min_dimension != max_dimension:
+            print(
+                f"Skipping vector index for {model_name}: "
+                f"mixed dimensions {min_dimension}-{max_dimension}"
+            )
+            continue
+        dimensions[model_name] = min_dimension
+    return dimensions
+
+
+def default_lists(row_count: int) -> int:
+    """IVFFlat list count recommended by pgvector: rows/1000 up to 1M rows, sqrt(rows) above."""
+    if row_count <= 1000000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def create_vector_index(
+    connection,
+    model_name: str,
+    dimension: Optional[int] = None,
+    method: str = 'hnsw',
+    m: int = 16,
+    ef_construction: int = 64,
+    lists: Optional[int] = None,
+    concurrently: bool = False
+) -> str:
+    """
+    Create the cosine-distance ANN index for one model if it does not exist.
+
+    Args:
+        connection: PostgreSQL database connection
+        model_name: Embedding model name the index is restricted to
+        dimension: Vector dimension of the model (default: read from stored rows)
+        method: 'hnsw' or 'ivfflat'
+        m: HNSW max connections per layer
+        ef_construction: HNSW candidate list size during build
+        lists: IVFFlat list count (default: derived from the model's row count)
+        concurrently: Build without locking writes (cannot run in a transaction)
+
+    Returns:
+        Name of the index
+    """
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Unsupported index method: {method}. Supported: {list(INDEX_METHODS)}")
+    if dimension is None:
+        dimension = get_model_dimensions(connection).get(model_name)
+        if dimension is None:
+            raise ValueError(f"No single-dimension embeddings stored for model {model_name}")
+    if dimension > MAX_INDEX_DIMENSIONS:
+        raise ValueError(
+            f"Cannot index {dimension}-dimensional vectors (max {MAX_INDEX_DIMENSIONS})"
+        )
+
+    with connection.cursor() as cursor:
+        if method == 'hnsw':
+            options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+        else:
+            if lists is None:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {TABLE_NAME} WHERE model_name = %s",
+                    [model_name]
+                )
+                lists = default_lists(cursor.fetchone()[0])
+            options = f"lists = {int(lists)}"
+
+        name = get_index_name(model_name, method)
+        cursor.execute(
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+            f"ON {TABLE_NAME} USING {method} ((embedding::vector({int(dimension)})) vector_cosine_ops) "
+            f"WITH ({options}) WHERE model_name = {quote_literal(model_name)}"
+        )
+    return name
+
+
+def drop_vector_index(connection, model_name: str, method: str = 'hnsw', concurrently: bool = False) -> str:
+    """
+    Drop the ANN index for one model if it exists.
+
+    Args:
+        connection: PostgreSQL database connection
+        model_name: Embedding model name
+        method: 'hnsw' or 'ivfflat'
+        concurrently: Drop without locking the table (cannot run in a transaction)
+
+    Returns:
+        Name of the index
+    """
+    name = get_index_name(model_name, method)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name}")
+    return name
+
+
+def list_vector_indexes(connection) -> List[Dict[str, str]]:
+    """
+    List the HNSW/IVFFlat indexes on the embeddings table.
+
+    Args:
+        connection: PostgreSQL database connection
+
+    Returns:
+        List of dicts with name, definition and size
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef, pg_size_pretty(pg_relation_size(to_regclass(indexname))) "
+            "FROM pg_indexes WHERE tablename = %s "
+            "AND (indexdef ILIKE '%%USING hnsw%%' OR indexdef ILIKE '%%USING ivfflat%%') "
+            "ORDER BY indexname",
+            [TABLE_NAME]
+        )
+        return [
+            {'name': name, 'definition': definition, 'size': size}
+            for name, definition, size in cursor.fetchall()
+        ]
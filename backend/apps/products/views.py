@@ -19,6 +19,7 @@ from .serializers import (
     BatchFeatureSerializer,
 )
 from .import_service import ProductImportService
+from .embedding_service import FeatureEmbeddingService
 from apps.embeddings.services import EmbeddingServiceFactory
 import time
 
@@ -232,9 +233,8 @@ class FeatureViewSet(viewsets.ModelViewSet):
                 provider = EmbeddingServiceFactory.get_default_provider()
 
             # Generate embedding - emphasize description for better matching
-            # Use description twice to give it more weight in semantic matching
-            text = f"{feature.feature_name}。功能描述：{feature.description}。详细说明：{feature.description}"
-            embedding = provider.encode_single(text)
+            text = feature.get_embedding_text()
+            embedding = EmbeddingServiceFactory.encode_with_provider(provider, [text])[0]
 
             # Save embedding
             from apps.products.models import FeatureEmbedding
@@ -244,7 +244,8 @@ class FeatureViewSet(viewsets.ModelViewSet):
                 model_name=provider.model_name,
                 defaults={
                     'embedding': embedding,
-                    'model_version': provider.model_params.get('model', 'unknown')
+                    'model_version': provider.model_params.get('model', 'unknown'),
+                    'text_hash': FeatureEmbeddingService.hash_text(text)
                 }
             )
 
@@ -269,8 +270,6 @@ class FeatureViewSet(viewsets.ModelViewSet):
         POST /api/v1/features/generate_embeddings_batch/
         Body: { feature_ids?, product_id?, config_id?, regenerate? }
         """
-        from apps.products.models import FeatureEmbedding
-
         feature_ids = request.data.get('feature_ids')
         product_id = request.data.get('product_id')
         config_id = request.data.get('config_id')
@@ -293,55 +292,20 @@ class FeatureViewSet(viewsets.ModelViewSet):
             else:
                 provider = EmbeddingServiceFactory.get_default_provider()
 
-            results = {
-                'success': [],
-                'failed': [],
-                'skipped': []
-            }
-
-            for feature in features:
-                try:
-                    # Check if embedding already exists
-                    existing = FeatureEmbedding.objects.filter(
-                        feature=feature,
-                        model_name=provider.model_name
-                    ).first()
-
-                    if existing and not regenerate:
-                        results['skipped'].append(str(feature.id))
-                        continue
-
-                    # Generate embedding - emphasize description for better matching
-                    # Use description twice to give it more weight in semantic matching
-                    text = f"{feature.feature_name}。功能描述：{feature.description}。详细说明：{feature.description}"
-                    embedding = provider.encode_single(text)
-
-                    # Save or update embedding
-                    FeatureEmbedding.objects.update_or_create(
-                        feature=feature,
-                        model_name=provider.model_name,
-                        defaults={
-                            'embedding': embedding,
-                            'model_version': provider.model_params.get('model', 'unknown')
-                        }
-                    )
-
-                    results['success'].append(str(feature.id))
-
-                except Exception as e:
-                    results['failed'].append({
-                        'feature_id': str(feature.id),
-                        'error': str(e)
-                    })
+            # Existing embeddings are prefetched, texts are batch-encoded and
+            # rows are upserted in bulk
+            results = FeatureEmbeddingService(provider).generate(features, regenerate=regenerate)
+            throughput = results.pop('throughput')
 
             return Response({
                 'status': 'completed',
                 'summary': {
-                    'total': len(features),
+                    'total': len(results['success']) + len(results['failed']) + len(results['skipped']),
                     'success': len(results['success']),
                     'failed': len(results['failed']),
                     'skipped': len(results['skipped'])
                 },
+                'throughput': throughput,
                 'results': results
             })
 
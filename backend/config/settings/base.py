@@ -194,6 +194,95 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
 
+# Matching settings
+# Number of MatchRecord rows written per INSERT when saving analysis results
+MATCHING_BULK_CREATE_BATCH_SIZE = int(os.environ.get('MATCHING_BULK_CREATE_BATCH_SIZE', '500'))
+# Background analysis jobs: 'thread' runs workers inside the web process,
+# 'external' leaves them to `python manage.py run_analysis_worker`
+MATCHING_JOB_RUNNER = os.environ.get('MATCHING_JOB_RUNNER', 'thread')
+MATCHING_JOB_WORKERS = int(os.environ.get('MATCHING_JOB_WORKERS', '2'))
+MATCHING_JOB_POLL_INTERVAL = float(os.environ.get('MATCHING_JOB_POLL_INTERVAL', '1.0'))
+# Approximate nearest-neighbour search on PostgreSQL (requires HNSW/IVFFlat
+# indexes, see `python manage.py vector_indexes`); ef_search/probes trade
+# recall for latency and can be measured with `python manage.py vector_index_report`
+MATCHING_ANN_ENABLED = os.environ.get('MATCHING_ANN_ENABLED', 'False') == 'True'
+MATCHING_HNSW_EF_SEARCH = int(os.environ.get('MATCHING_HNSW_EF_SEARCH', '100'))
+MATCHING_IVFFLAT_PROBES = int(os.environ.get('MATCHING_IVFFLAT_PROBES', '10'))
+# Approximate search for the in-process (non-pgvector) index: IVF clusters
+# trained with k-means, centroids stored next to the database (or in
+# MATCHING_LOCAL_ANN_DIR); only used once a catalogue has MIN_ROWS vectors,
+# and not on quantized indexes
+MATCHING_LOCAL_ANN_ENABLED = os.environ.get('MATCHING_LOCAL_ANN_ENABLED', 'False') == 'True'
+MATCHING_LOCAL_ANN_MIN_ROWS = int(os.environ.get('MATCHING_LOCAL_ANN_MIN_ROWS', '20000'))
+MATCHING_LOCAL_ANN_NPROBE = int(os.environ.get('MATCHING_LOCAL_ANN_NPROBE', '8'))
+MATCHING_LOCAL_ANN_DIR = os.environ.get('MATCHING_LOCAL_ANN_DIR') or None
+
+# Share the in-process index between worker processes: the matrix is exported
+# as a versioned .npy file (in MATCHING_LOCAL_ANN_DIR) and memory-mapped by
+# every worker (with its IVF blocks when local ANN is enabled); a new version
+# is picked up when embeddings change
+MATCHING_INDEX_MMAP = os.environ.get('MATCHING_INDEX_MMAP', 'False') == 'True'
+
+# Hybrid retrieval: BM25 over feature texts (CJK bigrams) fused with the
+# vector ranking by weighted reciprocal rank fusion; the vector and BM25 top
+# CANDIDATES are both candidates
+MATCHING_HYBRID_ENABLED = os.environ.get('MATCHING_HYBRID_ENABLED', 'False') == 'True'
+MATCHING_HYBRID_CANDIDATES = int(os.environ.get('MATCHING_HYBRID_CANDIDATES', '100'))
+MATCHING_HYBRID_RRF_K = int(os.environ.get('MATCHING_HYBRID_RRF_K', '60'))
+MATCHING_HYBRID_VECTOR_WEIGHT = float(os.environ.get('MATCHING_HYBRID_VECTOR_WEIGHT', '1.0'))
+MATCHING_HYBRID_LEXICAL_WEIGHT = float(os.environ.get('MATCHING_HYBRID_LEXICAL_WEIGHT', '0.3'))
+
+# Compressed in-process index: 'sq8' (int8, 4x smaller) or 'pq' (product
+# quantization, ~32x smaller); the full-precision matrix is dropped and the
+# top RERANK candidates per query are rescored with vectors from the database
+MATCHING_QUANTIZATION = os.environ.get('MATCHING_QUANTIZATION', '')
+MATCHING_QUANTIZATION_MIN_ROWS = int(os.environ.get('MATCHING_QUANTIZATION_MIN_ROWS', '20000'))
+MATCHING_QUANTIZATION_RERANK = int(os.environ.get('MATCHING_QUANTIZATION_RERANK', '50'))
+
+# Two-stage retrieve-then-rerank (see MatchingAlgorithm.staged_match): stage 1
+# fetches `candidates` per requirement item from the ANN/quantized index,
+# stage 2 rescores them with exact cosine, BM25 and Feature.importance_level.
+# Budgets are soft, in ms per requirement item. PROFILE is the default for
+# requests that do not name one ('' disables the pipeline).
+MATCHING_PIPELINE_PROFILE = os.environ.get('MATCHING_PIPELINE_PROFILE', '')
+MATCHING_PIPELINE_PROFILES = {
+    'fast': {
+        'candidates': 20,
+        'retrieve_budget_ms': 50,
+        'rerank_budget_ms': 20,
+        'lexical_weight': 0.0,
+        'importance_weight': 0.0,
+    },
+    'balanced': {
+        'candidates': 100,
+        'retrieve_budget_ms': 200,
+        'rerank_budget_ms': 100,
+        'lexical_weight': 0.2,
+        'importance_weight': 0.05,
+    },
+    'accurate': {
+        'candidates': 400,
+        'retrieve_budget_ms': 1000,
+        'rerank_budget_ms': 500,
+        'lexical_weight': 0.3,
+        'importance_weight': 0.1,
+    },
+}
+
+
+# Embedding settings
+# Number of vectors kept in each process's in-memory embedding cache (LRU)
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.environ.get('EMBEDDING_CACHE_MEMORY_ITEMS', '10000'))
+# Seconds the default embedding configuration is cached per process; saves in
+# the same process invalidate it at once, other processes see them after this
+EMBEDDING_CONFIG_CACHE_TTL = float(os.environ.get('EMBEDDING_CONFIG_CACHE_TTL', '30'))
+# torch intra-op / inter-op threads for local (sentence-transformers) models; 0 keeps torch's default
+EMBEDDING_TORCH_THREADS = int(os.environ.get('EMBEDDING_TORCH_THREADS', '0'))
+EMBEDDING_TORCH_INTEROP_THREADS = int(os.environ.get('EMBEDDING_TORCH_INTEROP_THREADS', '0'))
+# Load the default embedding model when an analysis worker starts, not on its first job
+EMBEDDING_WARMUP = os.environ.get('EMBEDDING_WARMUP', 'True') == 'True'
+
+
 # OpenAI settings
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 